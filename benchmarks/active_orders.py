@@ -0,0 +1,70 @@
+"""
+活跃报单查询性能对比: 遍历全部活跃报单 vs ActiveOrderIndex
+
+模拟做市策略: SYMBOLS 个合约上共挂有 RESTING 个活跃报单, 每个tick查询一次本合约的活跃报单,
+同时有一定比例的报单被撤销并重新挂单
+
+    PYTHONPATH=. python benchmarks/active_orders.py
+"""
+from time import perf_counter
+
+from ctpbee.constant import OrderData, Exchange, Direction, Offset, Status
+from ctpbee.data_handle.active_orders import ActiveOrderIndex
+
+SYMBOLS = 50
+RESTING = 5000
+TICKS = 20000
+# 每个tick撤单重挂的报单数量
+REQUOTE = 2
+
+
+def make_order(order_id, status=Status.NOTTRADED):
+    return OrderData(symbol=f"rb{2000 + order_id % SYMBOLS}", exchange=Exchange.SHFE, order_id=str(order_id),
+                     direction=Direction.LONG if order_id % 2 else Direction.SHORT,
+                     offset=Offset.OPEN if order_id % 3 else Offset.CLOSE, status=status, gateway_name="ctp")
+
+
+def scan(active_orders, local_symbol, direction=None):
+    return [order for order in active_orders.values()
+            if order.local_symbol == local_symbol and (direction is None or order.direction == direction)]
+
+
+def run(indexed):
+    index = ActiveOrderIndex()
+    active_orders = {}
+    for x in range(RESTING):
+        o = make_order(x)
+        if indexed:
+            index.update(o)
+        else:
+            active_orders[o.local_order_id] = o
+    next_id = RESTING
+    start = perf_counter()
+    found = 0
+    for tick in range(TICKS):
+        local_symbol = f"rb{2000 + tick % SYMBOLS}.SHFE"
+        if indexed:
+            found += len(index.get(local_symbol)) + len(index.get(local_symbol, Direction.LONG))
+        else:
+            found += len(scan(active_orders, local_symbol)) + len(scan(active_orders, local_symbol, Direction.LONG))
+        for _ in range(REQUOTE):
+            # 撤掉最早的报单并重新挂单
+            orders = index.orders if indexed else active_orders
+            cancelled = orders[next(iter(orders))]
+            if indexed:
+                index.update(make_order(int(cancelled.order_id), Status.CANCELLED))
+                index.update(make_order(next_id))
+            else:
+                active_orders.pop(cancelled.local_order_id)
+                o = make_order(next_id)
+                active_orders[o.local_order_id] = o
+            next_id += 1
+    elapsed = perf_counter() - start
+    return {"ticks": TICKS, "found": found, "elapsed(s)": round(elapsed, 3),
+            "per tick(us)": round(elapsed / TICKS * 1e6, 1)}
+
+
+if __name__ == '__main__':
+    print(f"{RESTING} resting orders on {SYMBOLS} symbols")
+    print("scan  ", run(False))
+    print("index ", run(True))
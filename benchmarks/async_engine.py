@@ -0,0 +1,75 @@
+"""
+AsyncEngine 与线程 EventEngine 的对比
+
+一个生产者线程(模拟行情网关回调线程)以 RATE 个/秒 的速度投递事件,
+统计生产者每次put的耗时以及从put到处理函数被调用的延迟
+
+    PYTHONPATH=. python benchmarks/async_engine.py
+"""
+import statistics
+from threading import Thread
+from time import perf_counter, sleep
+
+from ctpbee.event_engine import EventEngine, AsyncEngine, Event
+
+RATE = 50000
+SECONDS = 3
+BURST = 50
+
+
+def produce(engine, total, put_cost):
+    interval = BURST / RATE
+    next_time = perf_counter()
+    for _ in range(total // BURST):
+        start = perf_counter()
+        for _ in range(BURST):
+            engine.put(Event("tick", perf_counter()))
+        put_cost.append((perf_counter() - start) / BURST)
+        next_time += interval
+        delay = next_time - perf_counter()
+        if delay > 0:
+            sleep(delay)
+
+
+def report(latency, put_cost):
+    latency.sort()
+    return {
+        "events": len(latency),
+        "put(us)": round(statistics.mean(put_cost) * 1e6, 2),
+        "p50(us)": round(statistics.median(latency) * 1e6, 1),
+        "p99(us)": round(latency[int(len(latency) * 0.99)] * 1e6, 1),
+        "p999(us)": round(latency[int(len(latency) * 0.999)] * 1e6, 1),
+        "max(us)": round(latency[-1] * 1e6, 1),
+    }
+
+
+def run(engine, handler_factory):
+    latency, put_cost = [], []
+    engine.register("tick", handler_factory(latency))
+    engine.start()
+    sleep(0.3)
+    total = RATE * SECONDS
+    producer = Thread(target=produce, args=(engine, total, put_cost))
+    producer.start()
+    producer.join()
+    while len(latency) < total:
+        sleep(0.001)
+    engine.stop()
+    return report(latency, put_cost)
+
+
+def thread_handler(latency):
+    return lambda event: latency.append(perf_counter() - event.data)
+
+
+def async_handler(latency):
+    async def handler(event):
+        latency.append(perf_counter() - event.data)
+
+    return handler
+
+
+if __name__ == '__main__':
+    print("EventEngine".ljust(18), run(EventEngine(), thread_handler))
+    print("AsyncEngine(1)".ljust(18), run(AsyncEngine(work_core=1), async_handler))
+    print("AsyncEngine(10)".ljust(18), run(AsyncEngine(work_core=10), async_handler))
@@ -0,0 +1,26 @@
+"""
+k线合成性能: 每个tick的耗时与周期数量的关系
+
+    PYTHONPATH=. python benchmarks/bar_engine.py
+"""
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from ctpbee.constant import TickData, Exchange
+from ctpbee.data_handle.bar_engine import BarAggregator
+from ctpbee.data_handle.session import session_for
+
+SIZE = 200000
+start = datetime(2020, 7, 15, 9)
+ticks = [TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=start + timedelta(milliseconds=500 * i),
+                      gateway_name="ctp", last_price=3500 + i % 50, volume=i) for i in range(SIZE)]
+
+if __name__ == '__main__':
+    for clock, name in ((None, "wall clock"), (session_for("rb2010.SHFE"), "rb session")):
+        for intervals in ([1], [1, 5], [1, 3, 5, 15, 30], [1, "30s", 3, 5, 15, 30, "1h", "1d"]):
+            aggregator = BarAggregator(intervals, clock)
+            begin = perf_counter()
+            for tick in ticks:
+                aggregator.update_tick(tick)
+            cost = (perf_counter() - begin) / SIZE * 1e6
+            print(f"{name} {len(intervals)} intervals {cost:6.2f}us/tick")
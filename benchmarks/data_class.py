@@ -0,0 +1,82 @@
+"""
+数据类构造耗时与内存占用对比: TickData/BarData/OrderData/TradeData vs slotted生成的固定布局版本
+参数与接口推送时一致, 内存为tracemalloc统计的每个实例平均占用(字节)
+
+以及序列化耗时: 基于dir的_to_dict vs 预先计算字段的_to_dict, 逐个_to_dict vs to_records
+
+    PYTHONPATH=. python benchmarks/data_class.py
+"""
+import tracemalloc
+from datetime import datetime
+from enum import Enum
+from timeit import timeit
+
+from ctpbee.constant import TickData, BarData, OrderData, TradeData, FastTickData, FastBarData, FastOrderData, \
+    FastTradeData, Exchange, Interval, OrderType, Direction, Offset, Status, to_records
+
+NUMBER = 100000
+COUNT = 10000
+RECORDS = 5000
+
+now = datetime(2020, 7, 15, 21, 0, 1, 500000)
+CASES = [
+    (TickData, FastTickData, dict(
+        symbol="rb2010", exchange=Exchange.SHFE, datetime=now, name="螺纹钢2010", volume=1, last_price=3700.0,
+        limit_up=3900.0, limit_down=3500.0, open_interest=100, open_price=3690.0, high_price=3710.0,
+        low_price=3680.0, pre_close=3695.0, bid_price_1=3699.0, ask_price_1=3700.0, bid_volume_1=10,
+        ask_volume_1=20, average_price=3698.0, pre_settlement_price=3696.0, gateway_name="ctp")),
+    (BarData, FastBarData, dict(
+        symbol="rb2010", exchange=Exchange.SHFE, datetime=now, interval=Interval.MINUTE, volume=100,
+        open_price=3690.0, high_price=3710.0, low_price=3680.0, close_price=3700.0, gateway_name="ctp")),
+    (OrderData, FastOrderData, dict(
+        symbol="rb2010", exchange=Exchange.SHFE, order_id="1", type=OrderType.LIMIT, direction=Direction.LONG,
+        offset=Offset.OPEN, price=3700.0, volume=1, traded=0, status=Status.NOTTRADED, time="21:00:01",
+        gateway_name="ctp")),
+    (TradeData, FastTradeData, dict(
+        symbol="rb2010", exchange=Exchange.SHFE, order_id="1", tradeid="1", direction=Direction.LONG,
+        offset=Offset.OPEN, price=3700.0, volume=1, time="21:00:01", gateway_name="ctp")),
+]
+
+
+def measure(cls, kwargs):
+    elapsed = timeit(lambda: cls(**kwargs), number=NUMBER) / NUMBER * 1e6
+    tracemalloc.start()
+    items = [cls(**kwargs) for _ in range(COUNT)]
+    size = tracemalloc.get_traced_memory()[0] / COUNT
+    tracemalloc.stop()
+    del items
+    return elapsed, size
+
+
+def dir_to_dict(data):
+    """ 原先基于dir的实现 """
+    temp = {}
+    for x in dir(data):
+        if x.startswith("_") or x.startswith("create"):
+            continue
+        value = getattr(data, x)
+        temp[x] = value.value if isinstance(value, Enum) else value
+    return temp
+
+
+def serialize(cls, kwargs):
+    data = cls(**kwargs)
+    before = timeit(lambda: dir_to_dict(data), number=NUMBER // 10) / (NUMBER // 10) * 1e6
+    after = timeit(lambda: data._to_dict(), number=NUMBER // 10) / (NUMBER // 10) * 1e6
+    items = [cls(**kwargs) for _ in range(RECORDS)]
+    one_by_one = timeit(lambda: [x._to_dict() for x in items], number=5) / 5 * 1e3
+    bulk = timeit(lambda: to_records(items), number=5) / 5 * 1e3
+    return before, after, one_by_one, bulk
+
+
+if __name__ == '__main__':
+    for origin, fast, kwargs in CASES:
+        assert repr(origin(**kwargs)) == repr(fast(**kwargs))
+        (t1, m1), (t2, m2) = measure(origin, kwargs), measure(fast, kwargs)
+        print(f"{origin.__name__:10} construct {t1:.2f}us -> {t2:.2f}us ({t1 / t2:.1f}x)  "
+              f"memory {m1:.0f}B -> {m2:.0f}B")
+    print()
+    for origin, fast, kwargs in CASES:
+        before, after, one_by_one, bulk = serialize(fast, kwargs)
+        print(f"{origin.__name__:10} _to_dict {before:.2f}us -> {after:.2f}us ({before / after:.1f}x)  "
+              f"{RECORDS} records: _to_dict {one_by_one:.1f}ms, to_records {bulk:.1f}ms")
@@ -0,0 +1,83 @@
+"""
+EventEngine 队列性能对比: queue.Queue vs RingQueue
+
+两个生产者线程(模拟行情与交易网关)以合计 RATE 个/秒 的速度投递事件,
+统计从put到处理函数被调用的延迟以及整个过程消耗的cpu时间,
+以及预先堆积大量事件时单个事件的投递与分发耗时
+
+    PYTHONPATH=. python benchmarks/engine_queue.py
+"""
+import statistics
+from threading import Thread
+from time import perf_counter, sleep, process_time
+
+from ctpbee.event_engine import EventEngine, Event
+
+RATE = 100000
+SECONDS = 3
+PRODUCERS = 2
+# 生产者每次连续投递的数量, 之后休眠到下一个时间片
+BURST = 100
+
+
+def produce(engine, total):
+    interval = BURST / (RATE / PRODUCERS)
+    next_time = perf_counter()
+    for _ in range(total // BURST):
+        for _ in range(BURST):
+            engine.put(Event("tick", perf_counter()))
+        next_time += interval
+        delay = next_time - perf_counter()
+        if delay > 0:
+            sleep(delay)
+
+
+def run(queue):
+    engine = EventEngine(queue=queue)
+    latency = []
+    engine.register("tick", lambda event: latency.append(perf_counter() - event.data))
+    engine.start()
+    total = RATE * SECONDS // PRODUCERS
+    cpu = process_time()
+    start = perf_counter()
+    producers = [Thread(target=produce, args=(engine, total)) for _ in range(PRODUCERS)]
+    [p.start() for p in producers]
+    [p.join() for p in producers]
+    while len(latency) < total * PRODUCERS:
+        sleep(0.001)
+    elapsed = perf_counter() - start
+    cpu = process_time() - cpu
+    engine.stop()
+    latency.sort()
+    return {
+        "events": len(latency),
+        "elapsed(s)": round(elapsed, 3),
+        "cpu(s)": round(cpu, 3),
+        "p50(us)": round(statistics.median(latency) * 1e6, 1),
+        "p99(us)": round(latency[int(len(latency) * 0.99)] * 1e6, 1),
+        "max(us)": round(latency[-1] * 1e6, 1),
+    }
+
+
+def drain(queue, total=RATE * SECONDS):
+    """ 预先投递total个事件, 统计引擎全部处理完成的耗时 """
+    engine = EventEngine(queue=queue)
+    counter = []
+    engine.register("tick", counter.append)
+    start = perf_counter()
+    for _ in range(total):
+        engine.put(Event("tick"))
+    put = perf_counter() - start
+    start = perf_counter()
+    engine.start()
+    while len(counter) < total:
+        sleep(0.001)
+    elapsed = perf_counter() - start
+    engine.stop()
+    return {"put(us/event)": round(put / total * 1e6, 3), "dispatch(us/event)": round(elapsed / total * 1e6, 3)}
+
+
+if __name__ == '__main__':
+    for name, queue in (("queue.Queue", None), ("RingQueue", "ring")):
+        print(name.ljust(12), run(queue))
+        print(name.ljust(12), drain(queue))
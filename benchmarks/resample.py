@@ -0,0 +1,36 @@
+"""
+历史tick合成k线: 逐个tick使用BarAggregator vs 向量化的resample
+
+    PYTHONPATH=. python benchmarks/resample.py
+"""
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+from ctpbee.constant import TickData, Exchange
+from ctpbee.data_handle.bar_engine import BarAggregator
+from ctpbee.data_handle.resample import resample
+from ctpbee.data_handle.session import session_for
+
+SIZE = 1000000
+INTERVALS = [1, 5, 30, "1h", "1d"]
+
+if __name__ == '__main__':
+    clock = session_for("rb2010.SHFE")
+    timestamps = np.datetime64(datetime(2020, 7, 13, 9), "us") + np.arange(SIZE) * np.timedelta64(500, "ms")
+    prices = 3500 + np.random.randint(-50, 50, SIZE).astype(float)
+    volumes = np.cumsum(np.random.randint(0, 10, SIZE)).astype(float)
+
+    begin = perf_counter()
+    result = resample(timestamps, prices, volumes, INTERVALS, clock)
+    vectorized = perf_counter() - begin
+
+    ticks = [TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=dt, last_price=price, volume=volume)
+             for dt, price, volume in zip(timestamps.tolist(), prices.tolist(), volumes.tolist())]
+    begin = perf_counter()
+    aggregator = BarAggregator(INTERVALS, clock)
+    bars = [bar for tick in ticks for bar in aggregator.update_tick(tick)] + aggregator.flush()
+    live = perf_counter() - begin
+    assert len(bars) == sum(len(value) for value in result.values())
+    print(f"{SIZE} ticks, {len(bars)} bars: BarAggregator {live:.2f}s   resample {vectorized:.2f}s")
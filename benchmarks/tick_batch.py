@@ -0,0 +1,50 @@
+"""
+批量tick的内存与序列化对比: list[TickData] vs TickBatch
+
+    PYTHONPATH=. python benchmarks/tick_batch.py
+"""
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from ctpbee.constant import TickData, Exchange
+from ctpbee.data_handle.tick_batch import TickBatch
+from ctpbee.jsond import dumps, loads
+
+SIZE = 100000
+start = datetime(2020, 7, 15, 21)
+
+
+def make_ticks():
+    return [TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=start + timedelta(milliseconds=500 * i),
+                         gateway_name="ctp", last_price=3500 + i % 50, volume=i) for i in range(SIZE)]
+
+
+def measure(func):
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(func, *args):
+    begin = perf_counter()
+    result = func(*args)
+    return result, perf_counter() - begin
+
+
+if __name__ == '__main__':
+    ticks, objects = measure(make_ticks)
+    batch, columns = measure(lambda: TickBatch.from_ticks(ticks))
+    print(f"memory     list[TickData] {objects / SIZE:8.1f}B/tick   TickBatch {columns / SIZE:8.1f}B/tick")
+
+    _, before = timed(lambda: sum(tick.last_price for tick in ticks) / SIZE)
+    _, after = timed(lambda: batch["last_price"].mean())
+    print(f"mean       list[TickData] {before * 1e3:8.2f}ms        TickBatch {after * 1e3:8.2f}ms")
+
+    sample = ticks[:10000]
+    _, before = timed(lambda: loads(dumps(sample)))
+    part = batch[:10000]
+    _, after = timed(lambda: loads(dumps(part)))
+    print(f"jsond 1w   list[TickData] {before * 1e3:8.2f}ms        TickBatch {after * 1e3:8.2f}ms")
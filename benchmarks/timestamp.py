@@ -0,0 +1,42 @@
+"""
+tick时间解析性能对比: datetime.strptime vs TimestampDecoder
+
+    PYTHONPATH=. python benchmarks/timestamp.py
+"""
+from datetime import datetime, date
+from timeit import timeit
+
+from ctpbee.data_handle.timestamp import TimestampDecoder
+
+NUMBER = 200000
+decoder = TimestampDecoder()
+data = {"ActionDay": "20200715", "UpdateTime": "21:00:01", "UpdateMillisec": 500}
+
+
+def md_strptime():
+    """ 原先行情接口中的实现 """
+    timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
+    try:
+        return datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f")
+    except ValueError:
+        return datetime.strptime(str(date.today()) + " " + timestamp, "%Y-%m-%d %H:%M:%S.%f")
+
+
+def md_decoder():
+    return decoder.decode_md(data['ActionDay'], data['UpdateTime'], data['UpdateMillisec'])
+
+
+def recorder_strptime():
+    return datetime.strptime(' '.join(["20200715", "21:00:01.5"]), '%Y%m%d %H:%M:%S.%f')
+
+
+def recorder_decoder():
+    return decoder.decode("20200715", "21:00:01.5")
+
+
+if __name__ == '__main__':
+    assert md_strptime() == md_decoder() and recorder_strptime() == recorder_decoder()
+    for name, old, new in [("md_api", md_strptime, md_decoder), ("recorder", recorder_strptime, recorder_decoder)]:
+        before = timeit(old, number=NUMBER) / NUMBER * 1e6
+        after = timeit(new, number=NUMBER) / NUMBER * 1e6
+        print(f"{name:10} strptime {before:.2f}us  decoder {after:.2f}us  speedup {before / after:.1f}x")
@@ -14,7 +14,7 @@ from ctpbee.level import CtpbeeApi, AsyncApi, Action
 from ctpbee.log import VLogger
 from ctpbee.signals import send_monitor, cancel_monitor
 from ctpbee.trade_time import TradingDay
-from ctpbee.util import RiskLevel
+from ctpbee.util import RiskLevel, LatencyTracker
 from ctpbee.func import hickey, get_ctpbee_path
 
 # About looper
@@ -1,8 +1,12 @@
 # coding:utf-8
+import json
 import os
 import sys
+import traceback
+import warnings
+from datetime import datetime
 from inspect import ismethod
-from threading import Thread
+from threading import Thread, Lock
 from time import sleep
 from typing import Text
 from threading import local
@@ -13,7 +17,7 @@ from ctpbee import __version__
 from ctpbee.config import Config
 from ctpbee.constant import Exchange
 from ctpbee.context import _app_context_ctx
-from ctpbee.event_engine import EventEngine, AsyncEngine
+from ctpbee.event_engine import EventEngine, AsyncEngine, ShardedEngine
 from ctpbee.exceptions import ConfigError
 from ctpbee.helpers import end_thread
 from ctpbee.helpers import locked_cached_property, find_package, refresh_query, graphic_pattern
@@ -58,7 +62,7 @@ class CtpBee(object):
              TD_FUNC=False,  # 是否开启交易功能
              INTERFACE="ctp",  # 接口参数，默认指定国内期货ctp
              MD_FUNC=True,  # 是否开启行情功能
-             XMIN=[],  # k线序列周期， 支持一小时以内的k线任意生成
+             XMIN=[],  # k线序列周期， 整数为分钟, 也支持秒/小时/日, 例如 [5, "30s", "1h", "1d"]
              ALL_SUBSCRIBE=False,
              SHARE_MD=False,  # 是否多账户之间共享行情，---> 等待完成
              SLIPPAGE_COVER=0,  # 平多头滑点设置
@@ -72,6 +76,12 @@ class CtpBee(object):
              CLOSE_PATTERN="today",  # 面对支持平今的交易所，优先平今或者平昨 ---> today: 平今, yesterday: 平昨， 其他:处罚异常
              TODAY_EXCHANGE=[Exchange.SHFE.value, Exchange.INE.value],  # 需要支持平今的交易所代码列表
              AFTER_TIMEOUT=3,  # 设置after线程执行超时
+             BAR_RETENTION=10000,  # Recorder中每个合约每个周期保留的k线数量
+             SHARED_RETENTION=2000,  # 每个合约保留的分时图数据数量
+             LOG_RETENTION=10000,  # 保留的日志数量
+             LOG_TTL=None,  # 日志保留的秒数, None为不过期
+             ERROR_RETENTION=1000,  # 保留的错误数量
+             ERROR_TTL=None,  # 错误保留的秒数, None为不过期
              ))
 
     config_class = Config
@@ -90,8 +100,12 @@ class CtpBee(object):
     def __init__(self, name: Text, import_name, action_class: Action = None, engine_method: str = "thread",
                  logger_class=None, logger_config=None,
                  refresh: bool = False, risk=None,
-                 instance_path=None):
-        """ 初始化 """
+                 instance_path=None, engine_params: dict = None):
+        """
+        初始化
+        engine_method: 事件引擎, thread/sharded/async
+        engine_params: 传递给事件引擎的参数, 比如 sharded 模式下的 {"work_core": 8}
+        """
         self.name = name if name else 'ctpbee'
         self.import_name = import_name
         self.engine_method = engine_method
@@ -107,14 +121,19 @@ class CtpBee(object):
             else:
                 self.logger = logger_class(CP, app_name=self.name)
             self.logger.set_default(name=self.logger.app_name, owner='App')
+        engine_params = engine_params or {}
         if engine_method == "thread":
-            self.event_engine = EventEngine()
+            self.event_engine = EventEngine(**engine_params)
+            self.recorder = Recorder(self, self.event_engine)
+        elif engine_method == "sharded":
+            self.event_engine = ShardedEngine(**engine_params)
             self.recorder = Recorder(self, self.event_engine)
         elif engine_method == "async":
-            self.event_engine = AsyncEngine()
+            self.event_engine = AsyncEngine(**engine_params)
             self.recorder = AsyncRecorder(self, self.event_engine)
         else:
-            raise TypeError("引擎参数错误，只支持 thread 和 async，请检查代码")
+            raise TypeError("引擎参数错误，只支持 thread, sharded 和 async，请检查代码")
+        self.event_engine.on_error = self._on_handler_error
 
         """
               If no risk is specified by default, set the risk_decorator to None
@@ -171,6 +190,12 @@ class CtpBee(object):
         self.r = None
         self.r_flag = True
 
+        # local_symbol -> 插件 的路由表, 插件或者订阅合约变化时置空, 下次分发时重建
+        self._route = None
+        # 每次变化版本号加一, 重建期间版本号发生变化时重建的结果不会被保存
+        self._route_version = 0
+        self._route_lock = Lock()
+
         _app_context_ctx.push(self.name, self)
 
     def update_action_class(self, action_class):
@@ -251,9 +276,11 @@ class CtpBee(object):
         :param debug: 是否开启调试模式 ----> 等待完成
         :return:
         """
+        self.recorder.configure(self.config)
         if not self.event_engine.status:
             self.event_engine.start()
         self.config["LOG_OUTPUT"] = log_output
+        self.update_route()
         self._load_ext()
 
     def stop(self):
@@ -265,12 +292,101 @@ class CtpBee(object):
         """移除插件"""
         if extension_name in self.extensions:
             del self.extensions[extension_name]
+        self.update_route()
 
     def add_extension(self, extension: CtpbeeApi):
         """添加插件"""
         self.extensions.pop(extension.extension_name, None)
         extension.init_app(self)
         self.extensions[extension.extension_name] = extension
+        self.update_route()
+
+    def _on_handler_error(self, event, handler, exception):
+        """ 处理函数抛出的异常写入日志, 事件引擎继续运行 """
+        name = getattr(handler, "extension_name", None) or getattr(handler, "__qualname__", repr(handler))
+        self.logger.error(f"{name} 处理 {event.type} 事件时出现异常: {exception!r}\n{traceback.format_exc()}",
+                          owner="Engine")
+
+    def engine_stats(self, reset: bool = False) -> dict:
+        """
+        事件引擎的统计信息, 需要通过 engine_params={"instrument": True} 开启
+        wait: 每种事件从投递到被分发的排队时间
+        handlers: 每种事件下每个处理函数(包括插件)的调用次数, 耗时分位数以及异常次数
+        queue: 队列深度
+        """
+        if self.event_engine.instrument is None:
+            raise ValueError("没有开启统计, 请在实例化时传入 engine_params={'instrument': True}")
+        stats = self.event_engine.stats()
+        stats["queue"] = self.event_engine.queue_depth()
+        if reset:
+            self.event_engine.instrument.reset()
+        return stats
+
+    def dump_engine_stats(self, interval: float = 60, path: Text = None, reset: bool = False):
+        """
+        每隔interval秒输出一次engine_stats, 指定path时以json行的格式追加写入文件, 否则写入日志
+        """
+        if self.event_engine.instrument is None:
+            raise ValueError("没有开启统计, 请在实例化时传入 engine_params={'instrument': True}")
+
+        def dump():
+            stats = self.engine_stats(reset=reset)
+            if path is None:
+                self.logger.info(json.dumps(stats, ensure_ascii=False, default=str), owner="Engine")
+            else:
+                stats["datetime"] = str(datetime.now())
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(stats, ensure_ascii=False, default=str) + "\n")
+
+        scheduler = self.event_engine.scheduler
+        # 重复调用时替换之前的输出
+        scheduler.remove_channel("engine_stats")
+        scheduler.add_channel("engine_stats", interval)
+        scheduler.subscribe("engine_stats", dump)
+
+    def update_route(self):
+        """ 插件或者插件订阅的合约发生变化, 路由表需要重建 """
+        with self._route_lock:
+            self._route_version += 1
+            self._route = None
+
+    def _build_route(self):
+        """
+        重建路由表, 可能与策略线程修改订阅合约同时发生:
+        读取的是订阅合约的副本, 重建期间发生了变化时此次结果只用于当前分发, 不会覆盖已经失效的标记
+        """
+        version = self._route_version
+        independ = self.config['INSTRUMENT_INDEPEND']
+        every = list(self.extensions.values())
+        table = {}
+        if independ:
+            for extension in every:
+                instrument_set = getattr(extension, "instrument_set", ())
+                snapshot = getattr(instrument_set, "snapshot", None)
+                symbols = snapshot() if snapshot is not None else frozenset(instrument_set)
+                if len(symbols) == 0:
+                    warnings.warn(f"你当前开启策略对应订阅行情功能, 策略{extension.extension_name}的订阅行情数量为0，"
+                                  f"请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
+                for local_symbol in symbols:
+                    table.setdefault(local_symbol, []).append(extension)
+        route = (independ, every, table)
+        with self._route_lock:
+            if self._route_version == version:
+                self._route = route
+        return route
+
+    def extensions_for(self, local_symbol: Text) -> list:
+        """
+        返回需要接收此合约数据的插件
+        开启INSTRUMENT_INDEPEND时只返回instrument_set中包含此合约的插件, 否则返回全部插件
+        """
+        route = self._route
+        if route is None:
+            route = self._build_route()
+        independ, every, table = route
+        if not independ:
+            return every
+        return table.get(local_symbol, ())
 
     def suspend_extension(self, extension_name):
         extension = self.extensions.get(extension_name, None)
@@ -288,6 +404,7 @@ class CtpBee(object):
 
     def del_extension(self, extension_name):
         self.extensions.pop(extension_name, None)
+        self.update_route()
 
     def reload(self):
         """ 重新载入接口 """
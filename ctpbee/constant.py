@@ -2,10 +2,12 @@
 Basic data structure used for general trading function in VN Trader.
 """
 
+from copy import copy, deepcopy
 from dataclasses import dataclass, asdict
 from datetime import datetime, date
 from enum import Enum
 from logging import INFO
+from operator import attrgetter, itemgetter
 from typing import Any
 
 from pandas import DataFrame
@@ -165,6 +167,8 @@ ACTIVE_STATUSES = set([Status.NOTTRADED, Status.PARTTRADED])
 EVENT_LOG = "log"
 EVENT_CONTRACT = "contract"
 EVENT_TICK = "tick"
+# 批量tick, data为TickBatch
+EVENT_TICK_BATCH = "tick_batch"
 EVENT_BAR = "bar"
 EVENT_ERROR = "error"
 EVENT_POSITION = "position"
@@ -172,8 +176,83 @@ EVENT_TRADE = "trade"
 EVENT_ORDER = "order"
 EVENT_ACCOUNT = "account"
 EVENT_SHARED = "shared"
+# 合约当日统计, data为IntradayData, 只推送给订阅了该合约的插件
+EVENT_INTRADAY = "intraday"
 EVENT_LAST = "last"
 EVENT_INIT_FINISHED = "init"
+EVENT_TIMER = "timer"
+# 除默认定时器以外的定时器通道, data为通道名称
+EVENT_TIMER_CHANNEL = "timer_channel"
+# 定时器发现合约的交易时段已经结束, 由合约所在的处理线程结束k线, data为SessionClose
+EVENT_SESSION_CLOSE = "session_close"
+
+
+_MISSING = object()
+
+
+def _public(name: str) -> bool:
+    return not name.startswith("_") and not name.startswith("create")
+
+
+def _prepare_fields(cls):
+    """
+    类创建时预先计算公开的属性名(与dir的排序一致)以及一次取出全部属性的函数,
+    供 _to_dict / _to_df / __repr__ 使用, 不需要每次调用dir
+    """
+    names = set()
+    for klass in cls.__mro__:
+        names.update(klass.__dict__.get("__annotations__", {}))
+        # 属性以及非函数的类变量同样会出现在dir中
+        names.update(key for key, value in klass.__dict__.items()
+                     if isinstance(value, property) or not (callable(value) or isinstance(value, (classmethod, staticmethod))))
+    names = tuple(sorted(name for name in names if _public(name)))
+    cls._field_names = names
+    # 实例__dict__中可能出现的已知属性, 超出这个范围时才需要检查额外的属性
+    cls._field_set = frozenset(names + ("__name__",))
+    if len(names) == 1:
+        cls._field_getter = lambda obj, name=names[0]: (getattr(obj, name),)
+    else:
+        cls._field_getter = attrgetter(*names) if names else lambda obj: ()
+
+
+def _items(obj) -> list:
+    """ 按名称排序的 [(属性, 值)], 包括预先计算的字段以及实例上额外设置的公开属性 """
+    cls = type(obj)
+    names = cls._field_names
+    try:
+        items = list(zip(names, cls._field_getter(obj)))
+    except AttributeError:
+        # 存在没有赋值的字段, 与dir一致跳过
+        items = [(name, value) for name, value in zip(names, (getattr(obj, name, _MISSING) for name in names))
+                 if value is not _MISSING]
+    extra = _extra(obj, cls)
+    if extra:
+        items.extend((key, getattr(obj, key)) for key in extra)
+        items.sort(key=itemgetter(0))
+    return items
+
+
+def _extra(obj, cls) -> list:
+    """ 实例上额外设置的公开属性 """
+    mapping = getattr(obj, "__dict__", None)
+    if not mapping or cls._field_set.issuperset(mapping):
+        return []
+    return [key for key in mapping if key not in cls._field_set and _public(key)]
+
+
+def _to_dict(obj) -> dict:
+    cls = type(obj)
+    try:
+        values = cls._field_getter(obj)
+    except AttributeError:
+        values = None
+    if values is None or _extra(obj, cls):
+        return {key: value.value if isinstance(value, Enum) else value for key, value in _items(obj)}
+    return {key: value.value if isinstance(value, Enum) else value for key, value in zip(cls._field_names, values)}
+
+
+def _to_value(value):
+    return value.value if isinstance(value, Enum) else value
 
 
 @dataclass(init=False, repr=False)
@@ -201,13 +280,10 @@ class BaseData:
         # ??? excuse me ....
         cls.__dict__['__annotations__']['gateway_name'] = str
         cls.__dict__['__annotations__']['local_symbol'] = str
+        _prepare_fields(cls)
 
     def __repr__(self):
-        mat = []
-        for key in dir(self):
-            if key.startswith("_") or key.startswith("create"):
-                continue
-            mat.append(f" {key}={getattr(self, key, None)}, ")
+        mat = [f" {key}={value}, " for key, value in _items(self)]
         return f"{self.__name__}({''.join(mat)})"
 
     @classmethod
@@ -224,26 +300,10 @@ class BaseData:
 
     def _to_dict(self) -> dict:
         """ 转换enum为value的字典 """
-        temp = {}
-        for x in dir(self):
-            if x.startswith("_") or x.startswith("create"):
-                continue
-            if isinstance(getattr(self, x), Enum):
-                temp[x] = getattr(self, x).value
-                continue
-            temp[x] = getattr(self, x)
-        return temp
+        return _to_dict(self)
 
     def _to_df(self):
-        temp = {}
-        for x in dir(self):
-            if x.startswith("_") or x.startswith("create"):
-                continue
-            if isinstance(getattr(self, x), Enum):
-                temp[x] = getattr(self, x).value
-                continue
-            temp[x] = getattr(self, x)
-
+        temp = self._to_dict()
         return DataFrame([temp], columns=list(temp.keys()).remove("datetime")).set_index(['datetime']) if temp.get(
             "datetime", None) is not None else DataFrame([temp], columns=list(temp.keys()))
 
@@ -252,6 +312,9 @@ class BaseData:
         return asdict(self)
 
 
+_prepare_fields(BaseData)
+
+
 @dataclass(init=False, repr=False)
 class BaseRequest:
     """
@@ -270,12 +333,11 @@ class BaseRequest:
         if hasattr(self, "__post_init__"):
             self.__post_init__()
 
+    def __init_subclass__(cls, **kwargs):
+        _prepare_fields(cls)
+
     def __repr__(self):
-        mat = []
-        for key in dir(self):
-            if key.startswith("_") or key.startswith("create"):
-                continue
-            mat.append(f" {key}={getattr(self, key)}, ")
+        mat = [f" {key}={value}, " for key, value in _items(self)]
         return f"{self.__name__}({''.join(mat)})"
 
     @classmethod
@@ -292,21 +354,70 @@ class BaseRequest:
 
     def _to_dict(self) -> dict:
         """ 转换enum为value的字典 """
-        temp = {}
-        for x in dir(self):
-            if x.startswith("_") or x.startswith("create"):
-                continue
-            if isinstance(getattr(self, x), Enum):
-                temp[x] = getattr(self, x).value
-                continue
-            temp[x] = getattr(self, x)
-        return temp
+        return _to_dict(self)
 
     def _asdict(self):
         """ 转换为字典 里面会有enum """
         return asdict(self)
 
 
+_prepare_fields(BaseRequest)
+
+
+class FrozenData:
+    """
+    只读数据视图 / read-only view of a data object
+
+    事件分发时所有插件共享同一个数据对象, 通过此视图拒绝任何修改,
+    需要修改数据的时候请通过 _copy() 获取可写的副本
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        object.__setattr__(self, "_data", data)
+
+    @property
+    def __class__(self):
+        """ 保证 isinstance(view, TickData) 等判断依旧成立 """
+        return self._data.__class__
+
+    def __getattr__(self, item):
+        return getattr(self._data, item)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{self._data.__name__}为只读数据, 无法修改属性{key}, 请先通过_copy()获取副本")
+
+    def __delattr__(self, item):
+        raise AttributeError(f"{self._data.__name__}为只读数据, 无法删除属性{item}")
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenData):
+            other = other._data
+        return self._data == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __copy__(self):
+        return copy(self._data)
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self._data, memo)
+
+    def __reduce_ex__(self, protocol):
+        """ 序列化为原始数据, 反序列化得到的是可写的数据对象 """
+        return self._data.__reduce_ex__(protocol)
+
+    def __reduce__(self):
+        return self._data.__reduce__()
+
+    def _copy(self):
+        """ 返回可写的副本 """
+        return deepcopy(self._data)
+
+
 class TickData(BaseData):
     """
     Tick data contains information about:
@@ -595,7 +706,7 @@ class OrderRequest(BaseRequest):
         """
         Create order data from request.
         """
-        order = OrderData(
+        order = FastOrderData(
             symbol=self.symbol,
             exchange=self.exchange,
             order_id=order_id,
@@ -633,6 +744,117 @@ class SharedData(BaseData):
     average_price: float = 0
 
 
+class IntradayData(BaseData):
+    """
+    合约在当前交易日的统计, 交易日切换时重新开始
+    成交额为 最新价 * 成交量增量 的累计, 不包含合约乘数
+    """
+    local_symbol: str
+    datetime: datetime
+
+    trading_day: datetime = None
+    last_price: float = 0
+    volume: float = 0
+    delta_volume: float = 0
+    turnover: float = 0
+    vwap: float = 0
+    open_interest: float = 0
+    oi_change: float = 0
+    oi_delta: float = 0
+
+
+def _fields(cls) -> dict:
+    """ 按照定义顺序收集类以及父类的字段 {name: 默认值}, 没有默认值的字段为_MISSING """
+    fields = {}
+    for klass in reversed(cls.__mro__):
+        for name in klass.__dict__.get("__annotations__", {}):
+            fields[name] = klass.__dict__.get(name, _MISSING)
+    return fields
+
+
+def slotted(cls):
+    """
+    为热点数据类生成固定布局的子类:
+        字段保存在__slots__中, 构造函数根据字段生成, 不需要逐个setattr.
+        isinstance判断, __repr__, _to_dict, _asdict, _create_class 与原类保持一致.
+        字段以外的属性(例如延迟追踪的_trace)仍然可以设置, 保存在父类的__dict__中, 只有设置时才会创建.
+    与原类一致, 没有默认值且没有传入的字段读取时抛出AttributeError.
+    注意: 父类保留了__dict__, 并且每个字段都占用一个slot, 字段很多而大部分使用默认值的类(例如tick)反而更占内存,
+    所以接口推送的tick依旧使用TickData, 见benchmarks/data_class.py
+    """
+    fields = _fields(cls)
+    defaults = {f"_default_{name}": value for name, value in fields.items()}
+    defaults["_MISSING"] = _MISSING
+    params = ", ".join(f"{name}=_default_{name}" for name in fields)
+    body = "\n".join(f"    self.{name} = {name}" if value is not _MISSING else
+                     f"    if {name} is not _MISSING:\n        self.{name} = {name}"
+                     for name, value in fields.items())
+    post_init = "    self.__post_init__()\n" if hasattr(cls, "__post_init__") else ""
+    source = (f"def __init__(self, *, {params}, **extra):\n{body}\n"
+              f"    for key, value in extra.items():\n"
+              f"        setattr(self, key, value)\n"
+              f"{post_init}")
+    namespace = {}
+    exec(source, defaults, namespace)
+
+    def __new__(klass, **kwargs):
+        return object.__new__(klass)
+
+    @classmethod
+    def _create_class(klass, kwargs: dict):
+        """ 根据字典值创建类实例 """
+        return klass(**kwargs)
+
+    return type(f"Fast{cls.__name__}", (cls,), {
+        "__slots__": tuple(fields),
+        "__annotations__": {},
+        "__module__": cls.__module__,
+        "__doc__": f"固定布局的{cls.__name__}, 见slotted",
+        # __repr__ 与原类一致
+        "__name__": cls.__name__,
+        "__new__": __new__,
+        "__init__": namespace["__init__"],
+        "_create_class": _create_class,
+    })
+
+
+# k线以及交易推送使用的固定布局版本, tick见slotted
+FastTickData = slotted(TickData)
+FastBarData = slotted(BarData)
+FastOrderData = slotted(OrderData)
+FastTradeData = slotted(TradeData)
+
+
+def to_records(data: list, frame: bool = False):
+    """
+    将一组数据一次性转换为按列保存的字典 {属性: [值]}, enum转换为value, frame为True时返回与_to_df一致的DataFrame
+        to_records(app.recorder.get_all_trades(), frame=True)
+    全部属于同一类的数据只取类定义的字段; 混合不同类(包括子类以及slotted版本)的数据时逐个调用_to_dict, 缺失的值为None
+    """
+    if not data:
+        return DataFrame() if frame else {}
+    cls = data[0].__class__
+    try:
+        # 子类或者slotted版本的字段可能不同, 只有全部属于同一类时才能共用字段
+        if any(x.__class__ is not cls for x in data):
+            raise AttributeError
+        getter = cls._field_getter
+        rows = [getter(x) for x in data]
+        names = cls._field_names
+    except AttributeError:
+        dicts = [x._to_dict() for x in data]
+        names = sorted(set().union(*dicts))
+        rows = [tuple(d.get(name) for name in names) for d in dicts]
+    columns = {}
+    for name, column in zip(names, zip(*rows)):
+        if any(isinstance(value, Enum) for value in column):
+            column = [_to_value(value) for value in column]
+        columns[name] = list(column)
+    if not frame:
+        return columns
+    df = DataFrame(columns)
+    return df.set_index("datetime") if "datetime" in columns else df
+
 # type check
 # https://www.jianshu.com/p/36bfc4a927a4
 
@@ -679,6 +901,7 @@ class MarketDataRequest(BaseRequest):
     exchange: Exchange
 
 
-data_class = [TickData, BarData, OrderData, TradeData, PositionData, AccountData, LogData, ContractData, SharedData]
+data_class = [TickData, BarData, OrderData, TradeData, PositionData, AccountData, LogData, ContractData, SharedData,
+              IntradayData]
 request_class = [SubscribeRequest, OrderRequest, CancelRequest, AccountRegisterRequest, AccountBanlanceRequest,
                  TransferRequest, TransferSerialRequest]
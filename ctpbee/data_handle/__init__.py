@@ -1,4 +1,4 @@
-from .generator import DataGenerator
+from .generator import DataGenerator, GeneratorManager
 from .local_position import PositionHolding
 
 generator = DataGenerator
@@ -0,0 +1,101 @@
+"""
+活跃报单索引
+"""
+
+
+class ActiveOrderIndex:
+    """
+    维护所有活跃报单, 并按照合约以及合约下的 (方向, 开平) 建立二级索引, 随着报单推送增量更新
+        orders:     {local_order_id: order}
+        按合约:     {local_symbol: {local_order_id: order}}
+        按方向开平: {local_symbol: {(direction, offset): {local_order_id: order}}}
+    查询只需要取出对应的桶, 与活跃报单的总数无关.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self._by_symbol = {}
+        self._by_side = {}
+
+    def update(self, order):
+        """ 报单推送, 活跃的报单加入索引, 否则从索引中移除 """
+        if order._is_active():
+            self.add(order)
+        else:
+            self.remove(order.local_order_id)
+
+    def add(self, order):
+        local_order_id = order.local_order_id
+        previous = self.orders.get(local_order_id)
+        if previous is not None and self._key(previous) != self._key(order):
+            self._discard(previous)
+        self.orders[local_order_id] = order
+        self._bucket(self._by_symbol, order.local_symbol)[local_order_id] = order
+        sides = self._bucket(self._by_side, order.local_symbol)
+        self._bucket(sides, (order.direction, order.offset))[local_order_id] = order
+
+    def remove(self, local_order_id: str):
+        """ 移除报单, 返回被移除的报单, 不存在时返回None """
+        order = self.orders.pop(local_order_id, None)
+        if order is not None:
+            self._discard(order)
+        return order
+
+    @staticmethod
+    def _key(order) -> tuple:
+        return order.local_symbol, order.direction, order.offset
+
+    @staticmethod
+    def _bucket(index: dict, key) -> dict:
+        bucket = index.get(key)
+        if bucket is None:
+            bucket = index[key] = {}
+        return bucket
+
+    @staticmethod
+    def _pop(index: dict, key, local_order_id: str):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(local_order_id, None)
+            if not bucket:
+                del index[key]
+
+    def _discard(self, order):
+        self._pop(self._by_symbol, order.local_symbol, order.local_order_id)
+        sides = self._by_side.get(order.local_symbol)
+        if sides is not None:
+            self._pop(sides, (order.direction, order.offset), order.local_order_id)
+            if not sides:
+                del self._by_side[order.local_symbol]
+
+    def get(self, local_symbol: str = "", direction=None, offset=None) -> list:
+        """
+        查询活跃报单, 不传入local_symbol时返回全部
+            get("rb2010.SHFE")                                  该合约的全部活跃报单
+            get("rb2010.SHFE", Direction.LONG)                  该合约的买单
+            get("rb2010.SHFE", Direction.LONG, Offset.OPEN)     该合约的买开单
+        """
+        if not local_symbol:
+            return list(self.orders.values())
+        if direction is None and offset is None:
+            return list(self._by_symbol.get(local_symbol, {}).values())
+        sides = self._by_side.get(local_symbol, {})
+        if direction is not None and offset is not None:
+            return list(sides.get((direction, offset), {}).values())
+        # 只指定方向或者开平, 合并该合约下匹配的桶
+        result = []
+        for (d, o), bucket in sides.items():
+            if (direction is None or d == direction) and (offset is None or o == offset):
+                result.extend(bucket.values())
+        return result
+
+    def clear(self):
+        self.orders.clear()
+        self._by_symbol.clear()
+        self._by_side.clear()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __contains__(self, local_order_id):
+        return local_order_id in self.orders
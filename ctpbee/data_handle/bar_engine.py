@@ -0,0 +1,263 @@
+"""
+多周期k线合成
+"""
+from datetime import datetime, timedelta
+from functools import reduce
+from math import gcd
+
+import numpy as np
+
+from ctpbee.constant import FastBarData
+
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+# 1970-01-01的ordinal
+EPOCH = 719163
+
+
+def parse_interval(value) -> tuple:
+    """
+    解析k线周期, 返回 (秒数, 天数, k线的interval)
+        5 / "5m"  -> (300, 0, 5)         分钟周期的interval与原先一致为整数分钟
+        "1h"      -> (3600, 0, 60)
+        "30s"     -> (30, 0, "30s")
+        "1d"      -> (0, 1, "1d")        按交易日合成
+    """
+    if isinstance(value, int):
+        number, unit = value, "m"
+    else:
+        text = str(value).strip().lower()
+        number, unit = text[:-1], text[-1:]
+        if unit.isdigit():
+            number, unit = text, "m"
+        try:
+            number = int(number)
+        except ValueError:
+            raise ValueError(f"无法识别的k线周期: {value!r}")
+    if number <= 0 or (unit not in _UNITS and unit != "d"):
+        raise ValueError(f"无法识别的k线周期: {value!r}")
+    if unit == "d":
+        return 0, number, f"{number}d"
+    seconds = number * _UNITS[unit]
+    if seconds % 60:
+        return seconds, 0, f"{seconds}s"
+    if seconds > 86400:
+        raise ValueError(f"日内k线周期不能超过一天: {value!r}, 请使用d作为单位")
+    return seconds, 0, seconds // 60
+
+
+def interval_specs(intervals) -> list:
+    """ 去重并排序之后的 [(interval, 秒数, 天数)], 日内周期在前并按照时长排序 """
+    specs = {}
+    for value in intervals:
+        seconds, days, label = parse_interval(value)
+        specs[label] = (days, seconds)
+    return [(label, seconds, days) for label, (days, seconds) in sorted(specs.items(), key=lambda item: item[1])]
+
+
+def split_timestamps(timestamps) -> tuple:
+    """ datetime64数组 -> (自然日的datetime64[D]数组, 当天0点开始的秒数) """
+    timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+    dates = timestamps.astype("datetime64[D]")
+    return dates, (timestamps - dates) // np.timedelta64(1, "s")
+
+
+class WallClock:
+    """
+    默认的时间对齐方式: 按自然日以及当天0点开始的秒数对齐.
+    交易时段模板(见session.py)需要提供同样的两个方法:
+        locate(dt)               -> (交易日序号, 当天已经交易的秒数), 不在交易时段内返回None
+        to_datetime(day, offset) -> k线的开始时间
+    另外可以提供 session_end(day, offset) -> (结束时间, 时段结束的交易秒数, 是否为最后一个时段), 用于定时器收盘
+    """
+
+    @staticmethod
+    def locate(dt: datetime):
+        return dt.toordinal(), dt.hour * 3600 + dt.minute * 60 + dt.second
+
+    @staticmethod
+    def to_datetime(day: int, offset: int) -> datetime:
+        return datetime.fromordinal(day) + timedelta(seconds=offset)
+
+    @staticmethod
+    def locate_array(timestamps) -> tuple:
+        """ locate的向量化版本, 返回 (交易日序号数组, 交易秒数数组, 是否在交易时段内) """
+        dates, seconds = split_timestamps(timestamps)
+        return dates.astype(np.int64) + EPOCH, seconds, np.ones(len(dates), dtype=bool)
+
+
+class BarAggregator:
+    """
+    单个合约的多周期k线合成.
+
+        aggregator = BarAggregator([1, 5, "30s", "1h", "1d"])
+        for bar in aggregator.update_tick(tick):    # 返回被这个tick结束的k线, 周期从小到大
+            ...
+        aggregator.flush()                          # 结束并返回所有未完成的k线
+        aggregator.close_session(datetime.now())    # 定时器调用, 交易时段结束之后没有tick时结束k线
+
+    tick只更新最小公共周期(全部日内周期的最大公约数)的基础k线, 基础k线结束时再合并到每个周期的状态中,
+    每个周期的状态保存在按周期下标排列的列表中. 因此每个tick的开销与周期数量无关.
+    k线的datetime为该周期的开始时间, 成交量为tick累计成交量的差值.
+    """
+
+    def __init__(self, intervals=(1,), clock=None):
+        # 同一个tick结束多根k线时小周期先推送
+        specs = interval_specs(intervals)
+        self.labels = [label for label, _, _ in specs]
+        self.periods = [seconds for _, seconds, _ in specs]
+        self.days = [days for _, _, days in specs]
+        self.base = reduce(gcd, [period for period in self.periods if period], 0) or 86400
+        self.clock = clock or WallClock()
+        self._session_end = getattr(self.clock, "session_end", None)
+        size = len(self.labels)
+        # 每个周期的状态, filled表示已经合并过基础k线
+        self.keys = [None] * size
+        self.starts = [None] * size
+        self.filled = [False] * size
+        self.opens = [0.0] * size
+        self.highs = [0.0] * size
+        self.lows = [0.0] * size
+        self.closes = [0.0] * size
+        self.volumes = [0.0] * size
+        # 正在合成的基础k线
+        self.key = None
+        self.open = self.high = self.low = self.close = self.volume = 0.0
+        self.symbol = None
+        self.exchange = None
+        self.gateway_name = None
+        self.last_volume = None
+        self.last_day = None
+        self.day = None
+        # 当前交易时段结束的时间/交易秒数/是否为最后一个时段, 以及定时器收盘之后迟到的tick的上限
+        self.expire = None
+        self.finish = None
+        self.last_segment = False
+        self.sealed = None
+        # 已经经过的交易日数量, 用于多日k线
+        self.day_count = 0
+
+    def _volume(self, tick) -> float:
+        """ tick的成交量增量, 累计成交量变小时说明进入了新的交易日 """
+        last, self.last_volume = self.last_volume, tick.volume
+        if last is None:
+            return 0
+        change = tick.volume - last
+        return change if change >= 0 else tick.volume
+
+    def update_tick(self, tick) -> list:
+        located = self.clock.locate(tick.datetime)
+        if located is None:
+            return []
+        day, offset = located
+        key = day * 86400 + offset - offset % self.base
+        if self.key is not None and key < self.key or self.sealed is not None and key < self.sealed:
+            # 乱序到达的旧tick, 或者定时器已经结束了这个时段的k线, 丢弃且不影响成交量的基准
+            return []
+        price = tick.last_price
+        volume = self._volume(tick)
+        if key == self.key:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+            self.close = price
+            self.volume += volume
+            return []
+        if self.symbol is None:
+            self.symbol, self.exchange, self.gateway_name = tick.symbol, tick.exchange, tick.gateway_name
+        if day != self.last_day:
+            if self.last_day is not None:
+                self.day_count += 1
+            self.last_day = day
+        closed = self._roll(day, offset) if self.key is not None else self._roll(day, offset, merge=False)
+        self.key = key
+        self.day = day
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        if self._session_end is not None:
+            self.expire, self.finish, self.last_segment = self._session_end(day, offset)
+        return closed
+
+    def _merge(self, i: int):
+        """ 将基础k线合并到第i个周期 """
+        if self.filled[i]:
+            if self.high > self.highs[i]:
+                self.highs[i] = self.high
+            if self.low < self.lows[i]:
+                self.lows[i] = self.low
+            self.closes[i] = self.close
+            self.volumes[i] += self.volume
+        else:
+            self.filled[i] = True
+            self.opens[i], self.highs[i], self.lows[i] = self.open, self.high, self.low
+            self.closes[i], self.volumes[i] = self.close, self.volume
+
+    def _roll(self, day: int, offset: int, merge: bool = True) -> list:
+        """ 基础k线结束, 合并到每个周期, 并结束新tick不再属于的周期 """
+        closed = []
+        base = day * 86400
+        for i, period in enumerate(self.periods):
+            if merge:
+                self._merge(i)
+            if period:
+                start = offset - offset % period
+                key = base + start
+            else:
+                start = 0
+                key = self.day_count // self.days[i]
+            if key != self.keys[i]:
+                if self.filled[i]:
+                    closed.append(self._bar(i))
+                    self.filled[i] = False
+                self.keys[i] = key
+                self.starts[i] = self.clock.to_datetime(day, start) if period else datetime.fromordinal(day)
+        return closed
+
+    def _bar(self, i: int):
+        return FastBarData(symbol=self.symbol, exchange=self.exchange, datetime=self.starts[i],
+                           gateway_name=self.gateway_name, interval=self.labels[i], volume=self.volumes[i],
+                           open_price=self.opens[i], high_price=self.highs[i], low_price=self.lows[i],
+                           close_price=self.closes[i])
+
+    def current(self, interval=1):
+        """ 指定周期正在合成中的k线(包括还未结束的基础k线), 没有时返回None """
+        if self.key is None:
+            return None
+        i = self.labels.index(parse_interval(interval)[2])
+        bar = self._bar(i) if self.filled[i] else FastBarData(
+            symbol=self.symbol, exchange=self.exchange, datetime=self.starts[i], gateway_name=self.gateway_name,
+            interval=self.labels[i], volume=0, open_price=self.open, high_price=self.high, low_price=self.low)
+        bar.high_price = max(bar.high_price, self.high)
+        bar.low_price = min(bar.low_price, self.low)
+        bar.close_price = self.close
+        bar.volume += self.volume
+        return bar
+
+    def flush(self) -> list:
+        """ 结束全部未完成的k线, 例如收盘之后 """
+        if self.key is None:
+            return []
+        bars = []
+        for i in range(len(self.labels)):
+            self._merge(i)
+            bars.append(self._bar(i))
+            self.filled[i] = False
+            self.keys[i] = None
+        self.key = None
+        self.expire = None
+        return bars
+
+    def close_session(self, now: datetime) -> list:
+        """
+        交易时段结束(加上模板的延迟)之后仍然没有新的tick时, 结束在该时段结束的k线, 返回被结束的k线.
+        跨越休息时间的k线(例如商品期货10:15-10:30休息期间的30分钟k线)保持不变, 当天最后一个时段结束时结束全部k线.
+        """
+        if self.expire is None or self.key is None or now < self.expire:
+            return []
+        self.expire = None
+        self.sealed = self.day * 86400 + self.finish
+        if self.last_segment:
+            return self.flush()
+        closed = self._roll(self.day, self.finish)
+        self.key = None
+        return closed
@@ -0,0 +1,90 @@
+"""
+列式k线存储
+"""
+import numpy as np
+
+from ctpbee.constant import FastBarData
+from ctpbee.data_handle.buffer import RingBuffer
+
+# 与BarData的字段名保持一致
+BAR_DTYPE = np.dtype([
+    ("datetime", "datetime64[us]"),
+    ("open_price", "f8"),
+    ("high_price", "f8"),
+    ("low_price", "f8"),
+    ("close_price", "f8"),
+    ("volume", "f8"),
+])
+
+
+class BarStore:
+    """
+    每个合约每个周期的k线保存为一个结构化数组的RingBuffer, 最多保留capacity根.
+    读取得到的是只读的numpy视图, 不复制数据, 可以直接用于向量化计算:
+
+        bars = store.array("rb2010.SHFE", 1, 20)
+        ma = bars["close_price"].mean()
+
+    k线只保存在这里, 需要BarData时通过bars按行重新创建, 除了数组中的字段只保留合约代码, 交易所以及接口名称
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        # local_symbol -> {interval: RingBuffer}
+        self._buffers = {}
+        # local_symbol -> 创建BarData时不在数组中的字段
+        self._fields = {}
+
+    def append(self, bar):
+        intervals = self._buffers.get(bar.local_symbol)
+        if intervals is None:
+            intervals = self._buffers[bar.local_symbol] = {}
+            self._fields[bar.local_symbol] = {
+                name: getattr(bar, name) for name in ("symbol", "exchange", "gateway_name") if hasattr(bar, name)}
+        buffer = intervals.get(bar.interval)
+        if buffer is None:
+            buffer = intervals[bar.interval] = RingBuffer(self.capacity, dtype=BAR_DTYPE)
+        buffer.append((bar.datetime, bar.open_price, bar.high_price, bar.low_price, bar.close_price, bar.volume))
+
+    def resize(self, capacity: int):
+        """ 修改保留数量, 已有的数据保留最近的capacity根 """
+        self.capacity = capacity
+        for intervals in self._buffers.values():
+            for interval, buffer in intervals.items():
+                resized = RingBuffer(capacity, dtype=BAR_DTYPE)
+                resized.extend(buffer.view(capacity))
+                intervals[interval] = resized
+
+    def array(self, local_symbol: str, interval, n: int = None) -> np.ndarray:
+        """ 最近n根(默认全部)k线的结构化数组视图, 没有数据时返回空数组 """
+        buffer = self._buffers.get(local_symbol, {}).get(interval)
+        if buffer is None:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return buffer.view(n)
+
+    def bars(self, local_symbol: str, interval, n: int = None) -> list:
+        """ 最近n根(默认全部)k线, 根据数组重新创建的BarData列表 """
+        fields = self._fields.get(local_symbol)
+        if fields is None:
+            return []
+        return [FastBarData(datetime=dt, open_price=open_price, high_price=high_price, low_price=low_price,
+                            close_price=close_price, volume=volume, interval=interval, **fields)
+                for dt, open_price, high_price, low_price, close_price, volume
+                in self.array(local_symbol, interval, n).tolist()]
+
+    def column(self, local_symbol: str, interval, field: str, n: int = None) -> np.ndarray:
+        """ 单独一列, 例如 column("rb2010.SHFE", 1, "close_price", 20) """
+        return self.array(local_symbol, interval, n)[field]
+
+    def local_symbols(self) -> list:
+        return list(self._buffers)
+
+    def intervals(self, local_symbol: str) -> list:
+        return list(self._buffers.get(local_symbol, {}))
+
+    def buffers(self) -> list:
+        return [buffer for intervals in self._buffers.values() for buffer in intervals.values()]
+
+    def clear(self):
+        self._buffers.clear()
+        self._fields.clear()
@@ -0,0 +1,206 @@
+"""
+定长的环形缓冲区以及带有容量上限/过期时间的容器, 用于限制Recorder的内存占用
+"""
+import sys
+from collections import OrderedDict, deque
+from time import monotonic
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    定长环形缓冲区, 写满之后覆盖最早的数据
+    写满之前按顺序写入, 底层数组从很小的容量开始按两倍增长, 不会为还没有写入的元素预先分配内存.
+    写满之后底层为两倍容量的numpy数组, 每个元素同时写入 i 与 i + capacity 两个位置,
+    最近的n个元素因此总是一段连续的内存, view/切片不需要复制.
+
+        buffer = RingBuffer(3, dtype=float)
+        for x in range(5):
+            buffer.append(x)
+        buffer.view()   # array([2., 3., 4.])
+    """
+    # 第一次分配的元素数量
+    initial = 16
+
+    def __init__(self, capacity: int, dtype=object):
+        if capacity < 1:
+            raise ValueError("capacity至少为1")
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(min(self.initial, capacity), dtype=self.dtype)
+        # 写满之后下一次覆盖的位置
+        self._index = 0
+        # 当前窗口的结束位置
+        self._end = 0
+        self._size = 0
+        # 累计写入的数量
+        self.total = 0
+
+    def _grow(self):
+        """ 没有写满时按两倍扩容, 写满时转换为两倍容量的布局 """
+        size, capacity = self._size, self.capacity
+        if size < capacity:
+            data = np.empty(min(size * 2, capacity), dtype=self.dtype)
+            data[:size] = self._data[:size]
+        else:
+            data = np.empty(capacity * 2, dtype=self.dtype)
+            data[:capacity] = self._data
+            data[capacity:] = self._data
+            self._end = capacity * 2
+        self._data = data
+
+    def append(self, value):
+        if self._size < self.capacity:
+            if self._size == len(self._data):
+                self._grow()
+            self._data[self._size] = value
+            self._size += 1
+            self._end = self._size
+        else:
+            if len(self._data) == self.capacity:
+                self._grow()
+            index = self._index
+            self._data[index] = value
+            self._data[index + self.capacity] = value
+            self._end = index + self.capacity + 1
+            self._index = index + 1 if index + 1 < self.capacity else 0
+        self.total += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def view(self, n: int = None) -> np.ndarray:
+        """ 最近的n个元素(默认全部), 返回只读的numpy视图 """
+        size = self._size if n is None else max(min(n, self._size), 0)
+        result = self._data[self._end - size:self._end]
+        result.flags.writeable = False
+        return result
+
+    @property
+    def last(self):
+        """ 最新的元素, 为空时返回None """
+        return self._data[self._end - 1] if self._size else None
+
+    def clear(self):
+        self._data = np.empty(min(self.initial, self.capacity), dtype=self.dtype)
+        self._index = 0
+        self._end = 0
+        self._size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def tolist(self) -> list:
+        return self.view().tolist()
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        return self.view()[item]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __repr__(self):
+        return f"RingBuffer(capacity={self.capacity}, size={self._size}, dtype={self.dtype})"
+
+
+class ExpiringDeque(deque):
+    """
+    带有容量上限(maxlen)以及过期时间(ttl, 秒)的deque, 过期的元素在下一次append时从左侧移除
+    """
+
+    def __init__(self, iterable=(), maxlen: int = None, ttl: float = None):
+        super().__init__(maxlen=maxlen)
+        self.ttl = ttl
+        self._stamps = deque(maxlen=maxlen)
+        for item in iterable:
+            self.append(item)
+
+    def append(self, item):
+        super().append(item)
+        self._stamps.append(monotonic())
+        self.expire()
+
+    def expire(self):
+        """ 移除过期的元素 """
+        if self.ttl is None:
+            return
+        deadline = monotonic() - self.ttl
+        stamps = self._stamps
+        while stamps and stamps[0] < deadline:
+            stamps.popleft()
+            self.popleft()
+
+    def clear(self):
+        super().clear()
+        self._stamps.clear()
+
+
+class ExpiringDict(OrderedDict):
+    """
+    带有容量上限(maxlen)以及过期时间(ttl, 秒)的字典
+    超过容量时淘汰最久没有写入的键(LRU), 过期的键在下一次写入时被移除
+    """
+
+    def __init__(self, maxlen: int = None, ttl: float = None):
+        super().__init__()
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self._stamps = {}
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        self._stamps[key] = monotonic()
+        self.expire()
+        if self.maxlen is not None:
+            while len(self) > self.maxlen:
+                self.popitem(last=False)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._stamps.pop(key, None)
+
+    def pop(self, key, *default):
+        self._stamps.pop(key, None)
+        return super().pop(key, *default)
+
+    def popitem(self, last=True):
+        key, value = super().popitem(last=last)
+        self._stamps.pop(key, None)
+        return key, value
+
+    def expire(self):
+        """ 移除过期的键 """
+        if self.ttl is None:
+            return
+        deadline = monotonic() - self.ttl
+        while self and self._stamps[next(iter(self))] < deadline:
+            self.popitem(last=False)
+
+    def clear(self):
+        super().clear()
+        self._stamps.clear()
+
+
+def sizeof(container) -> int:
+    """
+    估算容器占用的内存(字节), 包括容器本身, 元素以及元素的__dict__, 不继续递归
+    """
+    if isinstance(container, RingBuffer):
+        items = container.view() if container.dtype == object else ()
+        total = container.nbytes
+    else:
+        items = container.values() if isinstance(container, dict) else container
+        total = sys.getsizeof(container)
+    for item in items:
+        total += sys.getsizeof(item)
+        if hasattr(item, "__dict__"):
+            total += sys.getsizeof(item.__dict__)
+    return total
@@ -1,150 +1,178 @@
 # encoding: UTF-8
+from datetime import datetime
+from threading import Lock, Event as ThreadEvent
 
-from ctpbee.constant import BarData, TickData, SharedData, EVENT_BAR, EVENT_SHARED
+from ctpbee.constant import TickData, EVENT_BAR, EVENT_SESSION_CLOSE
+from ctpbee.data_handle.bar_engine import BarAggregator
+from ctpbee.data_handle.session import session_for
 from ctpbee.event_engine import Event
 
 
+class SessionClose:
+    """
+    EVENT_SESSION_CLOSE的数据, 分片引擎根据local_symbol把事件交给合约所在的处理线程
+    flush为True时推送全部未完成的k线, 处理完成之后设置done, 否则只结束已经到期的k线
+    """
+    __slots__ = ("local_symbol", "datetime", "flush", "done")
+
+    def __init__(self, local_symbol: str, now: datetime, flush: bool = False):
+        self.local_symbol = local_symbol
+        self.datetime = now
+        self.flush = flush
+        self.done = ThreadEvent() if flush else None
+
+
 class DataGenerator:
     """
     For:
     1. generating 1 minute bar data from tick data
-    2. generateing x minute bar data from 1 minute data
-    3, generate shared time data
+    2. generating x interval bar data (XMIN, such as 5, "30s", "1h", "1d") in the same pass
+    分时图数据以及当日统计见 ctpbee.data_handle.intraday
     """
 
-    def __init__(self, et_engine, app):
-        """Constructor"""
+    def __init__(self, et_engine, app, local_symbol: str = None):
+        """
+        Constructor
+        local_symbol对应的品种有交易时段模板时, k线按照交易时段对齐并在收盘之后由定时器结束
+        """
         self.rpo = et_engine
-        self.bar = None
         self.last_tick = None
-        self.local_symbol = None
-        self.last_price = None
-        self.pre_close = None
-        self.volume = None
-        self.last_volume = None
-        self.open_interest = None
-        self.average_price = None
-
-        self.denominator = 0
-        self.molecule = 0
+        self.local_symbol = local_symbol
         self.app = app
 
         self.XMIN = app.config.get("XMIN")
-        self._generator()
-        self.rd = None
+        self.aggregator = BarAggregator([1, *self.XMIN], session_for(local_symbol) if local_symbol else None)
+        # 已经请求过收盘的时段结束时间, 避免处理线程结束k线之前定时器重复请求
+        self._requested = None
 
-    def _generator(self):
-        for x in self.XMIN:
-            setattr(self, "min_{}".format(x), x)
-            setattr(self, "min_{}_bar".format(x), None)
+    @property
+    def bar(self):
+        """ 正在合成的1分钟k线 """
+        return self.aggregator.current(1)
 
     def update_tick(self, tick: TickData):
         """
-        Update new tick data into generator and new_shared time data.
+        Update new tick data into generator
         """
-        new_minute = False
-        self.last_price = tick.last_price
-        self.open_interest = tick.open_interest
-        self.volume = tick.volume
-
-        # 更新均价线
-        self.molecule = self.molecule + tick.last_price * tick.volume
-        self.denominator = self.denominator + tick.volume
-        try:
-            self.average_price = self.molecule / self.denominator
-        except ZeroDivisionError:
-            self.average_price = tick.last_price
-
-        if self.last_volume is None:
-            self.last_volume = tick.volume
         if self.local_symbol is None:
             self.local_symbol = tick.local_symbol
-        if not self.bar:
-            new_minute = True
-        elif self.bar.datetime.minute != tick.datetime.minute:
-            self.bar.datetime = self.bar.datetime.replace(
-                second=0, microsecond=0
-            )
-            self.bar.interval = 1
-            event = Event(type=EVENT_BAR, data=self.bar)
-            self.rpo.put(event)
-            [self.update_bar(x, getattr(self, "min_{}_bar".format(x)), self.bar) for x in self.XMIN]
-            new_minute = True
-        if new_minute:
-            if self.app.config.get("SHARED_FUNC"):
-                shared = SharedData(last_price=round(self.last_price, 2), datetime=tick.datetime,
-                                    local_symbol=self.local_symbol,
-                                    open_interest=self.open_interest, average_price=round(self.average_price, 2),
-                                    volume=self.volume - self.last_volume, gateway_name=tick.gateway_name)
-                event = Event(type=EVENT_SHARED, data=shared)
-                self.rpo.put(event)
-            self.last_volume = tick.volume
-
-            self.bar = BarData(
-                symbol=tick.symbol,
-                exchange=tick.exchange,
-                datetime=tick.datetime,
-                gateway_name=tick.gateway_name,
-                open_price=tick.last_price,
-                high_price=tick.last_price,
-                low_price=tick.last_price,
-                close_price=tick.last_price,
-            )
-        else:
-            self.bar.high_price = max(self.bar.high_price, tick.last_price)
-            self.bar.low_price = min(self.bar.low_price, tick.last_price)
-            self.bar.close_price = tick.last_price
-            self.bar.datetime = tick.datetime
-
-        if self.last_tick:
-            volume_change = tick.volume - self.last_tick.volume
-            self.bar.volume += max(volume_change, 0)
+        for bar in self.aggregator.update_tick(tick):
+            self.rpo.put(Event(type=EVENT_BAR, data=bar))
         self.last_tick = tick
 
-    def update_bar(self, xmin, xmin_bar: BarData, bar: BarData):
+    def due(self, now: datetime) -> bool:
+        """ 定时器线程调用, 只读取合成器, 交易时段已经结束并且还没有请求过收盘时返回True """
+        expire = self.aggregator.expire
+        if expire is None or now < expire or expire == self._requested:
+            return False
+        self._requested = expire
+        return True
+
+    def check(self, now: datetime):
+        """ 在合约所在的处理线程中调用, 交易时段结束之后推送已经结束的k线 """
+        for bar in self.aggregator.close_session(now):
+            self.rpo.put(Event(type=EVENT_BAR, data=bar))
+
+    def generate(self):
+        """ 推送所有未完成的k线 """
+        for bar in self.aggregator.flush():
+            self.rpo.put(Event(type=EVENT_BAR, data=bar))
+
+
+class GeneratorManager:
+    """
+    按照local_symbol管理每个合约的DataGenerator
+        manager.create("rb2010.SHFE")     订阅时提前创建, 收到的第一个tick就参与k线合成
+        manager.update_tick(tick)         没有对应的合成器时自动创建
+        manager.check(now)                定时器调用, 为交易时段已经结束的合约投递EVENT_SESSION_CLOSE
+        manager.close_session(data)       处理EVENT_SESSION_CLOSE, 推送已经结束的k线
+        manager.request_flush()           收盘时为每个合约投递flush=True的EVENT_SESSION_CLOSE
+        manager.flush()                   直接推送全部未完成的k线, 只能在事件引擎停止之后调用
+
+    合成器不会随着Recorder.clear_all或者重新登录被销毁, 正在合成的k线保持不变, 也不会在回收时推送未完成的k线.
+    策略线程订阅以及分片引擎的多个处理线程会同时创建合成器, 遍历时使用副本.
+    """
+
+    def __init__(self, event_engine, app):
+        self.event_engine = event_engine
+        self.app = app
+        self.generators = {}
+        self._lock = Lock()
+
+    def create(self, local_symbol: str) -> DataGenerator:
+        """ 创建合约的合成器, 已经存在时直接返回 """
+        generator = self.generators.get(local_symbol)
+        if generator is None:
+            with self._lock:
+                generator = self.generators.get(local_symbol)
+                if generator is None:
+                    generator = DataGenerator(self.event_engine, self.app, local_symbol)
+                    self.generators[local_symbol] = generator
+        return generator
+
+    def get(self, local_symbol: str):
+        return self.generators.get(local_symbol)
+
+    def update_tick(self, tick, conflated=()):
+        """ 更新tick, conflated为开启tick合并时被合并掉的tick, 依旧需要参与k线合成 """
+        generator = self.generators.get(tick.local_symbol)
+        if generator is None:
+            generator = self.create(tick.local_symbol)
+        for skipped in conflated:
+            generator.update_tick(skipped)
+        generator.update_tick(tick)
+
+    def check(self, now: datetime):
         """
-        Update 1 minute bar into generator
+        合成器只能在合约所在的处理线程中修改, 定时器不直接结束k线,
+        而是投递EVENT_SESSION_CLOSE, 与该合约的tick一起按顺序处理
         """
-        if not xmin_bar:
-            xmin_bar = BarData(
-                symbol=bar.symbol,
-                exchange=bar.exchange,
-                datetime=bar.datetime,
-                gateway_name=bar.gateway_name,
-                open_price=bar.open_price,
-                high_price=bar.high_price,
-                low_price=bar.low_price
-            )
-        else:
-            xmin_bar.high_price = max(
-                xmin_bar.high_price, bar.high_price)
-            xmin_bar.low_price = min(
-                xmin_bar.low_price, bar.low_price)
-
-        xmin_bar.close_price = bar.close_price
-        xmin_bar.volume += int(bar.volume)
-        if not (bar.datetime.minute + 1) % xmin:
-            xmin_bar.datetime = xmin_bar.datetime.replace(
-                second=0, microsecond=0
-            )
-            xmin_bar.interval = xmin
-            event = Event(type=EVENT_BAR, data=xmin_bar)
-            self.rpo.put(event)
-            xmin_bar = None
+        for local_symbol, generator in list(self.generators.items()):
+            if generator.due(now):
+                self.event_engine.put(Event(EVENT_SESSION_CLOSE, SessionClose(local_symbol, now)))
+
+    def close_session(self, data: SessionClose):
+        generator = self.generators.get(data.local_symbol)
+        if not data.flush:
+            if generator is not None:
+                generator.check(data.datetime)
+            return
+        try:
+            if generator is not None:
+                generator.generate()
+        finally:
+            data.done.set()
 
-    def generate(self):
-        if self.bar is not None:
-            self.bar.interval = 1
-            event = Event(type=EVENT_BAR, data=self.bar)
-            self.rpo.put(event)
-        for x in self.XMIN:
-            if self.bar is not None:
-                bar = getattr(self, "min_{}_bar".format(x))
-                bar.interval = x
-                event = Event(type=EVENT_BAR, data=bar)
-                self.rpo.put(event)
-        self.bar = None
-        [setattr(self, "min_{}_bar".format(x), None) for x in self.XMIN]
-
-    def __del__(self):
-        self.generate()
+    def request_flush(self, local_symbol: str = None) -> list:
+        """
+        为指定合约(默认全部合约)投递EVENT_SESSION_CLOSE, 由合约所在的处理线程推送未完成的k线,
+        返回投递的SessionClose, 可以通过done等待处理完成
+        """
+        now = datetime.now()
+        symbols = [local_symbol] if local_symbol is not None else list(self.generators)
+        requests = [SessionClose(symbol, now, flush=True) for symbol in symbols if symbol in self.generators]
+        for request in requests:
+            self.event_engine.put(Event(EVENT_SESSION_CLOSE, request))
+        return requests
+
+    def flush(self, local_symbol: str = None):
+        """ 直接推送指定合约(默认全部合约)未完成的k线, 事件引擎运行时请使用request_flush """
+        if local_symbol is not None:
+            generator = self.generators.get(local_symbol)
+            if generator is not None:
+                generator.generate()
+            return
+        for generator in list(self.generators.values()):
+            generator.generate()
+
+    def remove(self, local_symbol: str):
+        """ 移除合约的合成器, 未完成的k线会先被推送 """
+        generator = self.generators.pop(local_symbol, None)
+        if generator is not None:
+            generator.generate()
+
+    def __contains__(self, local_symbol):
+        return local_symbol in self.generators
+
+    def __len__(self):
+        return len(self.generators)
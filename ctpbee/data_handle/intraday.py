@@ -0,0 +1,142 @@
+"""
+合约当日统计: 成交量增量, 成交均价, 成交额以及持仓量变化
+"""
+from datetime import datetime
+
+from ctpbee.constant import IntradayData, SharedData
+from ctpbee.data_handle.session import session_for
+
+
+class IntradayStats:
+    """
+    单个合约当前交易日的统计, 只保存累计值, 内存占用与tick数量无关.
+
+    交易日切换的判断: 合约有交易时段模板时按照模板推算的交易日(夜盘属于下一个交易日),
+    另外累计成交量变小时说明交易所已经开始新的交易日. 切换时所有累计值重新开始.
+
+    成交量增量与k线合成一致: 第一个tick没有增量, 新交易日的第一个tick增量为当前的累计成交量.
+    成交均价只统计观察到的成交量增量, 启动时当天已经发生的成交不计入均价.
+    """
+    __slots__ = ("local_symbol", "gateway_name", "clock", "datetime", "trading_day", "day", "last_price",
+                 "volume", "delta_volume", "observed", "turnover", "open_interest", "open_oi", "oi_delta",
+                 "minute", "minute_volume", "last_minute_volume", "new_minute")
+
+    def __init__(self, local_symbol: str):
+        self.local_symbol = local_symbol
+        self.gateway_name = ""
+        self.clock = session_for(local_symbol)
+        self.datetime = None
+        self.trading_day = None
+        self.day = None
+        self.last_price = 0
+        self.volume = None
+        self.delta_volume = 0
+        self.observed = 0
+        self.turnover = 0
+        self.open_interest = 0
+        self.open_oi = 0
+        self.oi_delta = 0
+        self.minute = None
+        self.minute_volume = 0
+        self.last_minute_volume = 0
+        self.new_minute = False
+
+    def _new_day(self, tick) -> bool:
+        """ 判断tick是否属于新的交易日, 同时更新交易日 """
+        new = self.volume is not None and tick.volume < self.volume
+        if self.clock is not None:
+            located = self.clock.locate(tick.datetime)
+            if located is not None:
+                day = located[0]
+                if self.day is not None and day != self.day:
+                    new = True
+                self.day = day
+        if new or self.trading_day is None:
+            if self.day is not None:
+                self.trading_day = datetime.fromordinal(self.day)
+            else:
+                self.trading_day = datetime(tick.datetime.year, tick.datetime.month, tick.datetime.day)
+        return new
+
+    def update(self, tick) -> bool:
+        """ 更新tick, 返回是否进入了新的一分钟(用于分时图) """
+        first = self.volume is None
+        if self._new_day(tick):
+            self.observed = self.turnover = 0
+            self.delta_volume = tick.volume
+            self.open_oi = self.open_interest = tick.open_interest
+        elif first:
+            self.delta_volume = 0
+            self.open_oi = self.open_interest = tick.open_interest
+        else:
+            self.delta_volume = tick.volume - self.volume
+        self.oi_delta = tick.open_interest - self.open_interest
+        self.open_interest = tick.open_interest
+        self.volume = tick.volume
+        self.last_price = tick.last_price
+        self.observed += self.delta_volume
+        self.turnover += tick.last_price * self.delta_volume
+        self.datetime = tick.datetime
+        self.gateway_name = tick.gateway_name
+
+        minute = tick.datetime.replace(second=0, microsecond=0)
+        self.new_minute = minute != self.minute
+        if self.new_minute:
+            self.minute = minute
+            self.last_minute_volume = self.minute_volume
+            self.minute_volume = self.delta_volume
+        else:
+            self.minute_volume += self.delta_volume
+        return self.new_minute
+
+    @property
+    def vwap(self) -> float:
+        return self.turnover / self.observed if self.observed else self.last_price
+
+    def snapshot(self) -> IntradayData:
+        return IntradayData(local_symbol=self.local_symbol, datetime=self.datetime, gateway_name=self.gateway_name,
+                            trading_day=self.trading_day, last_price=self.last_price, volume=self.volume,
+                            delta_volume=self.delta_volume, turnover=self.turnover, vwap=self.vwap,
+                            open_interest=self.open_interest, oi_change=self.open_interest - self.open_oi,
+                            oi_delta=self.oi_delta)
+
+    def shared(self) -> SharedData:
+        """ 分时图数据, volume为上一分钟的成交量 """
+        return SharedData(local_symbol=self.local_symbol, datetime=self.datetime, gateway_name=self.gateway_name,
+                          last_price=round(self.last_price, 2), average_price=round(self.vwap, 2),
+                          open_interest=self.open_interest, volume=self.last_minute_volume)
+
+
+class IntradayAnalytics:
+    """
+    Recorder中所有合约的当日统计, 以及按合约的订阅关系
+        analytics.update(tick)                      更新统计, 返回IntradayStats
+        analytics.get("rb2010.SHFE")                IntradayData快照
+        analytics.subscribe("rb2010.SHFE", api)     插件订阅之后通过on_intraday收到每个tick之后的统计
+    """
+
+    def __init__(self):
+        self.stats = {}
+        # local_symbol -> {extension_name: extension}
+        self.subscribers = {}
+
+    def update(self, tick) -> IntradayStats:
+        stats = self.stats.get(tick.local_symbol)
+        if stats is None:
+            stats = self.stats[tick.local_symbol] = IntradayStats(tick.local_symbol)
+        stats.update(tick)
+        return stats
+
+    def get(self, local_symbol: str):
+        stats = self.stats.get(local_symbol)
+        return stats.snapshot() if stats is not None and stats.datetime is not None else None
+
+    def subscribe(self, local_symbol: str, extension):
+        self.subscribers.setdefault(local_symbol, {})[extension.extension_name] = extension
+
+    def unsubscribe(self, local_symbol: str, extension):
+        subscribers = self.subscribers.get(local_symbol)
+        if subscribers is not None:
+            subscribers.pop(extension.extension_name, None)
+            if not subscribers:
+                del self.subscribers[local_symbol]
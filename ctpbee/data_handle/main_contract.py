@@ -0,0 +1,77 @@
+"""
+主力合约索引
+"""
+
+
+class _Product:
+    """ 单个品种下每个合约最新的行情快照, 以及当前的主力合约与昨日主力合约 """
+    __slots__ = ("latest", "main", "pre_main")
+
+    def __init__(self):
+        self.latest = {}
+        self.main = None
+        self.pre_main = None
+
+
+class MainContractIndex:
+    """
+    按品种维护每个合约最新的行情快照(LastData), 随着数据到达增量更新
+        main:     持仓量(open_interest)最大的合约, 即当前主力合约
+        pre_main: 昨持仓(pre_open_interest)最大的合约, 即昨日主力合约
+    查询都是常数时间. 只有当前主力合约的持仓量下降时才需要在该品种的合约之间重新比较.
+    """
+
+    def __init__(self):
+        self._products = {}
+
+    @staticmethod
+    def product_of(symbol: str) -> str:
+        """ 过滤掉数字, 以大写的品种代码作为key, 例如 rb2010 -> RB """
+        return "".join([x for x in symbol if not x.isdigit()]).upper()
+
+    def update(self, data):
+        key = self.product_of(data.symbol)
+        product = self._products.get(key)
+        if product is None:
+            product = self._products[key] = _Product()
+        previous = product.latest.get(data.local_symbol)
+        product.latest[data.local_symbol] = data
+        product.main = self._track(product, product.main, data, previous, "open_interest")
+        product.pre_main = self._track(product, product.pre_main, data, previous, "pre_open_interest")
+
+    @staticmethod
+    def _track(product: _Product, current, data, previous, field):
+        if current is None:
+            return data
+        if current.local_symbol == data.local_symbol:
+            if previous is not None and getattr(data, field) < getattr(previous, field):
+                # 当前主力的持仓下降, 其他合约可能超过它
+                return max(product.latest.values(), key=lambda x: getattr(x, field))
+            return data
+        if getattr(data, field) > getattr(current, field):
+            return data
+        return current
+
+    def main(self, code: str):
+        """ 品种当前的主力合约, 返回最新的行情快照 """
+        product = self._products.get(code.upper())
+        return product.main if product is not None else None
+
+    def pre_main(self, code: str):
+        """ 品种的昨日主力合约, 返回最新的行情快照 """
+        product = self._products.get(code.upper())
+        return product.pre_main if product is not None else None
+
+    def main_list(self) -> list:
+        """ 所有品种主力合约的local_symbol """
+        return [product.main.local_symbol for product in self._products.values()]
+
+    def snapshots(self) -> dict:
+        """ {品种: [每个合约最新的行情快照]} """
+        return {key: list(product.latest.values()) for key, product in self._products.items()}
+
+    def clear(self):
+        self._products.clear()
+
+    def __len__(self):
+        return sum(len(product.latest) for product in self._products.values())
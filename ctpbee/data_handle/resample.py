@@ -0,0 +1,76 @@
+"""
+历史tick批量合成k线
+"""
+from datetime import datetime
+
+import numpy as np
+
+from ctpbee.data_handle.bar_engine import WallClock, interval_specs
+from ctpbee.data_handle.bar_store import BAR_DTYPE
+from ctpbee.data_handle.session import session_for
+
+
+def resample(timestamps, prices, volumes, intervals=(1,), clock=None) -> dict:
+    """
+    使用numpy数组一次合成多个周期的k线, 返回 {interval: BAR_DTYPE结构化数组}.
+        timestamps: datetime64数组, prices: 最新价, volumes: 累计成交量, 按时间排列
+
+    与实盘的BarAggregator使用同样的时间对齐(clock.locate_array与clock.locate使用同一张表)以及周期解析,
+    对同样的tick得到的k线与BarAggregator逐个更新之后再flush的结果一致:
+    不在交易时段内的tick被忽略, 第一个tick没有成交量增量, 累计成交量变小时增量为当前的累计成交量.
+    """
+    clock = clock or WallClock()
+    specs = interval_specs(intervals)
+    timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    known = ~np.isnat(timestamps)
+    timestamps, prices, volumes = timestamps[known], prices[known], volumes[known]
+    days, offsets, valid = clock.locate_array(timestamps)
+    days, offsets, prices, volumes = days[valid], offsets[valid], prices[valid], volumes[valid]
+    if not len(days):
+        return {label: np.empty(0, dtype=BAR_DTYPE) for label, _, _ in specs}
+
+    delta = np.zeros(len(volumes))
+    change = np.diff(volumes)
+    delta[1:] = np.where(change >= 0, change, volumes[1:])
+    # 已经经过的交易日数量, 用于多日k线
+    day_count = np.concatenate(([0], np.cumsum(days[1:] != days[:-1])))
+
+    result = {}
+    for label, seconds, number in specs:
+        if seconds:
+            starts = offsets - offsets % seconds
+            keys = days * 86400 + starts
+        else:
+            keys = day_count // number
+        first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        last = np.concatenate((first[1:], [len(keys)])) - 1
+        bars = np.empty(len(first), dtype=BAR_DTYPE)
+        if seconds:
+            bars["datetime"] = [clock.to_datetime(day, start) for day, start in
+                                zip(days[first].tolist(), starts[first].tolist())]
+        else:
+            bars["datetime"] = [datetime.fromordinal(day) for day in days[first].tolist()]
+        bars["open_price"] = prices[first]
+        bars["high_price"] = np.maximum.reduceat(prices, first)
+        bars["low_price"] = np.minimum.reduceat(prices, first)
+        bars["close_price"] = prices[last]
+        bars["volume"] = np.add.reduceat(delta, first)
+        result[label] = bars
+    return result
+
+
+def resample_batch(batch, intervals=(1,)) -> dict:
+    """ TickBatch按照合约合成k线, 返回 {local_symbol: {interval: 结构化数组}}, 使用合约对应的交易时段模板 """
+    return {local_symbol: resample(part["datetime"], part["last_price"], part["volume"], intervals,
+                                   session_for(local_symbol))
+            for local_symbol, part in batch.split().items()}
+
+
+def to_rows(bars: np.ndarray, local_symbol: str, interval) -> list:
+    """ 结构化数组转换为字典列表, 可以直接作为回测的k线数据传入 VessData """
+    symbol, _, exchange = local_symbol.rpartition(".")
+    names = bars.dtype.names
+    return [dict(zip(names, row), symbol=symbol, exchange=exchange, local_symbol=local_symbol, interval=interval)
+            for row in bars.tolist()]
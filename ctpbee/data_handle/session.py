@@ -0,0 +1,203 @@
+"""
+期货交易时段模板
+"""
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ctpbee.data_handle.bar_engine import EPOCH, split_timestamps
+
+# 日盘
+COMMODITY_DAY = (("09:00", "10:15"), ("10:30", "11:30"), ("13:30", "15:00"))
+INDEX_DAY = (("09:30", "11:30"), ("13:00", "15:00"))
+BOND_DAY = (("09:30", "11:30"), ("13:00", "15:15"))
+
+# 夜盘
+NIGHT_2300 = (("21:00", "23:00"),)
+NIGHT_0100 = (("21:00", "01:00"),)
+NIGHT_0230 = (("21:00", "02:30"),)
+
+# {交易所: {品种: 交易时段}}, 品种代码统一为小写, 不在表中的品种不使用交易时段模板
+PRODUCT_SESSIONS = {
+    "SHFE": {
+        **dict.fromkeys(("cu", "al", "zn", "pb", "ni", "sn", "ss", "ao"), NIGHT_0100 + COMMODITY_DAY),
+        **dict.fromkeys(("au", "ag"), NIGHT_0230 + COMMODITY_DAY),
+        **dict.fromkeys(("rb", "hc", "bu", "ru", "fu", "sp", "br"), NIGHT_2300 + COMMODITY_DAY),
+        "wr": COMMODITY_DAY,
+    },
+    "INE": {
+        "sc": NIGHT_0230 + COMMODITY_DAY,
+        "bc": NIGHT_0100 + COMMODITY_DAY,
+        **dict.fromkeys(("nr", "lu"), NIGHT_2300 + COMMODITY_DAY),
+    },
+    "DCE": {
+        **dict.fromkeys(("a", "b", "m", "y", "p", "c", "cs", "i", "j", "jm", "l", "v", "pp", "eg", "eb", "pg", "rr"),
+                        NIGHT_2300 + COMMODITY_DAY),
+        **dict.fromkeys(("jd", "lh", "fb", "bb"), COMMODITY_DAY),
+    },
+    "CZCE": {
+        **dict.fromkeys(("sr", "cf", "cy", "ta", "ma", "fg", "rm", "oi", "zc", "sa", "pf", "px", "sh"),
+                        NIGHT_2300 + COMMODITY_DAY),
+        **dict.fromkeys(("ap", "cj", "ur", "jr", "lr", "pm", "ri", "rs", "wh", "pk", "sf", "sm"), COMMODITY_DAY),
+    },
+    "CFFEX": {
+        **dict.fromkeys(("if", "ih", "ic", "im"), INDEX_DAY),
+        **dict.fromkeys(("t", "tf", "ts", "tl"), BOND_DAY),
+    },
+}
+
+_PRODUCT = re.compile(r"[A-Za-z]+")
+
+
+def _minute(text: str) -> int:
+    hour, minute = text.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def _shift(minute: int) -> int:
+    """ 0: 日盘, 交易日为当天; 1: 夜盘0点之前, 交易日为下一个工作日; 2: 夜盘0点之后, 交易日为前一天的下一个工作日 """
+    if minute >= 18 * 60:
+        return 1
+    if minute < 6 * 60:
+        return 2
+    return 0
+
+
+def _next_weekday(ordinal: int) -> int:
+    ordinal += 1
+    while datetime.fromordinal(ordinal).weekday() >= 5:
+        ordinal += 1
+    return ordinal
+
+
+def _previous_weekday(ordinal: int) -> int:
+    ordinal -= 1
+    while datetime.fromordinal(ordinal).weekday() >= 5:
+        ordinal -= 1
+    return ordinal
+
+
+class SessionTemplate:
+    """
+    一个品种一天内的交易时段, 按照交易顺序给出(夜盘在前).
+    构造时预先计算每个自然分钟对应的交易分钟序号, 以及每个交易分钟所在时段的结束位置, 查询都是一次列表访问.
+
+    k线按照交易日内已经交易的时间对齐, 例如商品期货的1小时k线为 21:00, 22:00, 9:00, 10:00(包括10:15-10:30的休息)...
+    与 WallClock 相同, 提供 locate(dt) / to_datetime(day, offset), 另外提供 session_end 给定时器收盘使用.
+
+    交易日按照工作日推算, 没有考虑节假日.
+    """
+
+    def __init__(self, segments, delay: float = 3):
+        self.segments = tuple(segments)
+        # 时段结束之后等待delay秒再由定时器结束k线, 交易所在收盘时刻之后仍然会推送一个tick
+        self.delay = timedelta(seconds=delay)
+        # 自然分钟 -> (交易分钟序号, 秒数处理方式, 交易日推算方式), 不在交易时段的分钟为None
+        # 秒数处理方式 0: 保持; 1: 时段结束时刻的tick计入最后一分钟; 2: 开盘前一分钟的集合竞价tick计入第一分钟
+        self._minutes = [None] * 1440
+        # 交易分钟序号 -> (自然分钟, 交易日推算方式)
+        self._clock = []
+        # 交易分钟序号 -> (时段结束的交易秒数, 时段结束的自然分钟, 是否为当天最后一个时段)
+        self._ends = []
+        boundaries = []
+        for number, (begin, end) in enumerate(self.segments):
+            begin, end = _minute(begin), _minute(end)
+            length = (end - begin) % 1440
+            start = len(self._clock)
+            for i in range(length):
+                minute = (begin + i) % 1440
+                self._minutes[minute] = (start + i, 0, _shift(minute))
+                self._clock.append((minute, _shift(minute)))
+            finish = len(self._clock) * 60
+            self._ends.extend([(finish, end, number == len(self.segments) - 1)] * length)
+            boundaries.append((begin, start, end, len(self._clock) - 1))
+        for begin, start, end, last in boundaries:
+            if self._minutes[end] is None:
+                self._minutes[end] = (last, 1, _shift(end))
+            before = (begin - 1) % 1440
+            if self._minutes[before] is None:
+                self._minutes[before] = (start, 2, _shift(before))
+        self._days = {}
+        # 向量化查询使用的numpy版本
+        self._index = np.array([-1 if entry is None else entry[0] for entry in self._minutes])
+        self._mode = np.array([0 if entry is None else entry[1] for entry in self._minutes])
+        self._shift = np.array([0 if entry is None else entry[2] for entry in self._minutes])
+
+    @property
+    def length(self) -> int:
+        """ 一个交易日的交易秒数 """
+        return len(self._clock) * 60
+
+    def _trading_day(self, ordinal: int, shift: int) -> int:
+        key = (ordinal, shift)
+        day = self._days.get(key)
+        if day is None:
+            if shift == 1:
+                day = _next_weekday(ordinal)
+            elif shift == 2:
+                day = _next_weekday(ordinal - 1)
+            else:
+                day = ordinal
+            if len(self._days) > 64:
+                self._days.clear()
+            self._days[key] = day
+        return day
+
+    def _date(self, day: int, shift: int) -> int:
+        """ 交易日中某个时段所在的自然日 """
+        if shift == 1:
+            return _previous_weekday(day)
+        if shift == 2:
+            return _previous_weekday(day) + 1
+        return day
+
+    def locate(self, dt: datetime):
+        """ (交易日序号, 当天已经交易的秒数), 不在交易时段内返回None """
+        entry = self._minutes[dt.hour * 60 + dt.minute]
+        if entry is None:
+            return None
+        index, mode, shift = entry
+        second = dt.second if mode == 0 else 59 if mode == 1 else 0
+        return self._trading_day(dt.toordinal(), shift), index * 60 + second
+
+    def locate_array(self, timestamps) -> tuple:
+        """ locate的向量化版本, 返回 (交易日序号数组, 交易秒数数组, 是否在交易时段内), 不在交易时段内的位置数值无意义 """
+        dates, seconds = split_timestamps(timestamps)
+        minute, second = seconds // 60, seconds % 60
+        index, mode, shift = self._index[minute], self._mode[minute], self._shift[minute]
+        offsets = index * 60 + np.where(mode == 0, second, np.where(mode == 1, 59, 0))
+        # 与_trading_day一致: 夜盘0点之前为下一个工作日, 0点之后为前一天的下一个工作日
+        days = np.where(shift == 1, np.busday_offset(dates + 1, 0, roll="forward"),
+                        np.where(shift == 2, np.busday_offset(dates, 0, roll="forward"), dates))
+        return days.astype(np.int64) + EPOCH, offsets, index >= 0
+
+    def to_datetime(self, day: int, offset: int) -> datetime:
+        minute, shift = self._clock[offset // 60]
+        return datetime.fromordinal(self._date(day, shift)) + timedelta(minutes=minute, seconds=offset % 60)
+
+    def session_end(self, day: int, offset: int) -> tuple:
+        """
+        offset所在时段的结束: (定时器结束k线的时间, 时段结束的交易秒数, 是否为当天最后一个时段)
+        """
+        finish, minute, last = self._ends[offset // 60]
+        at = datetime.fromordinal(self._date(day, _shift(minute))) + timedelta(minutes=minute)
+        return at + self.delay, finish, last
+
+
+_TEMPLATES = {}
+
+
+def session_for(local_symbol: str):
+    """ 根据local_symbol取到交易时段模板, 没有对应模板时返回None """
+    symbol, _, exchange = local_symbol.rpartition(".")
+    match = _PRODUCT.match(symbol)
+    if match is None:
+        return None
+    segments = PRODUCT_SESSIONS.get(exchange, {}).get(match.group().lower())
+    if segments is None:
+        return None
+    template = _TEMPLATES.get(segments)
+    if template is None:
+        template = _TEMPLATES[segments] = SessionTemplate(segments)
+    return template
@@ -0,0 +1,183 @@
+"""
+按列保存的批量tick
+"""
+from datetime import datetime
+from operator import attrgetter
+
+import numpy as np
+
+from ctpbee.constant import TickData, EXCHANGE_MAPPING
+
+# 字段名与TickData一致, 字符串字段使用定长类型, 合约代码/交易所/接口名称只包含ascii字符
+_STRINGS = {"symbol": "S16", "exchange": "S8", "gateway_name": "S8", "name": "U16"}
+TICK_DTYPE = np.dtype(
+    [(name, _STRINGS.get(name, "datetime64[us]" if name == "datetime" else "f8"))
+     for name in TickData.__annotations__ if name != "local_symbol"]
+)
+_NAMES = TICK_DTYPE.names
+_BYTES = [name for name in _NAMES if TICK_DTYPE[name].kind == "S"]
+_DEFAULTS = tuple("" if name in _STRINGS else np.datetime64("NaT") if name == "datetime" else 0 for name in _NAMES)
+_GETTER = attrgetter(*_NAMES)
+_EXCHANGE = _NAMES.index("exchange")
+# 定长字符串字段最多保存的字符数
+_WIDTHS = {name: TICK_DTYPE[name].itemsize // (4 if TICK_DTYPE[name].kind == "U" else 1) for name in _STRINGS}
+
+
+def _check_width(name: str, values):
+    """ numpy会静默截断超过定长的字符串, 写入之前检查 """
+    values = np.asarray(values)
+    if not values.size or values.dtype.kind not in "OSU":
+        return
+    lengths = np.char.str_len(values.astype(str) if values.dtype.kind == "O" else values)
+    if lengths.max() > _WIDTHS[name]:
+        longest = values.flat[int(lengths.argmax())]
+        raise ValueError(f"字段{name}的值{longest!r}超过{_WIDTHS[name]}个字符, 无法保存到TickBatch")
+
+
+class TickBatch:
+    """
+    一组tick, 每个字段保存为numpy结构化数组的一列, 大量tick在传输/导出/回测时不需要为每个tick创建python对象.
+
+        batch = TickBatch.from_ticks(ticks)
+        batch["last_price"].mean()          # 单独一列
+        batch.split()                       # {local_symbol: TickBatch}
+        batch.to_ticks()                    # 转换回TickData列表, 也可以直接迭代
+
+    通过事件引擎推送 Event(EVENT_TICK_BATCH, batch) 时, Recorder按照合约拆分之后交给插件的on_tick_batch,
+    只包含一个合约的batch拥有local_symbol, 因此也会被ShardedEngine分配到该合约所在的线程.
+    """
+    __slots__ = ("array", "_local_symbol")
+
+    def __init__(self, array: np.ndarray = None):
+        self.array = np.empty(0, dtype=TICK_DTYPE) if array is None else array
+        self._local_symbol = False
+
+    @classmethod
+    def from_ticks(cls, ticks) -> "TickBatch":
+        rows = []
+        for tick in ticks:
+            try:
+                row = list(_GETTER(tick))
+            except AttributeError:
+                row = [getattr(tick, name, default) for name, default in zip(_NAMES, _DEFAULTS)]
+            exchange = row[_EXCHANGE]
+            row[_EXCHANGE] = getattr(exchange, "value", exchange)
+            rows.append(tuple(row))
+        for name in _STRINGS:
+            index = _NAMES.index(name)
+            _check_width(name, [row[index] for row in rows])
+        return cls(np.array(rows, dtype=TICK_DTYPE))
+
+    @classmethod
+    def from_columns(cls, **columns) -> "TickBatch":
+        """
+        根据按列的数据创建, 缺少的列为0或者空字符串, 缺少datetime时为NaT(转换为tick时为None),
+        字符串超过定长(symbol 16, exchange/gateway_name 8, name 16个字符)时抛出ValueError
+            TickBatch.from_columns(symbol="rb2010", exchange="SHFE", datetime=timestamps, last_price=prices, volume=volumes)
+        """
+        size = max((len(value) for value in columns.values() if np.ndim(value)), default=1)
+        array = np.zeros(size, dtype=TICK_DTYPE)
+        array["datetime"] = np.datetime64("NaT")
+        for name, value in columns.items():
+            if name not in _NAMES:
+                raise ValueError(f"TickData中不存在字段{name}")
+            value = getattr(value, "value", value)
+            if name in _STRINGS:
+                _check_width(name, value)
+            array[name] = value
+        return cls(array)
+
+    @classmethod
+    def concat(cls, batches) -> "TickBatch":
+        return cls(np.concatenate([batch.array for batch in batches]))
+
+    def tick(self, index: int) -> TickData:
+        """ 第index个tick """
+        return self._to_tick(self.array[index].item())
+
+    @staticmethod
+    def _to_dict(row: tuple) -> dict:
+        kwargs = dict(zip(_NAMES, row))
+        for name in _BYTES:
+            kwargs[name] = kwargs[name].decode()
+        if not isinstance(kwargs["datetime"], datetime):
+            # NaT
+            kwargs["datetime"] = None
+        return kwargs
+
+    @classmethod
+    def _to_tick(cls, row: tuple) -> TickData:
+        kwargs = cls._to_dict(row)
+        kwargs["exchange"] = EXCHANGE_MAPPING.get(kwargs["exchange"], kwargs["exchange"])
+        return TickData(**kwargs)
+
+    def to_ticks(self) -> list:
+        return [self._to_tick(row) for row in self.array.tolist()]
+
+    def rows(self):
+        """ 逐个生成字典形式的tick, exchange为字符串并附带local_symbol, 用于回测数据 """
+        for index in range(len(self.array)):
+            row = self._to_dict(self.array[index].item())
+            row["local_symbol"] = f"{row['symbol']}.{row['exchange']}"
+            yield row
+
+    def __iter__(self):
+        """ 逐个生成TickData, 不会一次性创建全部对象 """
+        for index in range(len(self.array)):
+            yield self.tick(index)
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, item):
+        """ 字段名返回一列, 整数返回TickData, 切片或者布尔数组返回新的TickBatch """
+        if isinstance(item, str):
+            return self.array[item]
+        if isinstance(item, (int, np.integer)):
+            return self.tick(item)
+        return TickBatch(self.array[item])
+
+    def local_symbols(self) -> np.ndarray:
+        """ 每个tick的local_symbol """
+        return np.char.add(np.char.add(self.array["symbol"], b"."), self.array["exchange"]).astype(str)
+
+    def split(self) -> dict:
+        """
+        按照合约拆分, {local_symbol: TickBatch}, 合约内保持原有顺序.
+        只有一个合约时返回共享数据的视图, 对结果调用freeze不会影响原来的batch
+        """
+        if not len(self.array):
+            return {}
+        keys, inverse = np.unique(self.local_symbols(), return_inverse=True)
+        if len(keys) == 1:
+            return {str(keys[0]): TickBatch(self.array.view())}
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        return {str(key): TickBatch(self.array[order[bounds[i]:bounds[i + 1]]]) for i, key in enumerate(keys)}
+
+    @property
+    def local_symbol(self):
+        """ 只包含一个合约时返回该合约的local_symbol, 否则为None """
+        if self._local_symbol is False:
+            symbols = np.unique(self.local_symbols()) if len(self.array) else ()
+            self._local_symbol = str(symbols[0]) if len(symbols) == 1 else None
+        return self._local_symbol
+
+    def freeze(self):
+        """ 设为只读, 分发给多个插件时避免互相修改 """
+        self.array.flags.writeable = False
+        return self
+
+    def to_columns(self) -> dict:
+        """ {字段: list}, datetime为python datetime, 字符串已经解码 """
+        columns = {name: self.array[name].tolist() for name in _NAMES}
+        for name in _BYTES:
+            columns[name] = [value.decode() for value in columns[name]]
+        return columns
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def __repr__(self):
+        return f"TickBatch(size={len(self.array)}, local_symbol={self.local_symbol})"
@@ -0,0 +1,71 @@
+"""
+tick时间戳解析
+"""
+from datetime import datetime, date
+
+
+class TimestampDecoder:
+    """
+    替代 datetime.strptime 的tick时间解析.
+    日期部分(YYYYMMDD)按字符串缓存, 每个交易日只解析一次; 时间部分(HH:MM:SS[.ffffff])按位置切片转换为整数.
+
+        decoder.decode("20200715", "21:00:01.5")          # datetime(2020, 7, 15, 21, 0, 1, 500000)
+        decoder.decode_md("20200715", "21:00:01", 500)    # 同上, CTP行情的ActionDay/UpdateTime/UpdateMillisec
+
+    格式错误时与strptime一样抛出ValueError
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        # "YYYYMMDD" -> (year, month, day)
+        self._dates = {}
+
+    def date(self, day: str) -> tuple:
+        ymd = self._dates.get(day)
+        if ymd is None:
+            if len(day) != 8 or not day.isdigit():
+                raise ValueError(f"日期格式错误: {day!r}, 期望为YYYYMMDD")
+            ymd = (int(day[:4]), int(day[4:6]), int(day[6:]))
+            # 校验日期是否合法
+            date(*ymd)
+            if len(self._dates) >= self.size:
+                self._dates.clear()
+            self._dates[day] = ymd
+        return ymd
+
+    @staticmethod
+    def clock(value: str) -> tuple:
+        """ HH:MM:SS 或者 HH:MM:SS.ffffff -> (hour, minute, second, microsecond) """
+        if len(value) < 8 or value[2] != ":" or value[5] != ":":
+            raise ValueError(f"时间格式错误: {value!r}, 期望为HH:MM:SS")
+        microsecond = 0
+        if len(value) > 8:
+            fraction = value[9:]
+            if value[8] != "." or not 0 < len(fraction) <= 6 or not fraction.isdigit():
+                raise ValueError(f"时间格式错误: {value!r}, 期望为HH:MM:SS.ffffff")
+            # 与%f一致, 不足6位时右侧补0
+            microsecond = int(fraction) * 10 ** (6 - len(fraction))
+        return int(value[:2]), int(value[3:5]), int(value[6:8]), microsecond
+
+    def decode(self, day: str, clock: str) -> datetime:
+        """ 等价于 datetime.strptime(f"{day} {clock}", "%Y%m%d %H:%M:%S[.%f]") """
+        year, month, dd = self.date(day)
+        hour, minute, second, microsecond = self.clock(clock)
+        return datetime(year, month, dd, hour, minute, second, microsecond)
+
+    def decode_md(self, action_day: str, update_time: str, millisec: int) -> datetime:
+        """
+        CTP行情推送的时间, ActionDay缺失或者错误时使用当天日期.
+        与原先的strptime实现保持一致, 毫秒只保留到100毫秒
+        """
+        try:
+            year, month, dd = self.date(action_day)
+        except ValueError:
+            today = date.today()
+            year, month, dd = today.year, today.month, today.day
+        hour, minute, second, _ = self.clock(update_time)
+        return datetime(year, month, dd, hour, minute, second, int(millisec / 100) * 100000)
+
+
+# 接口与Recorder共用的解析器
+decoder = TimestampDecoder()
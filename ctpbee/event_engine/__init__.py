@@ -1,3 +1,3 @@
-from .engine import EventEngine, Event, AsyncEngine
+from .engine import EventEngine, Event, AsyncEngine, ShardedEngine, Scheduler
 
-__all__ = [EventEngine, Event, AsyncEngine]
+__all__ = [EventEngine, Event, AsyncEngine, ShardedEngine, Scheduler]
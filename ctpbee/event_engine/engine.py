@@ -2,13 +2,21 @@
 Event-driven framework of vn.py framework.
 """
 import asyncio
-from collections import defaultdict
+import inspect
+import traceback
+import warnings
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import count
 from queue import Empty, Queue
-from threading import Thread
-from time import sleep
+from threading import Thread, Lock, RLock, Condition
+from time import perf_counter, monotonic
 from typing import Any, Callable
 
-EVENT_TIMER = "timer"
+from ctpbee.constant import EVENT_TRADE, EVENT_ORDER, EVENT_TICK, EVENT_TIMER, EVENT_TIMER_CHANNEL
+from ctpbee.event_engine.instrument import Instrument
+from ctpbee.event_engine.queues import LaneQueue, RingQueue, resolve_priority, DEFAULT_LEVEL
 
 
 class Event:
@@ -31,42 +39,370 @@ class Event:
 HandlerType = Callable[[Event], None]
 
 
+class _Channel:
+    """ 定时器通道 """
+    __slots__ = ("name", "interval", "align", "offset", "deadline", "callbacks", "fired", "missed", "max_lag")
+
+    def __init__(self, name, interval, align, offset):
+        self.name = name
+        self.interval = interval
+        self.align = align
+        self.offset = offset
+        self.deadline = 0.0
+        self.callbacks = []
+        self.fired = 0
+        self.missed = 0
+        self.max_lag = 0.0
+
+
+class Scheduler:
+    """
+    定时器服务
+    每个通道使用monotonic时间计算截止时间, 下一次截止时间 = 上一次截止时间 + interval,
+    处理耗时以及线程调度的误差不会累积. align=True的通道对齐到当天零点起interval的整数倍(再加上offset),
+    例如interval=60在每分钟的第0秒触发, 可用于k线收盘.
+    处理不过来而错过的触发不会补发, 只记录在missed中.
+
+    默认的 timer 通道产生 EVENT_TIMER 事件, 其余通道产生data为通道名称的 EVENT_TIMER_CHANNEL 事件,
+    订阅该通道的回调函数在事件引擎的处理线程(或者事件循环)中执行.
+
+    clock: 返回单调时间(秒)的函数, 默认为time.monotonic, 测试时可以注入假的时钟并通过poll驱动
+    """
+
+    def __init__(self, engine, interval: float = 1, clock: Callable[[], float] = monotonic):
+        self.engine = engine
+        self.clock = clock
+        self._channels = {}
+        self._cond = Condition()
+        self._active = False
+        self._thread = None
+        self.add_channel(EVENT_TIMER, interval)
+
+    @staticmethod
+    def _next_deadline(channel: _Channel, now: float) -> float:
+        if not channel.align:
+            return now + channel.interval
+        current = datetime.now()
+        elapsed = current.hour * 3600 + current.minute * 60 + current.second + current.microsecond / 1e6
+        boundary = ((elapsed - channel.offset) // channel.interval + 1) * channel.interval + channel.offset
+        return now + boundary - elapsed
+
+    def add_channel(self, name: str, interval: float, align: bool = False, offset: float = 0.0) -> str:
+        """
+        添加定时器通道, 通道已经存在时更新它的间隔, 已订阅的回调函数保留
+        interval: 触发间隔(秒), 支持小数
+        align: 是否与当天零点起interval的整数倍对齐
+        offset: 对齐时的偏移秒数
+        """
+        if interval <= 0:
+            raise ValueError("定时器间隔必须大于0")
+        with self._cond:
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = self._channels[name] = _Channel(name, interval, align, offset)
+            else:
+                channel.interval, channel.align, channel.offset = interval, align, offset
+            channel.deadline = self._next_deadline(channel, self.clock())
+            self._cond.notify()
+        return name
+
+    def remove_channel(self, name: str):
+        with self._cond:
+            self._channels.pop(name, None)
+
+    def subscribe(self, name: str, callback: Callable):
+        """ 订阅通道, 回调函数不接收参数, 通道需要先通过add_channel添加 """
+        with self._cond:
+            channel = self._channels.get(name)
+            if channel is None:
+                raise ValueError(f"定时器通道{name}不存在, 请先调用add_channel")
+            if callback not in channel.callbacks:
+                channel.callbacks.append(callback)
+
+    def unsubscribe(self, name: str, callback: Callable):
+        with self._cond:
+            channel = self._channels.get(name)
+            if channel is not None and callback in channel.callbacks:
+                channel.callbacks.remove(callback)
+
+    def _callbacks(self, name) -> list:
+        """ 在锁内复制回调函数列表, 分发时其他线程可以同时订阅或者取消订阅 """
+        with self._cond:
+            channel = self._channels.get(name)
+            return [] if channel is None else list(channel.callbacks)
+
+    def channels(self) -> dict:
+        """
+        每个通道的间隔, 触发次数, 错过次数以及最大延迟(秒)
+        """
+        with self._cond:
+            return {
+                name: {
+                    "interval": channel.interval,
+                    "align": channel.align,
+                    "fired": channel.fired,
+                    "missed": channel.missed,
+                    "max_lag": round(channel.max_lag, 6),
+                } for name, channel in self._channels.items()
+            }
+
+    def _fire(self, channel: _Channel, now: float):
+        lag = now - channel.deadline
+        if lag > channel.max_lag:
+            channel.max_lag = lag
+        if channel.align:
+            # 每次都按照墙上时间重新对齐, 同时避免在同一个边界上重复触发
+            deadline = max(self._next_deadline(channel, now), channel.deadline + channel.interval / 2)
+        else:
+            deadline = channel.deadline + channel.interval
+            if deadline <= now:
+                missed = int((now - deadline) // channel.interval) + 1
+                channel.missed += missed
+                deadline += missed * channel.interval
+        channel.deadline = deadline
+        channel.fired += 1
+        if channel.name == EVENT_TIMER:
+            self.engine.put(Event(EVENT_TIMER))
+        else:
+            self.engine.put(Event(EVENT_TIMER_CHANNEL, channel.name))
+
+    def poll(self, now: float):
+        """ 触发截止时间不晚于now的通道, 返回最近的截止时间, 没有通道时返回None """
+        with self._cond:
+            for channel in list(self._channels.values()):
+                if channel.deadline <= now:
+                    self._fire(channel, now)
+            # 通道数量很少, 直接遍历找出最近的截止时间
+            return min((channel.deadline for channel in self._channels.values()), default=None)
+
+    def _run(self):
+        with self._cond:
+            while self._active:
+                deadline = self.poll(self.clock())
+                self._cond.wait(None if deadline is None else max(deadline - self.clock(), 0))
+
+    def dispatch(self, event: Event):
+        """
+        注册到线程引擎, 通过engine.invoke调用订阅了该通道的回调函数,
+        某个回调函数出错只交给on_error处理, 不影响其他回调函数
+        """
+        for callback in self._callbacks(event.data):
+            self.engine.invoke(event, callback)
+
+    async def async_dispatch(self, event: Event):
+        """ 注册到异步引擎, 回调函数可以是协程函数, 见dispatch """
+        for callback in self._callbacks(event.data):
+            await self.engine.invoke(event, callback)
+
+    def start(self):
+        with self._cond:
+            self._active = True
+            now = self.clock()
+            for channel in self._channels.values():
+                channel.deadline = self._next_deadline(channel, now)
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._active = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
 class EventEngine:
     """
     Event engine distributes event object based on its type
     to those handlers registered.
     It also generates timer event by every interval seconds,
-    which can be used for timing purpose.
+    which can be used for timing purpose, more timer channels
+    can be added through the scheduler.
     """
 
-    def __init__(self, interval: int = 1):
+    # 批量读取队列时每批的最大数量
+    batch_size = 512
+
+    def __init__(self, interval: int = 1, priority=None, conflate: bool = False, queue=None,
+                 instrument: bool = False):
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
+
+        queue: queue backend, None for queue.Queue, "ring" for the
+        per-producer RingQueue (less cpu per event, but no better tail
+        latency), or a callable returning a queue object which
+        provides put/get(block, timeout)/qsize and optionally get_many.
+
+        priority: True or {event type: level}, events are then queued in
+        priority lanes (smaller level first) instead of a single fifo queue.
+
+        conflate: a tick still waiting in queue is replaced by the newer tick
+        of the same local_symbol, the replaced ticks are kept in
+        event.conflated so that bar generation still sees every tick.
+
+        instrument: record queue wait of every event type and count, latency
+        and exceptions of every handler, see stats().
         """
         self._interval = interval
-        self._queue = Queue()
+        self.priority = resolve_priority(priority) if priority else None
+        if self.priority is not None and queue is not None:
+            raise ValueError("priority只支持默认的队列")
+        self.queue_backend = queue
+        self._queue = self._make_queue()
+        self.conflate = conflate
+        # local_symbol -> 尚未分发的tick事件
+        self._pending = {}
+        self._conflate_lock = Lock()
+        # local_symbol -> 被合并掉的tick数量
+        self.dropped_ticks = defaultdict(int)
         self._active = False
         self._thread = Thread(target=self._run)
-        self._timer = Thread(target=self._run_timer)
         self._handlers = defaultdict(list)
         self._general_handlers = []
+        self._batch_handlers = {}
+        self.scheduler = Scheduler(self, interval)
+        self.register(EVENT_TIMER_CHANNEL, self.scheduler.dispatch)
+        self.instrument = Instrument() if instrument else None
+        # 处理函数抛出异常时的回调 on_error(event, handler, exception), 默认打印异常堆栈
+        self.on_error = None
 
     @property
     def status(self):
         """ 状态 """
         return self._active
 
+    def _make_queue(self):
+        if self.priority is not None:
+            return LaneQueue(self.priority)
+        if self.queue_backend is None:
+            return Queue()
+        if self.queue_backend == "ring":
+            return RingQueue()
+        if callable(self.queue_backend):
+            return self.queue_backend()
+        raise ValueError(f"不支持的队列类型 {self.queue_backend}")
+
+    @staticmethod
+    def _depth(queue) -> dict:
+        if hasattr(queue, "depth"):
+            return queue.depth()
+        return {"default": {"depth": queue.qsize()}}
+
+    def queue_depth(self) -> dict:
+        """
+        队列深度统计, 开启priority时按优先级通道返回
+        """
+        return self._depth(self._queue)
+
+    def stats(self) -> dict:
+        """
+        开启instrument之后的统计信息, 见Instrument.stats
+        """
+        if self.instrument is None:
+            return {}
+        return self.instrument.stats()
+
+    def _handle_error(self, event: Event, handler, exception: Exception):
+        if self.on_error is not None:
+            self.on_error(event, handler, exception)
+        else:
+            traceback.print_exc()
+
+    def invoke(self, event: Event, handler, *args):
+        """
+        调用处理函数, 开启instrument时记录耗时.
+        异常不会向上抛出, 某个处理函数出错不会中断事件引擎以及其他处理函数
+        """
+        try:
+            if self.instrument is None:
+                return handler(*args)
+            return self.instrument.call(event.type, handler, *args)
+        except Exception as e:
+            self._handle_error(event, handler, e)
+
     def _run(self):
         """
         Get event from queue and then process it.
         """
+        self._consume(self._queue)
+
+    def _consume(self, queue):
+        """
+        Keep processing events of the given queue until the engine stops.
+        """
+        if hasattr(queue, "get_many"):
+            return self._consume_many(queue)
         while self._active:
             try:
-                event = self._queue.get(block=True, timeout=1)
-                self._process(event)
+                event = queue.get(block=True, timeout=1)
             except Empty:
-                pass
+                continue
+            batch = [event]
+            # 注册了批处理函数时尽量读空队列
+            if self._batch_handlers:
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(queue.get_nowait())
+                except Empty:
+                    pass
+            self._dispatch(batch)
+
+    def _consume_many(self, queue):
+        """
+        Drain events in batches from queues which support get_many.
+        """
+        while self._active:
+            batch = queue.get_many(self.batch_size, 1)
+            if batch:
+                self._dispatch(batch)
+
+    def _dispatch(self, events: list):
+        """
+        Process a drained batch one by one, then hand the events of
+        each type to batch handlers registered for it.
+        """
+        instrument = self.instrument
+        for event in events:
+            if self.conflate and event.type == EVENT_TICK:
+                self._release(event)
+            if instrument is not None:
+                instrument.waited(event)
+            self._process(event)
+        if self._batch_handlers:
+            self._process_batch(events)
+
+    def _process_batch(self, events: list):
+        grouped = {}
+        for event in events:
+            if event.type in self._batch_handlers:
+                grouped.setdefault(event.type, []).append(event)
+        for type, group in grouped.items():
+            for handler in self._batch_handlers[type]:
+                self.invoke(group[0], handler, group)
+
+    def _conflate(self, event: Event) -> bool:
+        """
+        将tick合并到同合约尚未分发的tick事件中, 返回True表示已经合并无需入队
+        """
+        local_symbol = event.data.local_symbol
+        with self._conflate_lock:
+            pending = self._pending.get(local_symbol)
+            if pending is None:
+                event.conflated = []
+                self._pending[local_symbol] = event
+                return False
+            pending.conflated.append(pending.data)
+            pending.data = event.data
+            self.dropped_ticks[local_symbol] += 1
+            return True
+
+    def _release(self, event: Event):
+        """ tick事件即将分发, 之后到达的tick需要重新入队 """
+        with self._conflate_lock:
+            if self._pending.get(event.data.local_symbol) is event:
+                del self._pending[event.data.local_symbol]
 
     def _process(self, event: Event):
         """
@@ -76,19 +412,16 @@ class EventEngine:
         to all types.
         """
         if event.type in self._handlers:
-            [handler(event) if event.type != EVENT_TIMER else handler() for handler in self._handlers[event.type]]
+            if event.type != EVENT_TIMER:
+                for handler in self._handlers[event.type]:
+                    self.invoke(event, handler, event)
+            else:
+                for handler in self._handlers[event.type]:
+                    self.invoke(event, handler)
 
         if self._general_handlers:
-            [handler(event) for handler in self._general_handlers]
-
-    def _run_timer(self):
-        """
-        Sleep by interval second(s) and then generate a timer event.
-        """
-        while self._active:
-            sleep(self._interval)
-            event = Event(EVENT_TIMER)
-            self.put(event)
+            for handler in self._general_handlers:
+                self.invoke(event, handler, event)
 
     def start(self):
         """
@@ -96,22 +429,53 @@ class EventEngine:
         """
         self._active = True
         self._thread.start()
-        self._timer.start()
+        self.scheduler.start()
 
     def stop(self):
         """
         Stop event engine.
         """
         self._active = False
-        self._timer.join()
+        self.scheduler.stop()
         self._thread.join()
 
     def put(self, event: Event):
         """
         Put an event object into event queue.
         """
+        if self.instrument is not None:
+            event.enqueued = perf_counter()
+        if self.conflate and event.type == EVENT_TICK and self._conflate(event):
+            return
+        self._enqueue(event)
+
+    def _enqueue(self, event: Event):
         self._queue.put(event)
 
+    def put_many(self, events):
+        """
+        Put a batch of event objects into event queue.
+        """
+        if self.instrument is not None:
+            now = perf_counter()
+            for event in events:
+                event.enqueued = now
+        if self.conflate:
+            events = [event for event in events if not (event.type == EVENT_TICK and self._conflate(event))]
+        self._enqueue_many(events)
+
+    def _enqueue_many(self, events):
+        self._put_many(self._queue, events)
+
+    @staticmethod
+    def _put_many(queue, events):
+        put_many = getattr(queue, "put_many", None)
+        if put_many is not None:
+            put_many(events)
+        else:
+            for event in events:
+                queue.put(event)
+
     def register(self, type: str, handler: HandlerType):
         """
         Register a new handler function for a specific event type. Every
@@ -133,6 +497,26 @@ class EventEngine:
         if not handler_list:
             self._handlers.pop(type)
 
+    def register_batch(self, type: str, handler: Callable[[list], None]):
+        """
+        Register a handler receiving a list with every event of the type
+        dispatched since the last drain of the queue, after the normal
+        handlers of those events have been called.
+        """
+        handler_list = self._batch_handlers.setdefault(type, [])
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+    def unregister_batch(self, type: str, handler: Callable[[list], None]):
+        """
+        Unregister an existing batch handler.
+        """
+        handler_list = self._batch_handlers.get(type, [])
+        if handler in handler_list:
+            handler_list.remove(handler)
+        if not handler_list:
+            self._batch_handlers.pop(type, None)
+
     def register_general(self, handler: HandlerType):
         """
         Register a new handler function for all event types. Every
@@ -153,62 +537,270 @@ class EventEngine:
             self.stop()
 
 
+class ShardedEngine(EventEngine):
+    """
+    多线程分片事件引擎
+    事件按照local_symbol哈希到work_core个工作线程, 同一个合约的事件始终在同一个线程内顺序处理.
+    成交/委托事件(dedicated)走独立的通道, 某个合约缓慢的on_tick不会再阻塞成交回报.
+    没有local_symbol的事件(日志, 定时器, 账户等)进入第一个分片.
+
+    线程安全: Recorder中跨合约共享的数据(持仓, 活跃报单, 主力合约, k线存储等)由Recorder.lock保护;
+    serialize_extensions=True(默认)时同一个插件的回调在插件自己的锁内执行, 插件看到的回调与单线程引擎一样不会同时发生,
+    不同插件之间并行. 关闭之后插件的回调会在多个线程中同时被调用, 插件需要自行保证线程安全.
+    """
+
+    def __init__(self, interval: int = 1, work_core: int = 4, dedicated=(EVENT_TRADE, EVENT_ORDER), priority=None,
+                 conflate: bool = False, queue=None, instrument: bool = False, serialize_extensions: bool = True):
+        super().__init__(interval, priority=priority, conflate=conflate, queue=queue, instrument=instrument)
+        if work_core < 1:
+            raise ValueError("work_core至少为1")
+        self.work_core = work_core
+        self.dedicated = set(dedicated)
+        self.serialize_extensions = serialize_extensions
+        # extension_name -> 插件回调的锁
+        self._extension_locks = {}
+        # 第0个通道为成交/委托专用, 1 ~ work_core 为分片通道
+        self._lanes = [self._make_queue() for _ in range(work_core + 1)]
+        self._queue = self._lanes[1]
+        self._workers = [Thread(target=self._consume, args=(lane,)) for lane in self._lanes]
+
+    def extension_lock(self, name: str):
+        """ 插件回调使用的锁, 插件自己的定时器回调同样需要在锁内执行 """
+        if not self.serialize_extensions:
+            return nullcontext()
+        lock = self._extension_locks.get(name)
+        if lock is None:
+            lock = self._extension_locks.setdefault(name, RLock())
+        return lock
+
+    def invoke(self, event: Event, handler, *args):
+        """ 插件的回调在插件自己的锁内执行, 见serialize_extensions """
+        name = getattr(handler, "extension_name", None)
+        if name is None:
+            return super().invoke(event, handler, *args)
+        with self.extension_lock(name):
+            return super().invoke(event, handler, *args)
+
+    def _lane(self, event: Event) -> int:
+        """ 根据事件类型以及local_symbol选择通道 """
+        if event.type in self.dedicated:
+            return 0
+        local_symbol = getattr(event.data, "local_symbol", None)
+        if local_symbol is None:
+            return 1
+        return 1 + hash(local_symbol) % self.work_core
+
+    def start(self):
+        self._active = True
+        for worker in self._workers:
+            worker.start()
+        self.scheduler.start()
+
+    def stop(self):
+        self._active = False
+        self.scheduler.stop()
+        for worker in self._workers:
+            worker.join()
+
+    def _enqueue(self, event: Event):
+        self._lanes[self._lane(event)].put(event)
+
+    def _enqueue_many(self, events):
+        lanes = defaultdict(list)
+        for event in events:
+            lanes[self._lane(event)].append(event)
+        for index, group in lanes.items():
+            self._put_many(self._lanes[index], group)
+
+    def queue_depth(self) -> dict:
+        """ 每个分片通道的队列深度, 0为成交/委托通道 """
+        return {index: self._depth(lane) for index, lane in enumerate(self._lanes)}
+
+
 # 异步引擎 ---> 提升性能  但是你需要学会基于asyncio的编程方式
 
 class AsyncEngine:
     """ 通过单线程的异步效果来获得并发效果 ~~"""
 
-    def __init__(self, work_core=10):
+    def __init__(self, work_core=10, priority=None, serialize: bool = False, uvloop: bool = False,
+                 instrument: bool = False):
+        """
+        work_core: 并发处理事件的协程数量
+        serialize: 每个协程拥有独立的队列, 事件按照local_symbol分配, 同一个合约的事件严格顺序处理
+        uvloop: 安装了uvloop时使用uvloop的事件循环
+        instrument: 统计排队时间以及处理函数的耗时与异常, 见EventEngine
+        """
         # 用于主循环
-        self.loop = asyncio.new_event_loop()
+        self.loop = self._new_loop(uvloop)
         self._func = defaultdict(list)
         self.work_core = work_core
+        self.serialize = serialize
+        # 优先级通道, 见EventEngine
+        self.priority = resolve_priority(priority) if priority else None
+        self._sequence = count()
+        self._lane_depth = defaultdict(int)
+        self._lane_max_depth = defaultdict(int)
         self.init_flag = True
         self._active = False
-        self._interval = 1
-        self._timer = Thread(target=self._run_timer)
-
-    def _run_timer(self):
-        while self._active:
-            sleep(self._interval)
-            event = Event(EVENT_TIMER)
-            self.loop.create_task(self._put(event))
+        self.scheduler = Scheduler(self)
+        self.register(EVENT_TIMER_CHANNEL, self.scheduler.async_dispatch)
+        self.instrument = Instrument() if instrument else None
+        self.on_error = None
+        self._thread = None
+        self._queue = None
+        self._queues = []
+        # 每个协程的处理数量以及处理耗时
+        self._processed = [0] * work_core
+        self._busy = [0.0] * work_core
+        self._started = None
+        # 网关线程投递的事件先进入收件箱, 由事件循环批量转移到asyncio队列
+        self._inbox = deque()
+        self._scheduled = False
+        # stop之后事件循环被关闭, 之后投递的事件直接丢弃
+        self._closed = False
+
+    @staticmethod
+    def _new_loop(use_uvloop):
+        if use_uvloop:
+            try:
+                import uvloop
+                return uvloop.new_event_loop()
+            except ImportError:
+                warnings.warn("没有安装uvloop, 使用asyncio默认的事件循环")
+        return asyncio.new_event_loop()
 
     @property
     def status(self):
         """ 状态 """
         return self._active
 
-    async def worker(self, queue):
+    async def worker(self, queue, index=0):
         await asyncio.sleep(0.1)
-        while True:
+        while self._active:
             try:
                 event = await asyncio.wait_for(queue.get(), timeout=1)
             except asyncio.TimeoutError:
                 continue
+            if self.priority is not None:
+                level, _, event = event
+                self._lane_depth[level] -= 1
+            if self.instrument is not None:
+                self.instrument.waited(event)
+            start = perf_counter()
             await self.future_finish(event)
+            self._busy[index] += perf_counter() - start
+            self._processed[index] += 1
             queue.task_done()
 
-    async def _put(self, event):
-        await self._queue.put(event)
+    def _route(self, event):
+        """ serialize模式下同一个合约的事件总是进入同一个协程的队列 """
+        if not self.serialize:
+            return self._queue
+        local_symbol = getattr(event.data, "local_symbol", None)
+        if local_symbol is None:
+            return self._queues[0]
+        return self._queues[hash(local_symbol) % self.work_core]
+
+    def _put_nowait(self, event):
+        queue = self._route(event)
+        if self.priority is None:
+            queue.put_nowait(event)
+            return
+        level = self.priority.get(event.type, DEFAULT_LEVEL)
+        self._lane_depth[level] += 1
+        if self._lane_depth[level] > self._lane_max_depth[level]:
+            self._lane_max_depth[level] = self._lane_depth[level]
+        # 同一优先级内按照入队顺序
+        queue.put_nowait((level, next(self._sequence), event))
+
+    def worker_utilization(self) -> dict:
+        """
+        每个协程处理的事件数量, 处理耗时(秒)以及耗时占运行时间的比例
+        """
+        elapsed = perf_counter() - self._started if self._started else 0
+        return {
+            index: {
+                "processed": self._processed[index],
+                "busy": round(self._busy[index], 6),
+                "utilization": round(self._busy[index] / elapsed, 4) if elapsed else 0,
+                "depth": self._queues[index].qsize() if self.serialize and self._queues else None,
+            } for index in range(self.work_core)
+        }
+
+    def _drain_inbox(self):
+        """ 运行在事件循环中, 将收件箱中的全部事件转移到asyncio队列 """
+        self._scheduled = False
+        if self._queue is None:
+            # 事件循环还没有初始化完成, main中会再次转移
+            return
+        inbox = self._inbox
+        while inbox:
+            self._put_nowait(inbox.popleft())
+
+    def queue_depth(self) -> dict:
+        """ 队列深度统计, 开启priority时按优先级通道返回 """
+        if self.priority is None:
+            return {"default": {"depth": len(self._inbox) + sum(queue.qsize() for queue in set(self._queues))}}
+        return {level: {"depth": self._lane_depth[level], "max_depth": self._lane_max_depth[level]}
+                for level in sorted(set(self.priority.values()) | {DEFAULT_LEVEL})}
 
     def put(self, event):
-        self.loop.create_task(self._put(event))
+        """
+        线程安全的投递, 同一批次内的多次投递只会唤醒事件循环一次.
+        引擎停止之后(例如网关线程在退出时仍有回调)投递的事件被丢弃
+        """
+        if self._closed:
+            return
+        if self.instrument is not None:
+            event.enqueued = perf_counter()
+        self._inbox.append(event)
+        self._wakeup()
+
+    def put_many(self, events):
+        if self._closed:
+            return
+        if self.instrument is not None:
+            now = perf_counter()
+            for event in events:
+                event.enqueued = now
+        self._inbox.extend(events)
+        self._wakeup()
+
+    def _wakeup(self):
+        if self._scheduled:
+            return
+        self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._drain_inbox)
+        except RuntimeError:
+            # 与stop同时发生, 事件循环已经关闭
+            self._inbox.clear()
+
+    stats = EventEngine.stats
+    _handle_error = EventEngine._handle_error
+
+    async def invoke(self, event: Event, handler, *args):
+        """
+        调用处理函数(普通函数或者协程函数), 异常不会向上抛出, 见EventEngine.invoke
+        """
+        try:
+            if self.instrument is None:
+                result = handler(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            return await self.instrument.acall(event.type, handler, *args)
+        except Exception as e:
+            self._handle_error(event, handler, e)
 
     async def future_finish(self, event: Event):
-        for handler in self._func[event.type]:
-
-            if event.type != EVENT_TIMER:
-                await handler(event)
-
-            else:
-                if handler.__name__ in ["realtime_check", "mimo_thread"]:
-                    handler()
-                else:
-                    await handler()
-        # [await handler(event) if event.type != EVENT_TIMER else await handler() for handler in self._func[event.type]]
-        # for func in self._func[event.type]:
-        #     await func(event)
+        if event.type != EVENT_TIMER:
+            for handler in self._func[event.type]:
+                await self.invoke(event, handler, event)
+        else:
+            # realtime_check, mimo_thread 等普通函数同样可以注册到定时器
+            for handler in self._func[event.type]:
+                await self.invoke(event, handler)
 
     def register(self, type, func):
         # print(func.__name__)
@@ -224,23 +816,35 @@ class AsyncEngine:
     async def main(self):
         self._active = True
         asyncio.set_event_loop(self.loop)
-        self._queue = asyncio.Queue()
-        self._timer.start()
+        queue_class = asyncio.Queue if self.priority is None else asyncio.PriorityQueue
+        if self.serialize:
+            self._queues = [queue_class() for _ in range(self.work_core)]
+        else:
+            self._queues = [queue_class()] * self.work_core
+        self._queue = self._queues[0]
+        self._started = perf_counter()
+        self._drain_inbox()
+        self.scheduler.start()
         tasks = []
         for i in range(self.work_core):
-            task = asyncio.create_task(self.worker(self._queue))
+            task = asyncio.create_task(self.worker(self._queues[i], i))
             tasks.append(task)
 
         await asyncio.gather(*tasks, return_exceptions=False)
 
     def start(self):
-        p = Thread(target=self.loop.run_until_complete, args=(self.main(),))
-        p.start()
+        self._active = True
+        self._thread = Thread(target=self.loop.run_until_complete, args=(self.main(),))
+        self._thread.start()
 
     def stop(self):
         """
         Stop event engine.
         """
         self._active = False
-        self._timer.join()
+        self._closed = True
+        self.scheduler.stop()
+        if self._thread is not None:
+            self._thread.join()
         self.loop.close()
+        self._inbox.clear()
@@ -0,0 +1,132 @@
+"""
+事件引擎的统计 / instrumentation of event engine
+"""
+import inspect
+from collections import deque
+from time import perf_counter
+
+
+class Stat:
+    """ 单个处理函数(或者单种事件的排队时间)的统计 """
+    __slots__ = ("count", "total", "max", "errors", "last_error", "samples")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.last_error = None
+        # 最近window次的耗时, 用于计算分位数
+        self.samples = deque(maxlen=window)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.samples.append(elapsed)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        size = len(samples)
+        result = {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1e6, 2) if self.count else 0,
+            "p50_us": round(samples[size // 2] * 1e6, 2) if size else 0,
+            "p99_us": round(samples[min(int(size * 0.99), size - 1)] * 1e6, 2) if size else 0,
+            "max_us": round(self.max * 1e6, 2),
+        }
+        if self.errors:
+            result["errors"] = self.errors
+            result["last_error"] = self.last_error
+        return result
+
+
+class Instrument:
+    """
+    记录每种事件从put到被分发的排队时间, 以及每个处理函数的调用次数, 耗时和异常.
+    分位数基于最近window次的采样, 计数, 平均值与最大值基于全部调用.
+    插件通过extension_name区分, 例如 "Strategy(ma)", 其余处理函数使用__qualname__.
+    """
+
+    def __init__(self, window: int = 4096):
+        self.window = window
+        # event type -> Stat
+        self._waits = {}
+        # event type -> {handler name -> Stat}
+        self._handlers = {}
+        self._names = {}
+
+    def _name(self, handler) -> str:
+        name = self._names.get(handler)
+        if name is None:
+            extension_name = getattr(handler, "extension_name", None)
+            if extension_name is not None:
+                name = f"{type(handler).__name__}({extension_name})"
+            else:
+                name = getattr(handler, "__qualname__", None) or repr(handler)
+            self._names[handler] = name
+        return name
+
+    def _stat(self, type, handler) -> Stat:
+        stats = self._handlers.get(type)
+        if stats is None:
+            stats = self._handlers.setdefault(type, {})
+        name = self._name(handler)
+        stat = stats.get(name)
+        if stat is None:
+            stat = stats.setdefault(name, Stat(self.window))
+        return stat
+
+    def waited(self, event):
+        """ 记录事件的排队时间, 事件需要在put时被打上enqueued时间戳 """
+        enqueued = getattr(event, "enqueued", None)
+        if enqueued is None:
+            return
+        stat = self._waits.get(event.type)
+        if stat is None:
+            stat = self._waits.setdefault(event.type, Stat(self.window))
+        stat.add(perf_counter() - enqueued)
+
+    def call(self, type, handler, *args):
+        """ 调用处理函数并记录耗时, 异常记录之后继续抛出 """
+        stat = self._stat(type, handler)
+        start = perf_counter()
+        try:
+            return handler(*args)
+        except Exception as e:
+            stat.errors += 1
+            stat.last_error = repr(e)
+            raise
+        finally:
+            stat.add(perf_counter() - start)
+
+    async def acall(self, type, handler, *args):
+        """ call的异步版本, 处理函数可以是普通函数或者协程函数 """
+        stat = self._stat(type, handler)
+        start = perf_counter()
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            stat.errors += 1
+            stat.last_error = repr(e)
+            raise
+        finally:
+            stat.add(perf_counter() - start)
+
+    def stats(self) -> dict:
+        """
+        {"wait": {event type: 统计}, "handlers": {event type: {处理函数: 统计}}}
+        """
+        return {
+            "wait": {type: stat.summary() for type, stat in list(self._waits.items())},
+            "handlers": {type: {name: stat.summary() for name, stat in list(stats.items())}
+                         for type, stats in list(self._handlers.items())},
+        }
+
+    def reset(self):
+        self._waits = {}
+        self._handlers = {}
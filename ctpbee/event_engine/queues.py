@@ -0,0 +1,298 @@
+"""
+事件队列的实现 / queue backends of event engine
+"""
+from collections import deque
+from queue import Empty
+from threading import Condition, Lock, local, Event as ThreadEvent
+from time import monotonic
+from weakref import ref
+
+from ctpbee.constant import EVENT_TRADE, EVENT_ORDER, EVENT_POSITION, EVENT_ACCOUNT, EVENT_TICK, EVENT_BAR, \
+    EVENT_SHARED, EVENT_LOG, EVENT_ERROR, EVENT_TIMER, EVENT_TIMER_CHANNEL, EVENT_TICK_BATCH, EVENT_SESSION_CLOSE
+
+# 数字越小优先级越高, 没有列出的事件类型使用 DEFAULT_LEVEL
+DEFAULT_PRIORITY = {
+    EVENT_TRADE: 0,
+    EVENT_ORDER: 1,
+    EVENT_POSITION: 2,
+    EVENT_ACCOUNT: 2,
+    EVENT_TIMER: 2,
+    EVENT_TIMER_CHANNEL: 2,
+    EVENT_TICK: 3,
+    EVENT_TICK_BATCH: 3,
+    # 与tick处于同一个通道, 保证与同合约的tick按顺序处理
+    EVENT_SESSION_CLOSE: 3,
+    EVENT_BAR: 3,
+    EVENT_SHARED: 3,
+    EVENT_LOG: 4,
+    EVENT_ERROR: 4,
+}
+DEFAULT_LEVEL = 3
+
+
+def resolve_priority(priority):
+    """ priority为True时使用默认优先级, 为字典时在默认优先级上覆盖 """
+    if priority is True:
+        return dict(DEFAULT_PRIORITY)
+    mapping = dict(DEFAULT_PRIORITY)
+    mapping.update(priority)
+    return mapping
+
+
+class LaneQueue:
+    """
+    按照事件优先级分通道的队列
+    get总是先返回优先级最高的通道里的事件, 同一个通道内保持先进先出.
+    接口与queue.Queue保持一致, 可以直接作为EventEngine的队列使用
+    """
+
+    def __init__(self, priority: dict = None, default: int = DEFAULT_LEVEL):
+        self.priority = dict(DEFAULT_PRIORITY) if priority is None else dict(priority)
+        self.default = default
+        self.levels = sorted(set(self.priority.values()) | {default})
+        self._lanes = {level: deque() for level in self.levels}
+        self._ordered = [self._lanes[level] for level in self.levels]
+        self._size = 0
+        self._not_empty = Condition(Lock())
+        # 统计信息
+        self._max_depth = dict.fromkeys(self.levels, 0)
+        self._put_count = dict.fromkeys(self.levels, 0)
+
+    def level_of(self, type: str) -> int:
+        return self.priority.get(type, self.default)
+
+    def put(self, event, block=True, timeout=None):
+        level = self.priority.get(event.type, self.default)
+        with self._not_empty:
+            lane = self._lanes[level]
+            lane.append(event)
+            self._size += 1
+            self._put_count[level] += 1
+            if len(lane) > self._max_depth[level]:
+                self._max_depth[level] = len(lane)
+            self._not_empty.notify()
+
+    def put_nowait(self, event):
+        self.put(event, block=False)
+
+    def put_many(self, events):
+        with self._not_empty:
+            for event in events:
+                level = self.priority.get(event.type, self.default)
+                lane = self._lanes[level]
+                lane.append(event)
+                self._size += 1
+                self._put_count[level] += 1
+                if len(lane) > self._max_depth[level]:
+                    self._max_depth[level] = len(lane)
+            self._not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+        with self._not_empty:
+            if not block:
+                if not self._size:
+                    raise Empty
+            elif timeout is None:
+                while not self._size:
+                    self._not_empty.wait()
+            else:
+                deadline = monotonic() + timeout
+                while not self._size:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self._not_empty.wait(remaining)
+            for lane in self._ordered:
+                if lane:
+                    self._size -= 1
+                    return lane.popleft()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def depth(self) -> dict:
+        """
+        每个通道的队列深度
+        {level: {"types": [...], "depth": 当前深度, "max_depth": 历史最大深度, "put": 累计入队数}}
+        """
+        types = {level: [] for level in self.levels}
+        for type, level in self.priority.items():
+            types[level].append(type)
+        with self._not_empty:
+            return {
+                level: {
+                    "types": types[level],
+                    "depth": len(self._lanes[level]),
+                    "max_depth": self._max_depth[level],
+                    "put": self._put_count[level]
+                } for level in self.levels
+            }
+
+
+class _Owner:
+    """ 保存在生产者线程的线程局部变量中, 线程结束后被回收 """
+    __slots__ = ("__weakref__",)
+
+
+class _Ring:
+    """ 单个生产者线程独占的预分配环形缓冲区 """
+    __slots__ = ("buffer", "mask", "capacity", "head", "tail", "overflow", "owner")
+
+    def __init__(self, capacity, owner):
+        self.buffer = [None] * capacity
+        self.capacity = capacity
+        self.mask = capacity - 1
+        # head只由消费者修改, tail只由生产者修改
+        self.head = 0
+        self.tail = 0
+        # 缓冲区写满之后的溢出, 保证同一个生产者的事件顺序
+        self.overflow = deque()
+        # 生产者线程结束之后返回None
+        self.owner = ref(owner)
+
+
+class RingQueue:
+    """
+    单生产者/单消费者环形队列
+    每个投递事件的线程(行情线程, 交易线程, 定时器线程等)拥有一个预分配的环形缓冲区,
+    生产者与消费者各自只修改自己的下标, 投递与读取都不需要加锁.
+    消费者通过get_many批量读取所有缓冲区, 只允许有一个消费者线程.
+    生产者线程结束并且缓冲区被读空之后, 缓冲区会被回收.
+
+    与queue.Queue相比降低的是投递与分发的cpu开销, 尾部延迟并没有改善:
+    空闲的消费者依旧需要通过threading.Event等待唤醒, 见benchmarks/engine_queue.py
+    """
+
+    def __init__(self, capacity: int = 8192):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._local = local()
+        self._rings = ()
+        self._register_lock = Lock()
+        self._start = 0
+        self._waiting = False
+        self._wakeup = ThreadEvent()
+
+    def _register(self) -> _Ring:
+        owner = _Owner()
+        ring = _Ring(self.capacity, owner)
+        with self._register_lock:
+            self._rings = self._rings + (ring,)
+        self._local.ring = ring
+        self._local.owner = owner
+        return ring
+
+    def put(self, event, block=True, timeout=None):
+        try:
+            ring = self._local.ring
+        except AttributeError:
+            ring = self._register()
+        tail = ring.tail
+        if ring.overflow or tail - ring.head >= ring.capacity:
+            ring.overflow.append(event)
+        else:
+            ring.buffer[tail & ring.mask] = event
+            ring.tail = tail + 1
+        if self._waiting:
+            self._wakeup.set()
+
+    def put_nowait(self, event):
+        self.put(event, block=False)
+
+    def put_many(self, events):
+        try:
+            ring = self._local.ring
+        except AttributeError:
+            ring = self._register()
+        buffer, mask = ring.buffer, ring.mask
+        for event in events:
+            tail = ring.tail
+            if ring.overflow or tail - ring.head >= ring.capacity:
+                ring.overflow.append(event)
+            else:
+                buffer[tail & mask] = event
+                ring.tail = tail + 1
+        if self._waiting:
+            self._wakeup.set()
+
+    def _drain(self, max_items: int) -> list:
+        batch = []
+        rings = self._rings
+        if not rings:
+            return batch
+        self._start = (self._start + 1) % len(rings)
+        finished = []
+        for ring in rings[self._start:] + rings[:self._start]:
+            # 必须先确认生产者已经结束再检查是否读空, 否则可能丢失生产者最后投递的事件
+            if ring.owner() is None and ring.tail == ring.head and not ring.overflow:
+                finished.append(ring)
+                continue
+            remaining = max_items - len(batch)
+            if remaining <= 0:
+                break
+            head, buffer = ring.head, ring.buffer
+            size = min(ring.tail - head, remaining)
+            # 最多分两段连续的切片读取, 读取后释放引用
+            while size:
+                start = head & ring.mask
+                stop = min(start + size, ring.capacity)
+                batch.extend(buffer[start:stop])
+                buffer[start:stop] = [None] * (stop - start)
+                head += stop - start
+                size -= stop - start
+            ring.head = head
+            # 缓冲区读空之后才读取溢出部分
+            overflow = ring.overflow
+            while overflow and ring.tail == ring.head and len(batch) < max_items:
+                batch.append(overflow.popleft())
+        if finished:
+            with self._register_lock:
+                self._rings = tuple(ring for ring in self._rings if ring not in finished)
+        return batch
+
+    def get_many(self, max_items: int = 512, timeout=None) -> list:
+        """
+        批量读取至多max_items个事件, 没有事件时最多等待timeout秒, 超时返回空列表
+        """
+        batch = self._drain(max_items)
+        if batch or timeout == 0:
+            return batch
+        self._waiting = True
+        # 必须先clear再检查, 否则可能丢失生产者的唤醒
+        self._wakeup.clear()
+        try:
+            batch = self._drain(max_items)
+            if not batch:
+                self._wakeup.wait(timeout)
+                batch = self._drain(max_items)
+        finally:
+            self._waiting = False
+        return batch
+
+    def get(self, block=True, timeout=None):
+        batch = self.get_many(1, timeout if block else 0)
+        if not batch:
+            raise Empty
+        return batch[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return sum(ring.tail - ring.head + len(ring.overflow) for ring in self._rings)
+
+    def empty(self) -> bool:
+        return not self.qsize()
+
+    def depth(self) -> dict:
+        """ 每个生产者缓冲区的深度 """
+        return {index: {"depth": ring.tail - ring.head, "overflow": len(ring.overflow)}
+                for index, ring in enumerate(self._rings)}
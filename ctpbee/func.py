@@ -53,6 +53,9 @@ def subscribe(symbol: Text, app_name: str = "current_app") -> None:
         app = get_app(app_name)
     if not app.config.get("MD_FUNC"):
         raise MarketError(message="行情功能未开启, 无法进行订阅")
+    app.recorder.create_generator(symbol)
+    if "." in symbol:
+        symbol = symbol.split(".")[0]
     app.market.subscribe(symbol)
 
 
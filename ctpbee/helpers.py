@@ -7,7 +7,6 @@ import random
 import sys
 import time
 import types
-import warnings
 from copy import deepcopy
 from datetime import datetime, time
 from functools import wraps
@@ -16,6 +15,8 @@ from threading import RLock
 from time import sleep
 from typing import AnyStr, IO
 
+from ctpbee.constant import BaseData, FrozenData
+from ctpbee.event_engine import Event
 from ctpbee.trade_time import TradingDay
 
 _missing = object()
@@ -235,6 +236,8 @@ def run_forever(app):
 
         elif not running_me and running_status:
             """ 非交易日 并且在运行 """
+            # 收盘之后由每个合约的处理线程推送未完成的k线, 已经推送过时不会重复推送, 等待推送完成之后再暂停插件
+            app.recorder.flush_bars(timeout=5)
             for x in app.extensions.keys():
                 app.suspend_extension(x)
                 if hasattr(app.extensions[x], "f_init"):
@@ -262,19 +265,31 @@ def refresh_query(app):
             break
 
 
+def freeze_event(event):
+    """
+    生成所有插件共享的只读事件
+    数据被包装为FrozenData, 插件之间不会互相污染, 也无需每个插件deepcopy一次
+    """
+    if isinstance(event.data, BaseData):
+        return Event(type=event.type, data=FrozenData(event.data))
+    return event
+
+
+def event_for(extension, event, frozen):
+    """ 根据插件的copy_event选项返回独立副本或者共享的只读事件 """
+    if getattr(extension, "copy_event", False):
+        return deepcopy(event)
+    return frozen
+
+
 def value_call(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         d = func(*args, **kwargs)
         self, event = args
-        for value in self.app.extensions.values():
-            if self.app.config['INSTRUMENT_INDEPEND']:
-                if len(value.instrument_set) == 0:
-                    warnings.warn("你当前开启策略对应订阅行情功能, 当前策略的订阅行情数量为0，请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
-                if event.data.local_symbol in value.instrument_set:
-                    value(deepcopy(event))
-            else:
-                value(deepcopy(event))
+        frozen = freeze_event(event)
+        for value in self.app.extensions_for(event.data.local_symbol):
+            self.event_engine.invoke(event, value, event_for(value, event, frozen))
         return d
 
     return wrapper
@@ -285,14 +300,9 @@ def async_value_call(func):
     async def wrapper(*args, **kwargs):
         d = await func(*args, **kwargs)
         self, event = args
-        for value in self.app.extensions.values():
-            if self.app.config['INSTRUMENT_INDEPEND']:
-                if len(value.instrument_set) == 0:
-                    warnings.warn("你当前开启策略对应订阅行情功能, 当前策略的订阅行情数量为0，请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
-                if event.data.local_symbol in value.instrument_set:
-                    await value(deepcopy(event))
-            else:
-                await value(deepcopy(event))
+        frozen = freeze_event(event)
+        for value in self.app.extensions_for(event.data.local_symbol):
+            await self.event_engine.invoke(event, value, event_for(value, event, frozen))
         return d
 
     return wrapper
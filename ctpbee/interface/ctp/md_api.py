@@ -1,6 +1,8 @@
-from datetime import date, datetime
+from time import perf_counter
 
 from ctpbee.constant import *
+from ctpbee import trace
+from ctpbee.data_handle.timestamp import decoder
 from ctpbee.event_engine import Event
 from .lib import *
 
@@ -80,16 +82,13 @@ class BeeMdApi(MdApi):
         """
         Callback of tick data update.
         """
+        received = perf_counter() if trace.ENABLED else None
         symbol = data["InstrumentID"]
         exchange = symbol_exchange_map.get(symbol, "")
         if not exchange:
             return
 
-        timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
-        try:
-            datetimed = datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f")
-        except ValueError as e:
-            datetimed = datetime.strptime(str(date.today()) + " " + timestamp, "%Y-%m-%d %H:%M:%S.%f")
+        datetimed = decoder.decode_md(data['ActionDay'], data['UpdateTime'], data['UpdateMillisec'])
 
         tick = TickData(
             symbol=symbol,
@@ -113,6 +112,8 @@ class BeeMdApi(MdApi):
             pre_settlement_price=data['PreSettlementPrice'],
             gateway_name=self.gateway_name
         )
+        if received is not None:
+            trace.stamp(tick, "receive", received)
         self.on_event(type=EVENT_TICK, data=tick)
 
     def connect(self, info: dict):
@@ -239,16 +240,13 @@ class BeeMdApiApp(MdApiApp):
         """
         Callback of tick data update.
         """
+        received = perf_counter() if trace.ENABLED else None
         symbol = data["InstrumentID"]
         exchange = symbol_exchange_map.get(symbol, "")
         if not exchange:
             return
 
-        timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
-        try:
-            datetimed = datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f")
-        except ValueError as e:
-            datetimed = datetime.strptime(str(date.today()) + " " + timestamp, "%Y-%m-%d %H:%M:%S.%f")
+        datetimed = decoder.decode_md(data['ActionDay'], data['UpdateTime'], data['UpdateMillisec'])
 
         tick = TickData(
             symbol=symbol,
@@ -272,6 +270,8 @@ class BeeMdApiApp(MdApiApp):
             pre_settlement_price=data['PreSettlementPrice'],
             gateway_name=self.gateway_name
         )
+        if received is not None:
+            trace.stamp(tick, "receive", received)
         self.on_event(type=EVENT_TICK, data=tick)
 
     def connect(self, info: dict):
@@ -22,6 +22,7 @@ Notice : 神兽保佑 ，测试一次通过
 from collections import defaultdict
 
 from ctpbee.constant import *
+from ctpbee import trace
 from ctpbee.event_engine import Event
 from ctpbee.interface.ctp.lib import *
 
@@ -124,7 +125,7 @@ class BeeTdApi(TdApi):
         order_id = f"{self.frontid}_{self.sessionid}_{order_ref}"
         symbol = data["InstrumentID"]
         exchange = symbol_exchange_map[symbol]
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -315,7 +316,7 @@ class BeeTdApi(TdApi):
             ordertype = ORDERTYPE_CTP2VT[data["OrderPriceType"]]
         else:
             ordertype = "non_support"
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -344,7 +345,7 @@ class BeeTdApi(TdApi):
 
         order_id = self.sysid_orderid_map[data["OrderSysID"]]
 
-        trade = TradeData(
+        trade = FastTradeData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -544,6 +545,8 @@ class BeeTdApi(TdApi):
             ctp_req["VolumeCondition"] = THOST_FTDC_VC_CV
 
         self.reqid += 1
+        if trace.ENABLED:
+            trace.sent(req)
         self.reqOrderInsert(ctp_req, self.reqid)
         order_id = f"{self.frontid}_{self.sessionid}_{self.order_ref}"
         order = req._create_order_data(order_id, self.gateway_name)
@@ -683,7 +686,7 @@ class BeeTdApiApp(TdApiApp):
         symbol = data["InstrumentID"]
         exchange = symbol_exchange_map[symbol]
 
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -839,7 +842,7 @@ class BeeTdApiApp(TdApiApp):
             ordertype = ORDERTYPE_CTP2VT[data["OrderPriceType"]]
         else:
             ordertype = "non_support"
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -870,7 +873,7 @@ class BeeTdApiApp(TdApiApp):
 
         order_id = self.sysid_orderid_map[data["OrderSysID"]]
 
-        trade = TradeData(
+        trade = FastTradeData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -1003,6 +1006,8 @@ class BeeTdApiApp(TdApiApp):
             ctp_req["VolumeCondition"] = THOST_FTDC_VC_CV
 
         self.reqid += 1
+        if trace.ENABLED:
+            trace.sent(req)
         self.reqOrderInsert(ctp_req, self.reqid)
 
         order_id = f"{self.frontid}_{self.sessionid}_{self.order_ref}"
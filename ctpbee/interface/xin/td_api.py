@@ -4,7 +4,8 @@ from datetime import datetime
 from ctpbee.constant import EVENT_LOG, EVENT_ERROR, EVENT_ORDER, EVENT_ACCOUNT, EVENT_POSITION, \
     EVENT_CONTRACT, EVENT_TRADE, AccountBanlanceRequest, AccountRegisterRequest, TransferSerialRequest, TransferRequest, \
     OrderRequest, EVENT_LAST, CancelRequest, LastData, TradeData, OrderData, ContractData, AccountData, PositionData, \
-    EVENT_INIT_FINISHED
+    EVENT_INIT_FINISHED, FastOrderData, FastTradeData
+from ctpbee import trace
 from ctpbee.event_engine import Event
 from ctpbee.interface.xin.lib import *
 
@@ -104,7 +105,7 @@ class XinTdApi(TdApi):
 
         symbol = data["InstrumentID"]
         exchange = symbol_exchange_map[symbol]
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -263,7 +264,7 @@ class XinTdApi(TdApi):
         order_ref = data["OrderRef"]
         order_id = f"{frontid}_{sessionid}_{order_ref}"
 
-        order = OrderData(
+        order = FastOrderData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -293,7 +294,7 @@ class XinTdApi(TdApi):
 
         order_id = self.sysid_orderid_map[data["OrderSysID"]]
 
-        trade = TradeData(
+        trade = FastTradeData(
             symbol=symbol,
             exchange=exchange,
             order_id=order_id,
@@ -494,6 +495,8 @@ class XinTdApi(TdApi):
             ctp_req["VolumeCondition"] = THOST_FTDC_VC_CV
 
         self.reqid += 1
+        if trace.ENABLED:
+            trace.sent(req)
         self.reqOrderInsert(ctp_req, self.reqid)
         order_id = f"{self.frontid}_{self.sessionid}_{self.order_ref}"
         order = req._create_order_data(order_id, self.gateway_name)
@@ -2,6 +2,10 @@ import re
 from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
+from ctpbee.data_handle.tick_batch import TickBatch
+
 TAG_ENUM = 'enum'
 TAG_DICT = 'dict'
 TAG_LIST = 'list'
@@ -13,6 +17,7 @@ TAG_NUM = 'num'
 TAG_DATACLASS = 'dataclass'
 TAG_NONE = 'none'
 TAG_SET = 'set'
+TAG_TICK_BATCH = 'tick_batch'
 
 
 class PollenTag(object):
@@ -75,6 +80,27 @@ class TagDataClass(PollenTag):
         return instance
 
 
+class TagTickBatch(PollenTag):
+    """
+    TickBatch按列转换: {"__tick_batch__": {字段: [值]}}, datetime为微秒时间戳
+    """
+    tag = TAG_TICK_BATCH
+    key = "__tick_batch__"
+
+    def check(self, data):
+        return isinstance(data, TickBatch) or (isinstance(data, dict) and len(data) == 1 and self.key in data)
+
+    def to_json(self, data: TickBatch):
+        columns = data.to_columns()
+        columns["datetime"] = data["datetime"].astype("int64").tolist()
+        return {self.key: columns}
+
+    def to_pollen(self, data: dict):
+        columns = dict(data[self.key])
+        columns["datetime"] = np.array(columns["datetime"], dtype="int64").astype("datetime64[us]")
+        return TickBatch.from_columns(**columns)
+
+
 class TagEnum(PollenTag):
     tag = TAG_ENUM
 
@@ -303,6 +329,7 @@ class TagStr(PollenTag):
 
 tags = [
     TagStr,
+    TagTickBatch,
     TagDict,
     TagDataClass,
     TagEnum,
@@ -1,13 +1,15 @@
 import inspect
 import os
 from functools import partial
+from threading import Lock
 from types import MethodType
 from typing import Set, List, AnyStr, Text
 from warnings import warn
 
-from ctpbee.constant import EVENT_INIT_FINISHED, EVENT_TICK, EVENT_BAR, EVENT_ORDER, EVENT_SHARED, EVENT_TRADE, \
-    EVENT_POSITION, EVENT_ACCOUNT, EVENT_CONTRACT, OrderData, SharedData, BarData, TickData, TradeData, \
-    PositionData, AccountData, ContractData, Offset, Direction, OrderType, Exchange
+from ctpbee.constant import EVENT_INIT_FINISHED, EVENT_TICK, EVENT_TICK_BATCH, EVENT_BAR, EVENT_ORDER, EVENT_SHARED, EVENT_TRADE, \
+    EVENT_POSITION, EVENT_ACCOUNT, EVENT_CONTRACT, EVENT_INTRADAY, OrderData, SharedData, BarData, TickData, TradeData, \
+    PositionData, AccountData, ContractData, IntradayData, Offset, Direction, OrderType, Exchange
+from ctpbee import trace
 from ctpbee.data_handle.level_position import ApiPositionManager
 from ctpbee.event_engine.engine import EVENT_TIMER, Event
 from ctpbee.exceptions import ConfigError
@@ -83,6 +85,8 @@ class Action(object):
         price = price + self.app.config['SLIPPAGE_BUY']
         req = helper.generate_order_req_by_var(volume=volume, price=price, offset=Offset.OPEN, direction=Direction.LONG,
                                                type=price_type, exchange=origin.exchange, symbol=origin.symbol)
+        if trace.ENABLED:
+            trace.order(req)
         return self.send_order(req)
 
     def short(self, price: float, volume: float, origin: [BarData, TickData, TradeData, OrderData, PositionData],
@@ -98,6 +102,8 @@ class Action(object):
         req = helper.generate_order_req_by_var(volume=volume, price=price, offset=Offset.OPEN,
                                                direction=Direction.SHORT,
                                                type=price_type, exchange=origin.exchange, symbol=origin.symbol)
+        if trace.ENABLED:
+            trace.order(req)
         return self.send_order(req)
 
     def sell(self, price: float, volume: float, origin: [BarData, TickData, TradeData, OrderData] = None,
@@ -113,6 +119,9 @@ class Action(object):
                                                      type=price_type, exchange=origin.exchange,
                                                      symbol=origin.symbol) for x in
                     self.get_req(origin.local_symbol, Direction.SHORT, volume, self.app)]
+        if trace.ENABLED:
+            for req in req_list:
+                trace.order(req)
         return [self.send_order(req) for req in req_list if req.volume != 0]
 
     def cover(self, price: float, volume: float, origin: [BarData, TickData, TradeData, OrderData, PositionData],
@@ -128,6 +137,9 @@ class Action(object):
                                                      type=price_type, exchange=origin.exchange,
                                                      symbol=origin.symbol) for x in
                     self.get_req(origin.local_symbol, Direction.LONG, volume, self.app)]
+        if trace.ENABLED:
+            for req in req_list:
+                trace.order(req)
         return [self.send_order(req) for req in req_list if req.volume != 0]
 
     def cancel(self, id: Text, origin: [BarData, TickData, TradeData, OrderData, PositionData] = None, **kwargs):
@@ -246,7 +258,8 @@ class Action(object):
 
     @check(type="market")
     def subscribe(self, local_symbol: AnyStr):
-        """订阅行情"""
+        """订阅行情, 同时创建该合约的k线合成器"""
+        self.app.recorder.create_generator(local_symbol)
         if "." in local_symbol:
             local_symbol = local_symbol.split(".")[0]
         return self.app.market.subscribe(local_symbol)
@@ -265,6 +278,100 @@ class ActionProxy:
         return callable_func
 
 
+# 所有InstrumentSet共用的锁, 订阅合约很少修改, 只用于保证重建路由表时读取到完整的集合
+_INSTRUMENT_LOCK = Lock()
+
+
+class InstrumentSet(set):
+    """
+    策略订阅的合约集合
+    发生变化的时候通知app重建local_symbol -> 插件的路由表
+    """
+
+    def __init__(self, iterable=(), owner=None):
+        super().__init__(iterable)
+        self.owner = owner
+
+    def _changed(self):
+        app = getattr(self.owner, "app", None)
+        if app is not None:
+            app.update_route()
+
+    def snapshot(self) -> frozenset:
+        """ 当前订阅合约的副本, 其他线程同时修改集合时也是完整的 """
+        with _INSTRUMENT_LOCK:
+            return frozenset(self)
+
+    def add(self, element):
+        with _INSTRUMENT_LOCK:
+            super().add(element)
+        self._changed()
+
+    # 兼容以列表形式使用instrument_set的写法
+    append = add
+
+    def discard(self, element):
+        with _INSTRUMENT_LOCK:
+            super().discard(element)
+        self._changed()
+
+    def remove(self, element):
+        with _INSTRUMENT_LOCK:
+            super().remove(element)
+        self._changed()
+
+    def pop(self):
+        with _INSTRUMENT_LOCK:
+            element = super().pop()
+        self._changed()
+        return element
+
+    def clear(self):
+        with _INSTRUMENT_LOCK:
+            super().clear()
+        self._changed()
+
+    def update(self, *others):
+        with _INSTRUMENT_LOCK:
+            super().update(*others)
+        self._changed()
+
+    def difference_update(self, *others):
+        with _INSTRUMENT_LOCK:
+            super().difference_update(*others)
+        self._changed()
+
+    def intersection_update(self, *others):
+        with _INSTRUMENT_LOCK:
+            super().intersection_update(*others)
+        self._changed()
+
+    def symmetric_difference_update(self, other):
+        with _INSTRUMENT_LOCK:
+            super().symmetric_difference_update(other)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+    def __reduce__(self):
+        # 复制的时候不带上owner
+        return set, (list(self),)
+
+
 class BeeApi(object):
     def resolve_callback(self, item, result):
         """
@@ -274,6 +381,54 @@ class BeeApi(object):
         """
         pass
 
+    @property
+    def instrument_set(self) -> Set:
+        return self._instrument_set
+
+    @instrument_set.setter
+    def instrument_set(self, value):
+        """ 重新赋值订阅合约同样需要更新app的路由表 """
+        self._instrument_set = InstrumentSet(value, owner=self)
+        self._instrument_set._changed()
+
+    def add_timer(self, interval: float, func=None, align: bool = False, offset: float = 0.0, name: str = None) -> str:
+        """
+        注册插件自己的定时器, 返回定时器通道名称
+        * interval: 触发间隔(秒), 支持小数, 例如 0.1
+        * func: 不接收参数的回调函数(AsyncApi中可以是协程函数), 默认为 on_realtime
+        * align/offset: 对齐到当天零点起interval的整数倍, 例如 add_timer(60, self.on_minute, align=True)
+        插件被冻结或者被移除之后不再调用
+        """
+        func = func or self.on_realtime
+        name = name or f"{self.extension_name}.{func.__name__}"
+
+        def callback():
+            if self.frozen or self.app.extensions.get(self.extension_name) is not self:
+                return None
+            # 多线程分片引擎下与插件的其他回调互斥
+            extension_lock = getattr(self.app.event_engine, "extension_lock", None)
+            if extension_lock is None:
+                return func()
+            with extension_lock(self.extension_name):
+                return func()
+
+        self._timers[name] = (interval, align, offset, callback)
+        if self.app is not None:
+            self._install_timers()
+        return name
+
+    def remove_timer(self, name: str):
+        """ 移除通过add_timer注册的定时器 """
+        self._timers.pop(name, None)
+        if self.app is not None:
+            self.app.event_engine.scheduler.remove_channel(name)
+
+    def _install_timers(self):
+        scheduler = self.app.event_engine.scheduler
+        for name, (interval, align, offset, callback) in self._timers.items():
+            scheduler.add_channel(name, interval, align, offset)
+            scheduler.subscribe(name, callback)
+
 
 class CtpbeeApi(BeeApi):
     """
@@ -297,9 +452,11 @@ class CtpbeeApi(BeeApi):
             EVENT_TIMER: cls.on_realtime,
             EVENT_INIT_FINISHED: cls.on_init,
             EVENT_TICK: cls.on_tick,
+            EVENT_TICK_BATCH: cls.on_tick_batch,
             EVENT_BAR: cls.on_bar,
             EVENT_ORDER: cls.on_order,
             EVENT_SHARED: cls.on_shared,
+            EVENT_INTRADAY: cls.on_intraday,
             EVENT_TRADE: cls.on_trade,
             EVENT_POSITION: cls.on_position,
             EVENT_ACCOUNT: cls.on_account,
@@ -312,8 +469,10 @@ class CtpbeeApi(BeeApi):
             EVENT_TRADE: EVENT_TRADE,
             EVENT_BAR: EVENT_BAR,
             EVENT_TICK: EVENT_TICK,
+            EVENT_TICK_BATCH: EVENT_TICK_BATCH,
             EVENT_ORDER: EVENT_ORDER,
             EVENT_SHARED: EVENT_SHARED,
+            EVENT_INTRADAY: EVENT_INTRADAY,
             EVENT_ACCOUNT: EVENT_ACCOUNT,
             EVENT_CONTRACT: EVENT_CONTRACT,
         }
@@ -337,22 +496,34 @@ class CtpbeeApi(BeeApi):
         else:
             func = self.map[event.type]
             if not self.frozen:
-                func(self, event.data)
+                if not trace.ENABLED:
+                    func(self, event.data)
+                    return
+                trace.enter(self.extension_name, event.data)
+                try:
+                    func(self, event.data)
+                finally:
+                    trace.leave()
 
     def __init__(self, extension_name, app=None, **kwargs):
         """
         init function
         :param name: extension name , 插件名字
         :param app: CtpBee 实例
+        :param copy_event: 是否接收独立的事件副本(deepcopy), 默认接收共享的只读数据
         """
-        self.instrument_set: List or Set = set()
+        self.instrument_set = set()
         self.extension_name = extension_name
+        # 通道名称 -> (interval, align, offset, callback), 见add_timer
+        self._timers = {}
         self.app = app
 
         if self.app is not None:
             self.init_app(self.app)
         # 是否冻结
         self.frozen = False
+        # 是否为此插件单独deepcopy事件, 默认与其他插件共享只读数据(FrozenData)
+        self.copy_event = kwargs.get("copy_event", False)
         if "cache_path" in kwargs:
             self.path = kwargs.get("cache_path")
             if not os.path.isdir(self.path):
@@ -427,18 +598,34 @@ class CtpbeeApi(BeeApi):
             raise ValueError("没有载入CtpBee，请尝试通过init_app载入app")
         return self.app.recorder
 
+    def subscribe_intraday(self, local_symbol: str):
+        """ 订阅合约的当日统计, 之后该合约的每个tick都会调用on_intraday """
+        self.recorder.intraday.subscribe(local_symbol, self)
+
+    def unsubscribe_intraday(self, local_symbol: str):
+        self.recorder.intraday.unsubscribe(local_symbol, self)
+
     def on_order(self, order: OrderData) -> None:
         pass
 
     def on_shared(self, shared: SharedData) -> None:
         pass
 
+    def on_intraday(self, data: IntradayData) -> None:
+        """ 订阅的合约的当日统计(成交量增量/均价/成交额/持仓量变化), 见subscribe_intraday """
+        pass
+
     def on_bar(self, bar: BarData) -> None:
         raise NotImplemented
 
     def on_tick(self, tick: TickData) -> None:
         raise NotImplemented
 
+    def on_tick_batch(self, batch) -> None:
+        """ 批量tick(TickBatch, 只包含一个合约), 默认逐个调用on_tick, 需要批量处理时重写此方法 """
+        for tick in batch:
+            self.on_tick(tick)
+
     def on_trade(self, trade: TradeData) -> None:
         pass
 
@@ -461,6 +648,8 @@ class CtpbeeApi(BeeApi):
         if app is not None:
             self.app = app
             self.app.extensions[self.extension_name] = self
+            self.app.update_route()
+            self._install_timers()
 
     def route(self, handler):
         """ """
@@ -484,7 +673,7 @@ class CtpbeeApi(BeeApi):
         return attribute
 
 
-class AsyncApi(object):
+class AsyncApi(BeeApi):
     """
     数据模块
     策略模块
@@ -497,9 +686,11 @@ class AsyncApi(object):
             EVENT_TIMER: cls.on_realtime,
             EVENT_INIT_FINISHED: cls.on_init,
             EVENT_TICK: cls.on_tick,
+            EVENT_TICK_BATCH: cls.on_tick_batch,
             EVENT_BAR: cls.on_bar,
             EVENT_ORDER: cls.on_order,
             EVENT_SHARED: cls.on_shared,
+            EVENT_INTRADAY: cls.on_intraday,
             EVENT_TRADE: cls.on_trade,
             EVENT_POSITION: cls.on_position,
             EVENT_ACCOUNT: cls.on_account,
@@ -512,8 +703,10 @@ class AsyncApi(object):
             EVENT_TRADE: EVENT_TRADE,
             EVENT_BAR: EVENT_BAR,
             EVENT_TICK: EVENT_TICK,
+            EVENT_TICK_BATCH: EVENT_TICK_BATCH,
             EVENT_ORDER: EVENT_ORDER,
             EVENT_SHARED: EVENT_SHARED,
+            EVENT_INTRADAY: EVENT_INTRADAY,
             EVENT_ACCOUNT: EVENT_ACCOUNT,
             EVENT_CONTRACT: EVENT_CONTRACT,
         }
@@ -521,7 +714,7 @@ class AsyncApi(object):
         setattr(cls, "parmeter", parmeter)
         return super().__new__(cls)
 
-    def __init__(self, extension_name, app=None):
+    def __init__(self, extension_name, app=None, **kwargs):
         """
         init function
         :param name: extension name , 插件名字
@@ -529,12 +722,15 @@ class AsyncApi(object):
         :param api_type 针对几种API实行不同的优化措施
         """
         self.extension_name = extension_name
-        self.instrument_set: List or Set = set()
+        self.instrument_set = set()
+        self._timers = {}
         self.app = app
         if self.app is not None:
             self.init_app(self.app)
         # 是否冻结
         self.frozen = False
+        # 是否为此插件单独deepcopy事件, 默认与其他插件共享只读数据(FrozenData)
+        self.copy_event = kwargs.get("copy_event", False)
 
     @property
     def action(self):
@@ -548,6 +744,13 @@ class AsyncApi(object):
             raise ValueError("没有载入CtpBee，请尝试通过init_app载入app")
         return self.app.recorder
 
+    def subscribe_intraday(self, local_symbol: str):
+        """ 订阅合约的当日统计, 之后该合约的每个tick都会调用on_intraday """
+        self.recorder.intraday.subscribe(local_symbol, self)
+
+    def unsubscribe_intraday(self, local_symbol: str):
+        self.recorder.intraday.unsubscribe(local_symbol, self)
+
     @property
     def logger(self):
         if self.app is None:
@@ -576,12 +779,21 @@ class AsyncApi(object):
     async def on_shared(self, shared: SharedData) -> None:
         pass
 
+    async def on_intraday(self, data: IntradayData) -> None:
+        """ 订阅的合约的当日统计(成交量增量/均价/成交额/持仓量变化), 见subscribe_intraday """
+        pass
+
     async def on_bar(self, bar: BarData) -> None:
         raise NotImplemented
 
     async def on_tick(self, tick: TickData) -> None:
         raise NotImplemented
 
+    async def on_tick_batch(self, batch) -> None:
+        """ 批量tick(TickBatch, 只包含一个合约), 默认逐个调用on_tick, 需要批量处理时重写此方法 """
+        for tick in batch:
+            await self.on_tick(tick)
+
     async def on_trade(self, trade: TradeData) -> None:
         pass
 
@@ -625,6 +837,8 @@ class AsyncApi(object):
         if app is not None:
             self.app = app
             self.app.extensions[self.extension_name] = self
+            self.app.update_route()
+            self._install_timers()
 
     async def __call__(self, event: Event = None):
         if not event:
@@ -633,4 +847,12 @@ class AsyncApi(object):
         else:
             func = self.map[event.type]
             if not self.frozen:
-                await func(self, event.data)
+                if not trace.ENABLED:
+                    await func(self, event.data)
+                    return
+                # 协程在await期间可能切换, 追踪结果以进入回调之后同步生成的报单为准
+                trace.enter(self.extension_name, event.data)
+                try:
+                    await func(self, event.data)
+                finally:
+                    trace.leave()
@@ -8,6 +8,8 @@
 # todo: 将各家数据转化为从ctpbee数据包 ^_^ alse it will be a good idea to
 from itertools import chain
 
+from ctpbee.data_handle.tick_batch import TickBatch
+
 
 class Bumblebee(dict):
     """  """
@@ -44,6 +46,13 @@ class VessData:
         # 数据类型默认设置为tick
         # 默认的产品类型
         self.product_type = "future"
+        self.slice = 0
+        if isinstance(data, TickBatch):
+            # 批量tick在回测时逐个转换, 不会一次性创建全部对象
+            self.data_type = "tick"
+            self.inner_data = (Bumblebee(**row) for row in data.rows())
+            self.init_flag = True
+            return
         # 应该是个生成器
         self.data_type = Bumblebee(**data[0]).type
         try:
@@ -52,8 +61,6 @@ class VessData:
         except Exception:
             pass
 
-        self.slice = 0
-
     def __next__(self):
         """ 实现生成器协议使得这个类可以被next函数不断调用 """
         # 实际上是不断调用 inner_data的__next__协议
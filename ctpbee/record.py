@@ -1,43 +1,252 @@
-import warnings
-from collections import defaultdict
-from copy import deepcopy
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
-
-from ctpbee.constant import EVENT_TICK, EVENT_ORDER, EVENT_TRADE, EVENT_POSITION, EVENT_ACCOUNT, \
-    EVENT_CONTRACT, EVENT_BAR, EVENT_LOG, EVENT_ERROR, EVENT_SHARED, EVENT_LAST, EVENT_INIT_FINISHED
-from ctpbee.data_handle import generator
+from threading import Lock
+from time import monotonic
+
+from ctpbee.constant import EVENT_TICK, EVENT_TICK_BATCH, EVENT_ORDER, EVENT_TRADE, EVENT_POSITION, EVENT_ACCOUNT, \
+    EVENT_CONTRACT, EVENT_BAR, EVENT_LOG, EVENT_ERROR, EVENT_SHARED, EVENT_LAST, EVENT_INIT_FINISHED, \
+    EVENT_INTRADAY, EVENT_SESSION_CLOSE
+from ctpbee.data_handle import GeneratorManager
+from ctpbee.data_handle.active_orders import ActiveOrderIndex
+from ctpbee.data_handle.bar_store import BarStore
+from ctpbee.data_handle.buffer import ExpiringDeque, ExpiringDict, sizeof
+from ctpbee.data_handle.intraday import IntradayAnalytics
+from ctpbee.data_handle.main_contract import MainContractIndex
+from ctpbee.data_handle.timestamp import decoder
 from ctpbee.data_handle.local_position import LocalPositionManager
-from ctpbee.event_engine import Event
+from ctpbee import trace
+from ctpbee.event_engine import Event, ShardedEngine
 from ctpbee.event_engine.engine import EVENT_TIMER
-from ctpbee.helpers import value_call, async_value_call
+from ctpbee.helpers import value_call, async_value_call, freeze_event, event_for
+
+# 默认的保留策略, 同名配置项可以覆盖, 见CtpBee.default_config
+DEFAULT_RETENTION = dict(
+    BAR_RETENTION=10000,
+    SHARED_RETENTION=2000,
+    LOG_RETENTION=10000,
+    LOG_TTL=None,
+    ERROR_RETENTION=1000,
+    ERROR_TTL=None,
+)
+
+
+class RecorderMixin:
+    """
+    Recorder与AsyncRecorder共用的数据存储
+    保留策略: k线按合约以及周期最多保留BAR_RETENTION根, 分时图数据按合约限制数量, 日志与错误按照数量以及保留时间淘汰
+    k线: 只以列式保存在BarStore中, get_bar根据数组创建BarData, 见get_bar_array
+    主力合约: 见MainContractIndex
+    活跃报单: 见ActiveOrderIndex, active_orders为其中的 {local_order_id: order}
+    当日统计: 见IntradayAnalytics, 分时图数据也由其生成
+    lock: 多线程分片引擎下保护跨合约共享的数据(持仓, 活跃报单, 主力合约, k线存储, 分时图), 其他引擎下为空操作
+    """
+
+    def _init_retention(self):
+        self.retention = dict(DEFAULT_RETENTION)
+        self.bar_store = BarStore(self.retention["BAR_RETENTION"])
+        self.shared = {}
+        self.logs = ExpiringDict(self.retention["LOG_RETENTION"], self.retention["LOG_TTL"])
+        self.errors = ExpiringDeque(maxlen=self.retention["ERROR_RETENTION"], ttl=self.retention["ERROR_TTL"])
+        self.main_contract = MainContractIndex()
+        self.active_index = ActiveOrderIndex()
+        self.active_orders = self.active_index.orders
+        self.intraday = IntradayAnalytics()
+
+    def _shared_bucket(self, items=()) -> deque:
+        return deque(items, maxlen=self.retention["SHARED_RETENTION"])
+
+    def configure(self, config):
+        """
+        根据配置更新保留策略, 已经保存的数据按照新的上限裁剪
+        """
+        self.retention = {key: config.get(key, default) for key, default in DEFAULT_RETENTION.items()}
+        self.logs.maxlen, self.logs.ttl = self.retention["LOG_RETENTION"], self.retention["LOG_TTL"]
+        while self.logs.maxlen is not None and len(self.logs) > self.logs.maxlen:
+            self.logs.popitem(last=False)
+        self.logs.expire()
+        self.errors = ExpiringDeque(self.errors, maxlen=self.retention["ERROR_RETENTION"],
+                                    ttl=self.retention["ERROR_TTL"])
+        if self.bar_store.capacity != self.retention["BAR_RETENTION"]:
+            self.bar_store.resize(self.retention["BAR_RETENTION"])
+        self.shared = {local_symbol: self._shared_bucket(items) for local_symbol, items in self.shared.items()}
+
+    @property
+    def main_contract_mapping(self) -> dict:
+        """ {品种: [每个合约最新的行情快照]} """
+        return self.main_contract.snapshots()
+
+    @property
+    def main_contract_list(self):
+        """ 返回主力合约列表 """
+        return self.main_contract.main_list()
+
+    def get_main_contract_by_code(self, code: str):
+        """ 根据code取相应的主力合约 """
+        return self.main_contract.main(code)
+
+    def get_pre_main_contract_by_code(self, code: str):
+        """ 根据code取相应的昨日主力合约 """
+        return self.main_contract.pre_main(code)
 
+    def _store_bar(self, bar):
+        with self.lock:
+            self.bar_store.append(bar)
 
-class Recorder(object):
+    @property
+    def bar(self) -> dict:
+        """ 与get_all_bar相同, 保留原先的属性 """
+        return self.get_all_bar()
+
+    def get_bar(self, local_symbol):
+        """ {interval: [BarData]}, 根据BarStore中保留的k线创建, 没有k线时返回None """
+        with self.lock:
+            store = self.bar_store
+            intervals = store.intervals(local_symbol)
+            if not intervals:
+                return None
+            return {interval: store.bars(local_symbol, interval) for interval in intervals}
+
+    def get_all_bar(self):
+        """ {local_symbol: {interval: [BarData]}}, 见get_bar """
+        with self.lock:
+            store = self.bar_store
+            return {local_symbol: {interval: store.bars(local_symbol, interval)
+                                   for interval in store.intervals(local_symbol)}
+                    for local_symbol in store.local_symbols()}
+
+    def get_bar_array(self, local_symbol: str, interval, n: int = None):
+        """
+        最近n根(默认全部)k线的numpy结构化数组, 字段与BarData一致, 返回只读视图不复制数据
+            bars = self.recorder.get_bar_array("rb2010.SHFE", 1, 20)
+            bars["close_price"].mean()
+        """
+        return self.bar_store.array(local_symbol, interval, n)
+
+    def get_all_active_orders(self, local_symbol: str = "", direction=None, offset=None):
+        """
+        取到活跃的报单, 可以按照合约, 方向以及开平过滤
+            get_all_active_orders("rb2010.SHFE", Direction.LONG, Offset.OPEN)
+        """
+        with self.lock:
+            return self.active_index.get(local_symbol, direction, offset)
+
+    def get_intraday(self, local_symbol: str):
+        """ 合约当前交易日的统计IntradayData(成交量增量/均价/成交额/持仓量变化), 没有行情时返回None """
+        return self.intraday.get(local_symbol)
+
+    def _update_intraday(self, ticks) -> tuple:
+        """
+        按顺序更新当日统计, 开启SHARED_FUNC时每分钟推送分时图数据
+        返回最后一个tick之后需要推送的 (Event(EVENT_INTRADAY), 订阅该合约的插件列表)
+        """
+        shared = self.app.config.get("SHARED_FUNC")
+        stats = None
+        for tick in ticks:
+            stats = self.intraday.update(tick)
+            if shared and stats.new_minute:
+                self.event_engine.put(Event(EVENT_SHARED, stats.shared()))
+        subscribers = self.intraday.subscribers.get(stats.local_symbol)
+        if not subscribers:
+            return None, ()
+        return Event(EVENT_INTRADAY, stats.snapshot()), list(subscribers.values())
+
+    def create_generator(self, symbol: str):
+        """
+        订阅时提前创建合约的k线合成器, symbol为local_symbol或者合约代码.
+        只有合约代码时从已经收到的合约中查找交易所, 找不到时等到收到合约推送再创建
+        """
+        if "." in symbol:
+            return self.generators.create(symbol)
+        for contract in self.contracts.values():
+            if contract.symbol == symbol:
+                return self.generators.create(contract.local_symbol)
+        return None
+
+    def _prepare_subscribed(self, contract):
+        """ 收到合约推送之前已经按照合约代码订阅的合约, 此时创建k线合成器 """
+        market = getattr(self.app, "market", None)
+        if contract.symbol in getattr(market, "subscribed", ()):
+            self.generators.create(contract.local_symbol)
+
+    def flush_bars(self, local_symbol: str = None, timeout: float = None) -> bool:
+        """
+        收盘时推送未完成的k线, 通过EVENT_SESSION_CLOSE在合约所在的处理线程中完成.
+        timeout不为None时最多等待timeout秒, 返回是否全部处理完成
+        """
+        requests = self.generators.request_flush(local_symbol)
+        if timeout is None:
+            return all(request.done.is_set() for request in requests)
+        deadline = monotonic() + timeout
+        return all(request.done.wait(max(deadline - monotonic(), 0)) for request in requests)
+
+    def _split_tick_batch(self, batch) -> dict:
+        """
+        按合约拆分批量tick并设为只读, 只为每个合约最新的tick创建对象用于更新ticks与持仓, 返回 {local_symbol: TickBatch}
+        """
+        groups = batch.split()
+        for local_symbol, ticks in groups.items():
+            ticks.freeze()
+            tick = ticks.tick(-1)
+            self.ticks[local_symbol] = tick
+            with self.lock:
+                self.position_manager.update_tick(tick)
+        return groups
+
+    def _store_shared(self, shared):
+        with self.lock:
+            bucket = self.shared.get(shared.local_symbol)
+            if bucket is None:
+                bucket = self.shared[shared.local_symbol] = self._shared_bucket()
+            bucket.append(shared)
+
+    def memory_usage(self) -> dict:
+        """
+        每类数据的数量以及估算的内存占用(字节)
+        """
+        groups = {
+            "bar": self.bar_store.buffers(),
+            "shared": list(self.shared.values()),
+            "main_contract": list(self.main_contract_mapping.values()),
+            "logs": [self.logs],
+            "errors": [self.errors],
+            "ticks": [self.ticks],
+            "orders": [self.orders],
+            "active_orders": [self.active_orders],
+            "trades": [self.trades],
+            "positions": [self.positions],
+            "contracts": [self.contracts],
+        }
+        return {
+            name: {"count": sum(len(x) for x in containers), "bytes": sum(sizeof(x) for x in containers)}
+            for name, containers in groups.items()
+        }
+
+
+class Recorder(RecorderMixin):
     """
     data center
     """
 
     def __init__(self, app, event_engine):
         """"""
-        self.bar = {}
+        self._init_retention()
         self.ticks = {}
         self.orders = {}
         self.trades = {}
         self.positions = {}
         self.account = None
         self.contracts = {}
-        self.logs = {}
-        self.errors = []
-        self.shared = {}
-        self.generators = {}
-        self.active_orders = {}
+        # local_symbol -> DataGenerator
+        self.generators = GeneratorManager(event_engine, app)
         self.local_contract_price_mapping = {}
         self.event_engine = event_engine
+        # 分片引擎的多个处理线程同时更新共享数据, 见RecorderMixin
+        self.lock = Lock() if isinstance(event_engine, ShardedEngine) else nullcontext()
         self.register_event()
 
         self.app = app
         self.position_manager = LocalPositionManager(app=self.app)
-        self.main_contract_mapping = defaultdict(list)
 
     @staticmethod
     def get_local_time():
@@ -47,6 +256,7 @@ class Recorder(object):
     def register_event(self):
         """ bind process function """
         self.event_engine.register(EVENT_TICK, self.process_tick_event)
+        self.event_engine.register(EVENT_TICK_BATCH, self.process_tick_batch_event)
         self.event_engine.register(EVENT_ORDER, self.process_order_event)
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
         self.event_engine.register(EVENT_POSITION, self.process_position_event)
@@ -59,36 +269,37 @@ class Recorder(object):
         self.event_engine.register(EVENT_LAST, self.process_last_event)
         self.event_engine.register(EVENT_INIT_FINISHED, self.process_init_event)
         self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+        self.event_engine.register(EVENT_SESSION_CLOSE, self.process_session_close_event)
 
     def process_timer_event(self):
+        event = Event(EVENT_TIMER)
+        now = datetime.now()
+        self.generators.check(now)
         for x in self.app.extensions.values():
-            x()
+            self.event_engine.invoke(event, x)
+
+    def process_session_close_event(self, event: Event):
+        """ 交易时段结束, 在合约所在的处理线程中结束k线 """
+        self.generators.close_session(event.data)
 
     def process_init_event(self, event):
         """ 处理初始化完成事件 """
         if event.data:
             self.app.init_finished = True
+        frozen = freeze_event(event)
         for x in self.app.extensions.values():
-            x(deepcopy(event))
+            self.event_engine.invoke(event, x, event_for(x, event, frozen))
 
     def process_last_event(self, event):
         """ 处理合约的最新行情数据 """
         data = event.data
         self.local_contract_price_mapping[data.local_symbol] = data.last_price
-        # 过滤掉数字 取中文做key
-        key = "".join([x for x in data.symbol if not x.isdigit()])
-        self.main_contract_mapping[key.upper()].append(data)
+        with self.lock:
+            self.main_contract.update(data)
 
+    @value_call
     def process_shared_event(self, event):
-        self.shared.setdefault(event.data.local_symbol, []).append(event.data)
-        for value in self.app.extensions.values():
-            if self.app.config['INSTRUMENT_INDEPEND']:
-                if len(value.instrument_set) == 0:
-                    warnings.warn("你当前开启策略对应订阅行情功能, 当前策略的订阅行情数量为0，请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
-                if event.data.local_symbol in value.instrument_set:
-                    value(deepcopy(event))
-            else:
-                value(deepcopy(event))
+        self._store_shared(event.data)
 
     def process_error_event(self, event: Event):
         self.errors.append({"time": self.get_local_time(), "data": event.data})
@@ -101,93 +312,80 @@ class Recorder(object):
 
     @value_call
     def process_bar_event(self, event: Event):
-        bar = event.data
-        local = self.bar.get(bar.local_symbol)
-        if local is None:
-            self.bar[bar.local_symbol] = {bar.interval: []}
-        else:
-            if self.bar[bar.local_symbol].get(bar.interval) is None:
-                self.bar[bar.local_symbol] = {bar.interval: []}
-        self.bar[bar.local_symbol][bar.interval].append(bar)
+        self._store_bar(event.data)
 
     @value_call
     def process_tick_event(self, event: Event):
         """"""
         tick = event.data
+        if trace.ENABLED:
+            trace.stamp(tick, "dispatch")
         self.ticks[tick.local_symbol] = tick
-        symbol = tick.symbol
-        self.position_manager.update_tick(tick)
+        with self.lock:
+            self.position_manager.update_tick(tick)
         # 生成datetime对象
         if not tick.datetime:
-            if '.' in tick.time:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S.%f')
-            else:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S')
-        bm = self.generators.get(symbol, None)
-        if bm:
-            bm.update_tick(tick)
-        if not bm:
-            self.generators[symbol] = generator(self.event_engine, self.app)
+            tick.datetime = decoder.decode(tick.date, tick.time)
+        # 开启tick合并时, 被合并掉的tick依旧需要用于统计以及生成k线
+        conflated = getattr(event, "conflated", ())
+        intraday, subscribers = self._update_intraday((*conflated, tick))
+        if subscribers:
+            frozen = freeze_event(intraday)
+            for value in subscribers:
+                self.event_engine.invoke(intraday, value, event_for(value, intraday, frozen))
+        self.generators.update_tick(tick, conflated)
+
+    def process_tick_batch_event(self, event: Event):
+        """ 批量tick按照合约拆分之后交给插件的on_tick_batch, 批量tick不参与k线合成 """
+        for local_symbol, batch in self._split_tick_batch(event.data).items():
+            split = Event(EVENT_TICK_BATCH, batch)
+            for value in self.app.extensions_for(local_symbol):
+                self.event_engine.invoke(split, value, split)
 
     @value_call
     def process_order_event(self, event: Event):
         """"""
         order = event.data
-        self.orders[order.local_order_id] = order
-        # If order is active, then update data in dict.
-        if order._is_active():
-            self.active_orders[order.local_order_id] = order
-        # Otherwise, pop inactive order from in dict
-        elif order.local_order_id in self.active_orders:
-            self.active_orders.pop(order.local_order_id)
-        self.position_manager.update_order(order)
+        with self.lock:
+            self.orders[order.local_order_id] = order
+            # 活跃的报单加入索引, 否则从索引中移除
+            self.active_index.update(order)
+            self.position_manager.update_order(order)
 
     @value_call
     def process_trade_event(self, event: Event):
         """"""
         trade = event.data
-        self.trades[trade.local_trade_id] = trade
-
-        self.position_manager.update_trade(trade)
-        for value in self.app.extensions.values():
-            if self.app.config['INSTRUMENT_INDEPEND']:
-                if len(value.instrument_set) == 0:
-                    warnings.warn("你当前开启策略对应订阅行情功能, 当前策略的订阅行情数量为0，请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
-                if event.data.local_symbol in value.instrument_set:
-                    value(deepcopy(event))
-            else:
-                value(deepcopy(event))
+        with self.lock:
+            self.trades[trade.local_trade_id] = trade
+            self.position_manager.update_trade(trade)
 
     @value_call
     def process_position_event(self, event: Event):
         """"""
         position = event.data
-        self.positions[position.local_position_id] = position
-        # 本地实时计算 --> todo :优化
-        self.position_manager.update_position(position)
-        for value in self.app.extensions.values():
-            if self.app.config['INSTRUMENT_INDEPEND']:
-                if len(value.instrument_set) == 0:
-                    warnings.warn("你当前开启策略对应订阅行情功能, 当前策略的订阅行情数量为0，请确保你的订阅变量是否为instrument_set，以及订阅具体代码")
-                if event.data.local_symbol in value.instrument_set:
-                    value(deepcopy(event))
-            else:
-                value(deepcopy(event))
+        with self.lock:
+            self.positions[position.local_position_id] = position
+            # 本地实时计算 --> todo :优化
+            self.position_manager.update_position(position)
 
     def process_account_event(self, event: Event):
         """"""
         account = event.data
         self.account = account
 
+        frozen = freeze_event(event)
         for value in self.app.extensions.values():
-            value(deepcopy(event))
+            self.event_engine.invoke(event, value, event_for(value, event, frozen))
 
     def process_contract_event(self, event: Event):
         """"""
         contract = event.data
         self.contracts[contract.local_symbol] = contract
+        self._prepare_subscribed(contract)
+        frozen = freeze_event(event)
         for value in self.app.extensions.values():
-            value(deepcopy(event))
+            self.event_engine.invoke(event, value, event_for(value, event, frozen))
 
     def get_shared(self, symbol):
         return self.shared.get(symbol, None)
@@ -195,12 +393,6 @@ class Recorder(object):
     def get_all_shared(self):
         return self.shared
 
-    def get_bar(self, local_symbol):
-        return self.bar.get(local_symbol, None)
-
-    def get_all_bar(self):
-        return self.bar
-
     def get_tick(self, local_symbol):
         return self.ticks.get(local_symbol, None)
 
@@ -257,80 +449,44 @@ class Recorder(object):
         """
         return list(self.contracts.values())
 
-    def get_all_active_orders(self, local_symbol: str = ""):
-        if not local_symbol:
-            return list(self.active_orders.values())
-        else:
-            active_orders = [
-                order
-                for order in self.active_orders.values()
-                if order.local_symbol == local_symbol
-            ]
-            return active_orders
-
-    @property
-    def main_contract_list(self):
-        """ 返回主力合约列表 """
-        result = []
-        for _ in self.main_contract_mapping.values():
-            x = sorted(_, key=lambda x: x.open_interest, reverse=True)[0]
-            result.append(x.local_symbol)
-        return result
-
     def get_contract_last_price(self, local_symbol):
         """ 获取合约的最新价格 """
         return self.local_contract_price_mapping.get(local_symbol)
 
-    def get_main_contract_by_code(self, code: str):
-        """ 根据code取相应的主力合约 """
-        d = self.main_contract_mapping.get(code.upper(), None)
-        if not d:
-            return None
-        else:
-            now = sorted(d, key=lambda x: x.open_interest, reverse=True)[0]
-            pre = sorted(d, key=lambda x: x.pre_open_interest, reverse=True)[0]
-            if pre.local_symbol == now.local_symbol:
-                return pre
-            else:
-                return now
-
     def clear_all(self):
         """
         为了避免数据越来越大，需要清空数据
         :return:
         """
-        self.ticks.clear()
-        self.orders.clear()
-        self.trades.clear()
-        self.positions.clear()
-        self.contracts.clear()
-        self.errors.clear()
-        self.shared.clear()
-        self.generators.clear()
-        self.active_orders.clear()
-
-
-class AsyncRecorder(object):
+        with self.lock:
+            self.ticks.clear()
+            self.orders.clear()
+            self.trades.clear()
+            self.positions.clear()
+            self.contracts.clear()
+            self.errors.clear()
+            self.shared.clear()
+            self.active_index.clear()
+
+
+class AsyncRecorder(RecorderMixin):
     """
     data center
     """
 
     def __init__(self, app, event_engine):
         """"""
-        self.main_contract_mapping = defaultdict(list)
-        self.bar = {}
+        self._init_retention()
         self.ticks = {}
         self.orders = {}
         self.trades = {}
         self.positions = {}
         self.account = None
         self.contracts = {}
-        self.logs = {}
-        self.errors = []
-        self.shared = {}
-        self.generators = {}
-        self.active_orders = {}
+        # local_symbol -> DataGenerator
+        self.generators = GeneratorManager(event_engine, app)
         self.event_engine = event_engine
+        self.lock = nullcontext()
         self.register_event()
 
         self.app = app
@@ -344,6 +500,7 @@ class AsyncRecorder(object):
     def register_event(self):
         """bind process function"""
         self.event_engine.register(EVENT_TICK, self.process_tick_event)
+        self.event_engine.register(EVENT_TICK_BATCH, self.process_tick_batch_event)
         self.event_engine.register(EVENT_ORDER, self.process_order_event)
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
         self.event_engine.register(EVENT_POSITION, self.process_position_event)
@@ -356,54 +513,36 @@ class AsyncRecorder(object):
         self.event_engine.register(EVENT_LAST, self.process_last_event)
         self.event_engine.register(EVENT_INIT_FINISHED, self.process_init_event)
         self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+        self.event_engine.register(EVENT_SESSION_CLOSE, self.process_session_close_event)
 
     async def process_timer_event(self):
+        event = Event(EVENT_TIMER)
+        now = datetime.now()
+        self.generators.check(now)
         for x in self.app.extensions.values():
-            await x()
+            await self.event_engine.invoke(event, x)
+
+    async def process_session_close_event(self, event: Event):
+        """ 交易时段结束, 结束k线 """
+        self.generators.close_session(event.data)
 
     async def process_init_event(self, event):
         """ 处理初始化完成事件 """
         if event.data:
             self.app.init_finished = True
+        frozen = freeze_event(event)
         for x in self.app.extensions.values():
-            await x(deepcopy(event))
+            await self.event_engine.invoke(event, x, event_for(x, event, frozen))
 
     async def process_last_event(self, event):
         """ 处理合约的最新行情数据 """
         data = event.data
 
-        # 过滤掉数字 取中文做key
-        key = "".join([x for x in data.symbol if not x.isdigit()])
-        self.main_contract_mapping[key.upper()].append(data)
-
-    @property
-    def main_contract_list(self):
-        """ 返回主力合约列表 """
-        result = []
-        for _ in self.main_contract_mapping.values():
-            x = sorted(_, key=lambda x: x.open_interest, reverse=True)[0]
-            result.append(x.local_symbol)
-        return result
-
-    def get_main_contract_by_code(self, code: str):
-        """ 根据code取相应的主力合约 """
-        d = self.main_contract_mapping.get(code.upper(), None)
-        if not d:
-            return None
-        else:
-            now = sorted(d, key=lambda x: x.open_interest, reverse=True)[0]
-            pre = sorted(d, key=lambda x: x.pre_open_interest, reverse=True)[0]
-            if pre.local_symbol == now.local_symbol:
-                return pre
-            else:
-                return now
+        self.main_contract.update(data)
 
     @async_value_call
     async def process_shared_event(self, event):
-        if self.shared.get(event.data.local_symbol, None) is not None:
-            self.shared[event.data.local_symbol].append(event.data)
-        else:
-            self.shared[event.data.local_symbol] = []
+        self._store_shared(event.data)
 
     async def process_error_event(self, event: Event):
         self.errors.append({"time": self.get_local_time(), "data": event.data})
@@ -416,33 +555,35 @@ class AsyncRecorder(object):
 
     @async_value_call
     async def process_bar_event(self, event: Event):
-        bar = event.data
-        local = self.bar.get(bar.local_symbol)
-        if local is None:
-            self.bar[bar.local_symbol] = {bar.interval: []}
-        else:
-            if self.bar[bar.local_symbol].get(bar.interval) is None:
-                self.bar[bar.local_symbol] = {bar.interval: []}
-        self.bar[bar.local_symbol][bar.interval].append(bar)
+        self._store_bar(event.data)
 
     @async_value_call
     async def process_tick_event(self, event: Event):
         """"""
         tick = event.data
+        if trace.ENABLED:
+            trace.stamp(tick, "dispatch")
         self.ticks[tick.local_symbol] = tick
-        symbol = tick.symbol
-        self.position_manager.update_tick(tick)
+        with self.lock:
+            self.position_manager.update_tick(tick)
         # 生成datetime对象
         if not tick.datetime:
-            if '.' in tick.time:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S.%f')
-            else:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S')
-        bm = self.generators.get(symbol, None)
-        if bm:
-            bm.update_tick(tick)
-        if not bm:
-            self.generators[symbol] = generator(self.event_engine, self.app)
+            tick.datetime = decoder.decode(tick.date, tick.time)
+        # 开启tick合并时, 被合并掉的tick依旧需要用于统计以及生成k线
+        conflated = getattr(event, "conflated", ())
+        intraday, subscribers = self._update_intraday((*conflated, tick))
+        if subscribers:
+            frozen = freeze_event(intraday)
+            for value in subscribers:
+                await self.event_engine.invoke(intraday, value, event_for(value, intraday, frozen))
+        self.generators.update_tick(tick, conflated)
+
+    async def process_tick_batch_event(self, event: Event):
+        """ 批量tick按照合约拆分之后交给插件的on_tick_batch, 批量tick不参与k线合成 """
+        for local_symbol, batch in self._split_tick_batch(event.data).items():
+            split = Event(EVENT_TICK_BATCH, batch)
+            for value in self.app.extensions_for(local_symbol):
+                await self.event_engine.invoke(split, value, split)
 
     @async_value_call
     async def process_order_event(self, event: Event):
@@ -450,12 +591,8 @@ class AsyncRecorder(object):
 
         order = event.data
         self.orders[order.local_order_id] = order
-        # If order is active, then update data in dict.
-        if order._is_active():
-            self.active_orders[order.local_order_id] = order
-        # Otherwise, pop inactive order from in dict
-        elif order.local_order_id in self.active_orders:
-            self.active_orders.pop(order.local_order_id)
+        # 活跃的报单加入索引, 否则从索引中移除
+        self.active_index.update(order)
         self.position_manager.update_order(order)
 
     @async_value_call
@@ -476,15 +613,18 @@ class AsyncRecorder(object):
         """"""
         account = event.data
         self.account = account
+        frozen = freeze_event(event)
         for value in self.app.extensions.values():
-            await value(deepcopy(event))
+            await self.event_engine.invoke(event, value, event_for(value, event, frozen))
 
     async def process_contract_event(self, event: Event):
         """"""
         contract = event.data
         self.contracts[contract.local_symbol] = contract
+        self._prepare_subscribed(contract)
+        frozen = freeze_event(event)
         for value in self.app.extensions.values():
-            await value(deepcopy(event))
+            await self.event_engine.invoke(event, value, event_for(value, event, frozen))
 
     def get_shared(self, symbol):
         return self.shared.get(symbol, None)
@@ -492,12 +632,6 @@ class AsyncRecorder(object):
     def get_all_shared(self):
         return self.shared
 
-    def get_bar(self, local_symbol):
-        return self.bar.get(local_symbol, None)
-
-    def get_all_bar(self):
-        return self.bar
-
     def get_tick(self, local_symbol):
         return self.ticks.get(local_symbol, None)
 
@@ -552,14 +686,3 @@ class AsyncRecorder(object):
         Get all contract data.
         """
         return list(self.contracts.values())
-
-    def get_all_active_orders(self, local_symbol: str = ""):
-        if not local_symbol:
-            return list(self.active_orders.values())
-        else:
-            active_orders = [
-                order
-                for order in self.active_orders.values()
-                if order.local_symbol == local_symbol
-            ]
-            return active_orders
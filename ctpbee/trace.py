@@ -0,0 +1,91 @@
+"""
+端到端延迟追踪
+
+一个tick从接口收到(receive), 被事件引擎分发(dispatch), 进入策略回调(callback),
+策略通过Action下单(action), 到接口发出报单(send), 每个阶段记录一次perf_counter时间戳.
+tick上的时间戳保存在 tick._trace, 下单请求上的保存在 req._trace, 下划线开头的属性不会出现在_to_dict中.
+
+追踪默认关闭, 关闭时每个埋点只有一次全局变量的判断. 加载 ctpbee.util.LatencyTracker 插件会自动开启.
+注意: 同一个tick会被多个策略共享, 所以策略回调的时间戳只记录在当前线程的上下文以及之后生成的下单请求中.
+"""
+from threading import local
+from time import perf_counter
+
+from ctpbee.constant import FrozenData
+
+ENABLED = False
+# 接收追踪结果的对象, 需要实现 trace_callback(strategy, local_symbol, stages) 与 trace_order(strategy, local_symbol, stages),
+# 不使用on_开头的名称, 避免与插件的回调冲突
+_sinks = []
+_context = local()
+
+
+def enable(sink=None):
+    """ 开启追踪, sink会收到每次策略回调以及每次报单的时间戳 """
+    global ENABLED
+    if sink is not None and sink not in _sinks:
+        _sinks.append(sink)
+    ENABLED = True
+
+
+def disable(sink=None):
+    """ 移除sink, 不传入sink或者没有剩余的sink时关闭追踪 """
+    global ENABLED
+    if sink in _sinks:
+        _sinks.remove(sink)
+    if sink is None or not _sinks:
+        ENABLED = False
+
+
+def _unwrap(data):
+    if isinstance(data, FrozenData):
+        return object.__getattribute__(data, "_data")
+    return data
+
+
+def stages_of(data) -> dict:
+    """ 数据上已经记录的时间戳 {stage: perf_counter} """
+    return getattr(_unwrap(data), "__dict__", {}).get("_trace") or {}
+
+
+def stamp(data, stage: str, timestamp: float = None):
+    """ 在tick或者下单请求上记录某个阶段的时间戳 """
+    data = _unwrap(data)
+    stages = data.__dict__.get("_trace")
+    if stages is None:
+        stages = data._trace = {}
+    stages[stage] = perf_counter() if timestamp is None else timestamp
+
+
+def enter(strategy: str, data):
+    """
+    策略回调开始, 之后当前线程中生成的下单请求都归属于这个策略以及这个数据
+    """
+    stages = dict(stages_of(data))
+    stages["callback"] = perf_counter()
+    local_symbol = getattr(data, "local_symbol", None)
+    _context.current = (strategy, local_symbol, stages)
+    for sink in _sinks:
+        sink.trace_callback(strategy, local_symbol, stages)
+
+
+def leave():
+    """ 策略回调结束 """
+    _context.current = None
+
+
+def order(req):
+    """ Action生成下单请求, 继承当前策略回调的时间戳 """
+    current = getattr(_context, "current", None)
+    stages = dict(current[2]) if current else {}
+    stages["action"] = perf_counter()
+    req._trace = stages
+    req._trace_owner = current[0] if current else None
+
+
+def sent(req):
+    """ 接口即将发出报单 """
+    stamp(req, "send")
+    owner = req.__dict__.get("_trace_owner")
+    for sink in _sinks:
+        sink.trace_order(owner, req.local_symbol, req._trace)
@@ -1,10 +1,14 @@
 import types
+from collections import defaultdict
 from functools import wraps
-from threading import Thread
+from threading import Thread, Lock
 from types import MethodType
 
+from ctpbee import trace
 from ctpbee.event_engine.engine import EVENT_TIMER
+from ctpbee.event_engine.instrument import Stat
 from ctpbee.helpers import end_thread
+from ctpbee.level import CtpbeeApi
 
 
 class ThreadMe(Thread):
@@ -104,3 +108,94 @@ class RiskLevel:
     @classmethod
     def realtime_check(self):
         """ 一直检查 """
+
+
+class LatencyTracker(CtpbeeApi):
+    """
+    端到端延迟统计插件, 载入之后开启 ctpbee.trace 的追踪, 按照策略以及合约分别汇总每一段的延迟
+        queue:             接口收到tick -> 事件引擎分发
+        dispatch:          事件引擎分发 -> 策略回调
+        tick_to_callback:  接口收到tick -> 策略回调
+        strategy:          策略回调 -> Action下单
+        send:              Action下单 -> 接口发出报单(包括风控检查)
+        tick_to_order:     接口收到tick -> 接口发出报单
+    usage:
+        tracker = LatencyTracker("latency")
+        app.add_extension(tracker)
+        ...
+        tracker.report()
+    """
+    SEGMENTS = {
+        "queue": ("receive", "dispatch"),
+        "dispatch": ("dispatch", "callback"),
+        "tick_to_callback": ("receive", "callback"),
+        "strategy": ("callback", "action"),
+        "send": ("action", "send"),
+        "tick_to_order": ("receive", "send"),
+    }
+
+    def __init__(self, extension_name="latency", app=None, window: int = 4096, **kwargs):
+        """
+        :param window: 计算分位数使用最近多少次的采样
+        """
+        self.window = window
+        # 策略名称/合约 -> {segment: Stat}
+        self.by_strategy = defaultdict(dict)
+        self.by_symbol = defaultdict(dict)
+        # ShardedEngine的多个处理线程会同时写入统计
+        self._lock = Lock()
+        super().__init__(extension_name, app, **kwargs)
+
+    def init_app(self, app):
+        super().init_app(app)
+        if app is not None:
+            trace.enable(self)
+
+    def close(self):
+        """ 停止追踪 """
+        trace.disable(self)
+
+    def _record(self, strategy, local_symbol, stages, segments):
+        with self._lock:
+            for segment in segments:
+                start, end = self.SEGMENTS[segment]
+                if start not in stages or end not in stages:
+                    continue
+                elapsed = stages[end] - stages[start]
+                for table, key in ((self.by_strategy, strategy), (self.by_symbol, local_symbol)):
+                    if key is None:
+                        continue
+                    stat = table[key].get(segment)
+                    if stat is None:
+                        stat = table[key][segment] = Stat(self.window)
+                    stat.add(elapsed)
+
+    def on_tick(self, tick):
+        """ 只通过trace统计延迟, 不处理行情 """
+
+    def on_bar(self, bar):
+        pass
+
+    def trace_callback(self, strategy, local_symbol, stages):
+        if strategy != self.extension_name:
+            self._record(strategy, local_symbol, stages, ("queue", "dispatch", "tick_to_callback"))
+
+    def trace_order(self, strategy, local_symbol, stages):
+        self._record(strategy, local_symbol, stages, ("strategy", "send", "tick_to_order"))
+
+    def report(self) -> dict:
+        """
+        {"strategy": {策略名称: {segment: 统计}}, "symbol": {local_symbol: {segment: 统计}}}, 耗时单位为微秒
+        """
+        with self._lock:
+            return {
+                "strategy": {key: {segment: stat.summary() for segment, stat in stats.items()}
+                             for key, stats in self.by_strategy.items()},
+                "symbol": {key: {segment: stat.summary() for segment, stat in stats.items()}
+                           for key, stats in self.by_symbol.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.by_strategy = defaultdict(dict)
+            self.by_symbol = defaultdict(dict)
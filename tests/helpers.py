@@ -0,0 +1,65 @@
+"""
+测试共用的tick构造函数, 不启动线程的假事件引擎/应用, 以及等待多线程处理完成的wait_for
+"""
+from time import sleep, monotonic
+
+from ctpbee.constant import TickData, Exchange
+
+
+def tick_at(dt, price=3500, volume=0, open_interest=0, symbol="rb2010"):
+    return TickData(symbol=symbol, exchange=Exchange.SHFE, datetime=dt, gateway_name="ctp",
+                    last_price=price, volume=volume, open_interest=open_interest)
+
+
+class Engine:
+    """ 记录put的事件以及通过invoke调用的插件, 注册的处理函数不会被调用 """
+
+    def __init__(self):
+        self.handlers = {}
+        self.events = []
+        self.invoked = []
+
+    def register(self, type, handler):
+        self.handlers[type] = handler
+
+    def put(self, event):
+        self.events.append(event)
+
+    def invoke(self, event, extension, data=None):
+        self.invoked.append((event.type, extension.extension_name, data if data is not None else event))
+
+    def data(self, type) -> list:
+        """ 已经put的某种事件的数据 """
+        return [event.data for event in self.events if event.type == type]
+
+
+class Api:
+    def __init__(self, name):
+        self.extension_name = name
+
+
+class Market:
+    def __init__(self):
+        self.subscribed = set()
+
+
+class App:
+    """ Recorder以及DataGenerator用到的CtpBee属性, 全部插件接收所有合约的数据 """
+
+    def __init__(self, **config):
+        self.config = dict(XMIN=[], SHARED_FUNC=False)
+        self.config.update(config)
+        self.extensions = {}
+        self.market = Market()
+
+    def extensions_for(self, local_symbol):
+        return list(self.extensions.values())
+
+
+def wait_for(condition, timeout=10):
+    """ 等待条件成立, 条件满足后立即返回, 只有超时才会失败 """
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            raise AssertionError("等待超时")
+        sleep(0.001)
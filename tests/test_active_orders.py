@@ -0,0 +1,35 @@
+import unittest
+
+from ctpbee.constant import OrderData, Exchange, Direction, Offset, Status
+from ctpbee.data_handle.active_orders import ActiveOrderIndex
+
+
+def order(order_id, symbol="rb2010", direction=Direction.LONG, offset=Offset.OPEN, status=Status.NOTTRADED):
+    return OrderData(symbol=symbol, exchange=Exchange.SHFE, order_id=str(order_id), direction=direction,
+                     offset=offset, status=status, gateway_name="ctp")
+
+
+class TestActiveOrders(unittest.TestCase):
+    def test_index(self):
+        index = ActiveOrderIndex()
+        index.update(order(1))
+        index.update(order(2, direction=Direction.SHORT))
+        index.update(order(3, direction=Direction.SHORT, offset=Offset.CLOSE))
+        index.update(order(4, symbol="ag2012"))
+        self.assertEqual(len(index), 4)
+        self.assertEqual(len(index.get("rb2010.SHFE")), 3)
+        self.assertEqual(len(index.get("rb2010.SHFE", Direction.SHORT)), 2)
+        self.assertEqual(len(index.get("rb2010.SHFE", offset=Offset.OPEN)), 2)
+        self.assertEqual([x.order_id for x in index.get("rb2010.SHFE", Direction.SHORT, Offset.CLOSE)], ["3"])
+        # 成交或者撤销之后从所有索引中移除
+        index.update(order(3, direction=Direction.SHORT, offset=Offset.CLOSE, status=Status.ALLTRADED))
+        index.update(order(4, symbol="ag2012", status=Status.CANCELLED))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get("rb2010.SHFE", Direction.SHORT, Offset.CLOSE), [])
+        self.assertEqual(index.get("ag2012.SHFE"), [])
+        self.assertNotIn("ag2012.SHFE", index._by_symbol)
+        self.assertIn("ctp.1", index)
+
+
+if __name__ == '__main__':
+    unittest.main()
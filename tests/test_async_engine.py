@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+import warnings
+from threading import Thread
+
+from ctpbee.constant import EVENT_TICK, EVENT_TRADE, EVENT_LOG, EVENT_TIMER_CHANNEL
+from ctpbee.event_engine import AsyncEngine, Event
+from helpers import wait_for
+
+
+class Data:
+    def __init__(self, local_symbol, index):
+        self.local_symbol = local_symbol
+        self.index = index
+
+
+class TestAsyncEngine(unittest.TestCase):
+    def run_engine(self, engine, events, expected, result):
+        """ 启动前投递全部事件, 等到处理完expected个事件之后停止 """
+        engine.put_many(events)
+        engine.start()
+        try:
+            wait_for(lambda: len(result) >= expected)
+        finally:
+            engine.stop()
+
+    def test_priority(self):
+        """ 成交事件越过堆积的tick, 同一优先级内保持投递顺序 """
+        engine = AsyncEngine(work_core=1, priority=True)
+        result = []
+
+        async def on_tick(event):
+            result.append((EVENT_TICK, event.data.index))
+
+        engine.register(EVENT_TICK, on_tick)
+        engine.register(EVENT_TRADE, lambda event: result.append((EVENT_TRADE, event.data.index)))
+        engine.register(EVENT_LOG, lambda event: result.append((EVENT_LOG, event.data.index)))
+        events = [Event(EVENT_LOG, Data("rb2010.SHFE", 0))]
+        events += [Event(EVENT_TICK, Data("rb2010.SHFE", i)) for i in range(100)]
+        events += [Event(EVENT_TRADE, Data("rb2010.SHFE", i)) for i in range(2)]
+        self.run_engine(engine, events, 103, result)
+        self.assertEqual(result, [(EVENT_TRADE, 0), (EVENT_TRADE, 1)] + [(EVENT_TICK, i) for i in range(100)] +
+                         [(EVENT_LOG, 0)])
+        depth = engine.queue_depth()
+        self.assertEqual((depth[3]["depth"], depth[3]["max_depth"]), (0, 100))
+
+    def test_timer_dispatch(self):
+        """ 定时器回调可以是协程函数, 异常交给on_error, 不影响其他回调 """
+        engine = AsyncEngine()
+        result, errors = [], []
+
+        async def broken():
+            raise RuntimeError("broken")
+
+        async def on_timer():
+            result.append(1)
+
+        engine.on_error = lambda event, handler, e: errors.append(handler)
+        engine.scheduler.add_channel("fast", 0.02)
+        engine.scheduler.subscribe("fast", broken)
+        engine.scheduler.subscribe("fast", on_timer)
+        asyncio.run(engine.scheduler.async_dispatch(Event(EVENT_TIMER_CHANNEL, "fast")))
+        self.assertEqual((result, errors), ([1], [broken]))
+
+    def test_cross_thread_put(self):
+        """ 多个网关线程同时投递, 事件全部送达并且每个线程内保持顺序 """
+        engine = AsyncEngine(work_core=1)
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append((event.data.local_symbol, event.data.index)))
+        engine.start()
+        try:
+            producers = [Thread(target=lambda symbol=symbol: [engine.put(Event(EVENT_TICK, Data(symbol, i)))
+                                                              for i in range(2000)]) for symbol in "abcd"]
+            for producer in producers:
+                producer.start()
+            for producer in producers:
+                producer.join()
+            wait_for(lambda: len(result) == 8000)
+        finally:
+            engine.stop()
+        for symbol in "abcd":
+            self.assertEqual([index for name, index in result if name == symbol], list(range(2000)))
+
+    def test_stop(self):
+        """ 停止之后事件循环被关闭, 网关线程继续投递不会抛出异常 """
+        engine = AsyncEngine(work_core=2)
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append(event.data.index))
+        self.run_engine(engine, [Event(EVENT_TICK, Data("a", 0))], 1, result)
+        self.assertFalse(engine.status)
+        self.assertTrue(engine.loop.is_closed())
+        thread = Thread(target=lambda: engine.put(Event(EVENT_TICK, Data("a", 1))))
+        thread.start()
+        thread.join()
+        engine.put_many([Event(EVENT_TICK, Data("a", 2))])
+        self.assertEqual(result, [0])
+        self.assertEqual(engine.queue_depth()["default"]["depth"], 0)
+
+    def test_serialize(self):
+        """ 多个协程并发处理时同一个合约的事件依旧按投递顺序处理, 每个合约固定由一个协程处理 """
+        engine = AsyncEngine(work_core=4, serialize=True)
+        result = []
+        symbols = ("a", "b", "c", "d", "e", "f")
+
+        async def on_tick(event):
+            # 让出事件循环, 其他协程在此期间处理别的事件
+            await asyncio.sleep(0)
+            result.append((event.data.local_symbol, event.data.index))
+
+        engine.register(EVENT_TICK, on_tick)
+        events = [Event(EVENT_TICK, Data(symbol, i)) for i in range(200) for symbol in symbols]
+        self.run_engine(engine, events, 1200, result)
+        for symbol in symbols:
+            self.assertEqual([index for name, index in result if name == symbol], list(range(200)))
+        utilization = engine.worker_utilization()
+        expected = [0] * 4
+        for symbol in symbols:
+            expected[hash(symbol) % 4] += 200
+        self.assertEqual([utilization[index]["processed"] for index in range(4)], expected)
+        self.assertEqual([utilization[index]["depth"] for index in range(4)], [0] * 4)
+
+    def test_uvloop_fallback(self):
+        """ 没有安装uvloop时给出警告并使用asyncio默认的事件循环 """
+        try:
+            import uvloop
+        except ImportError:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                engine = AsyncEngine(work_core=1, uvloop=True)
+            self.assertEqual(len(caught), 1)
+            self.assertIsInstance(engine.loop, asyncio.AbstractEventLoop)
+        else:
+            engine = AsyncEngine(work_core=1, uvloop=True)
+            self.assertIsInstance(engine.loop, uvloop.Loop)
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append(event.data.index))
+        self.run_engine(engine, [Event(EVENT_TICK, Data("a", i)) for i in range(10)], 10, result)
+        self.assertEqual(result, list(range(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
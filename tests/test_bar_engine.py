@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime, timedelta
+
+from ctpbee.data_handle.bar_engine import BarAggregator, parse_interval
+from ctpbee.data_handle.generator import DataGenerator
+from helpers import tick_at, Engine, App
+
+
+class TestBarEngine(unittest.TestCase):
+    def test_parse_interval(self):
+        self.assertEqual(parse_interval(5), (300, 0, 5))
+        self.assertEqual(parse_interval("1h"), (3600, 0, 60))
+        self.assertEqual(parse_interval("30s"), (30, 0, "30s"))
+        self.assertEqual(parse_interval("1d"), (0, 1, "1d"))
+        for value in ("5x", "0m", "abc", "25h"):
+            with self.assertRaises(ValueError):
+                parse_interval(value)
+
+    def test_multi_interval(self):
+        """ 一次遍历同时合成多个周期, 5分钟k线跨越多个1分钟k线累积 """
+        aggregator = BarAggregator([1, 5, "30s", "1d"])
+        start = datetime(2020, 7, 15, 9, 0, 0)
+        bars = []
+        for i in range(600):
+            bars.extend(aggregator.update_tick(tick_at(start + timedelta(seconds=i), 3500 + i % 7, i)))
+        bars.extend(aggregator.flush())
+        by_interval = {}
+        for bar in bars:
+            by_interval.setdefault(bar.interval, []).append(bar)
+        self.assertEqual(len(by_interval[1]), 10)
+        self.assertEqual(len(by_interval["30s"]), 20)
+        self.assertEqual(len(by_interval[5]), 2)
+        self.assertEqual(len(by_interval["1d"]), 1)
+        five = by_interval[5][0]
+        self.assertEqual(five.datetime, datetime(2020, 7, 15, 9, 0))
+        self.assertEqual(by_interval[5][1].datetime, datetime(2020, 7, 15, 9, 5))
+        self.assertEqual((five.open_price, five.high_price, five.low_price), (3500, 3506, 3500))
+        # 第一个tick没有成交量增量
+        self.assertEqual(five.volume, 299)
+        self.assertEqual(sum(bar.volume for bar in by_interval[1][:5]), five.volume)
+        self.assertEqual(by_interval["1d"][0].datetime, datetime(2020, 7, 15))
+
+    def test_out_of_order(self):
+        """ 比正在合成的k线更早的tick被丢弃, 不会产生重复的k线, 也不影响成交量的基准 """
+        aggregator = BarAggregator([1])
+        start = datetime(2020, 7, 15, 9, 0, 10)
+        bars = []
+        for dt, volume in ((start, 10), (start + timedelta(seconds=55), 20), (start + timedelta(seconds=40), 15),
+                           (start + timedelta(seconds=80), 30), (start + timedelta(seconds=110), 40)):
+            bars.extend(aggregator.update_tick(tick_at(dt, 3500, volume)))
+        self.assertEqual([(bar.datetime, bar.volume) for bar in bars],
+                         [(datetime(2020, 7, 15, 9, 0), 0), (datetime(2020, 7, 15, 9, 1), 20)])
+        self.assertEqual(aggregator.current(1).volume, 10)
+
+    def test_generator_events(self):
+        engine = Engine()
+        generator = DataGenerator(engine, App(XMIN=[3]))
+        start = datetime(2020, 7, 15, 9, 0, 30)
+        for i in range(7):
+            generator.update_tick(tick_at(start + timedelta(minutes=i), 3500 + i, i))
+        self.assertEqual([event.data.interval for event in engine.events], [1, 1, 1, 3, 1, 1, 1, 3])
+        self.assertEqual(engine.events[3].data.close_price, 3502)
+        generator.generate()
+        self.assertEqual([event.data.interval for event in engine.events[8:]], [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
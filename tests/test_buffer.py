@@ -0,0 +1,112 @@
+import unittest
+from time import sleep
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ctpbee.constant import BarData, Exchange, EVENT_BAR
+from ctpbee.event_engine import Event
+from ctpbee.record import Recorder
+from ctpbee.data_handle.bar_store import BarStore
+from ctpbee.data_handle.buffer import RingBuffer, ExpiringDeque, ExpiringDict
+from helpers import App, Engine
+
+
+class TestBuffer(unittest.TestCase):
+    def test_ring_buffer(self):
+        """ 写满之后覆盖最早的数据, 视图始终连续且不复制 """
+        buffer = RingBuffer(4, dtype=float)
+        for x in range(10):
+            buffer.append(x)
+            expected = list(range(max(0, x - 3), x + 1))
+            self.assertEqual(buffer.tolist(), expected)
+        view = buffer.view(3)
+        self.assertTrue(view.flags.c_contiguous)
+        self.assertFalse(view.flags.owndata)
+        self.assertFalse(view.flags.writeable)
+        self.assertEqual(view.tolist(), [7, 8, 9])
+        self.assertEqual(buffer[-1], 9)
+        self.assertEqual(buffer.total, 10)
+        self.assertEqual(buffer.nbytes, np.empty(8).nbytes)
+
+    def test_ring_buffer_growth(self):
+        """ 写满之前按两倍扩容, 不会一次性分配两倍容量的数组 """
+        buffer = RingBuffer(10000)
+        buffer.append(0)
+        self.assertEqual(buffer.nbytes, np.empty(16, dtype=object).nbytes)
+        for capacity in (1, 16, 17, 100):
+            buffer = RingBuffer(capacity, dtype=float)
+            for x in range(capacity * 3):
+                buffer.append(x)
+                expected = list(range(max(0, x - capacity + 1), x + 1))
+                self.assertEqual(buffer.tolist(), expected)
+                self.assertEqual(buffer.view(2).tolist(), expected[-2:])
+            self.assertEqual(buffer.nbytes, np.empty(capacity * 2).nbytes)
+        buffer.clear()
+        self.assertEqual((len(buffer), buffer.last), (0, None))
+        buffer.append(1)
+        self.assertEqual(buffer.tolist(), [1])
+
+    def test_expiring_dict(self):
+        logs = ExpiringDict(maxlen=2)
+        logs["a"], logs["b"], logs["a"], logs["c"] = 1, 2, 3, 4
+        self.assertEqual(list(logs.items()), [("a", 3), ("c", 4)])
+        logs = ExpiringDict(ttl=0.05)
+        logs["a"] = 1
+        sleep(0.06)
+        logs["b"] = 2
+        self.assertEqual(list(logs), ["b"])
+
+    def test_expiring_deque(self):
+        errors = ExpiringDeque(maxlen=3, ttl=0.05)
+        errors.append(0)
+        sleep(0.06)
+        for x in range(1, 5):
+            errors.append(x)
+        self.assertEqual(list(errors), [2, 3, 4])
+
+    def test_bar_store(self):
+        """ 读取到的是RingBuffer内部数组的视图 """
+        store = BarStore(capacity=5)
+        start = datetime(2020, 7, 1, 9)
+        for x in range(8):
+            store.append(BarData(symbol="rb2010", exchange=Exchange.SHFE, datetime=start + timedelta(minutes=x),
+                                 interval=1, open_price=x, high_price=x + 1, low_price=x - 1, close_price=x,
+                                 volume=10, gateway_name="ctp"))
+        bars = store.array("rb2010.SHFE", 1, 3)
+        self.assertEqual(bars["close_price"].tolist(), [5, 6, 7])
+        self.assertEqual(bars["datetime"][-1], np.datetime64(start + timedelta(minutes=7)))
+        self.assertTrue(np.shares_memory(store.column("rb2010.SHFE", 1, "close_price"), bars))
+        self.assertEqual(len(store.array("rb2010.SHFE", 5)), 0)
+        store.resize(2)
+        self.assertEqual(store.column("rb2010.SHFE", 1, "close_price").tolist(), [6, 7])
+
+    def test_get_bar(self):
+        """ k线只保存在BarStore中, get_bar以及get_all_bar根据数组创建BarData列表 """
+        recorder = Recorder(App(), Engine())
+        recorder.configure({"BAR_RETENTION": 3})
+        start = datetime(2020, 7, 1, 9)
+        bars = [BarData(symbol="rb2010", exchange=Exchange.SHFE, datetime=start + timedelta(minutes=x), interval=1,
+                        open_price=x, high_price=x + 1, low_price=x - 1, close_price=x, volume=10 * x,
+                        gateway_name="ctp") for x in range(5)]
+        for bar in bars[:4]:
+            recorder.process_bar_event(Event(EVENT_BAR, bar))
+        result = recorder.get_bar("rb2010.SHFE")
+        self.assertEqual(list(result), [1])
+        self.assertIsInstance(result[1], list)
+        self.assertEqual([bar._to_dict() for bar in result[1]], [bar._to_dict() for bar in bars[1:4]])
+        self.assertIsInstance(result[1][0], BarData)
+        recorder.process_bar_event(Event(EVENT_BAR, bars[4]))
+        self.assertEqual(len(result[1]), 3)
+        self.assertEqual([bar.close_price for bar in recorder.get_bar("rb2010.SHFE")[1]], [2, 3, 4])
+        everything = recorder.get_all_bar()
+        self.assertEqual(list(everything), ["rb2010.SHFE"])
+        self.assertEqual([bar._to_dict() for bar in everything["rb2010.SHFE"][1]],
+                         [bar._to_dict() for bar in bars[2:5]])
+        self.assertEqual(recorder.memory_usage()["bar"]["count"], 3)
+        self.assertIsNone(recorder.get_bar("ag2012.SHFE"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+from threading import Thread
+
+from ctpbee.constant import EVENT_TICK, EVENT_TRADE, EVENT_TIMER, EVENT_TIMER_CHANNEL
+from ctpbee.event_engine import EventEngine, Event, Scheduler
+from ctpbee.event_engine.queues import RingQueue
+from helpers import wait_for, Engine
+
+
+class Data:
+    def __init__(self, local_symbol, index):
+        self.local_symbol = local_symbol
+        self.index = index
+
+
+class TestEngine(unittest.TestCase):
+    def run_engine(self, engine, events, done):
+        """ 启动前投递全部事件, 等到done()成立之后停止 """
+        for event in events:
+            engine.put(event)
+        engine.start()
+        try:
+            wait_for(done)
+        finally:
+            engine.stop()
+
+    def test_priority(self):
+        """ 成交事件越过堆积的tick """
+        engine = EventEngine(priority=True)
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append(EVENT_TICK))
+        engine.register(EVENT_TRADE, lambda event: result.append(EVENT_TRADE))
+        events = [Event(EVENT_TICK, Data("rb2010.SHFE", i)) for i in range(100)]
+        events.append(Event(EVENT_TRADE, Data("rb2010.SHFE", 0)))
+        self.assertEqual(engine.queue_depth()[3]["depth"], 0)
+        self.run_engine(engine, events, lambda: len(result) == 101)
+        self.assertEqual(result, [EVENT_TRADE] + [EVENT_TICK] * 100)
+        self.assertEqual(engine.queue_depth()[3]["max_depth"], 100)
+
+    def test_conflate(self):
+        """ 未分发的tick被合并, 被合并的tick保留在conflated中 """
+        engine = EventEngine(conflate=True)
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append(
+            [x.index for x in event.conflated] + [event.data.index]))
+        events = [Event(EVENT_TICK, Data("rb2010.SHFE", i)) for i in range(10)]
+        events.append(Event(EVENT_TICK, Data("ag2012.SHFE", 0)))
+        self.run_engine(engine, events, lambda: len(result) == 2)
+        self.assertEqual(result, [list(range(10)), [0]])
+        self.assertEqual(engine.dropped_ticks["rb2010.SHFE"], 9)
+
+    def test_ring_queue(self):
+        """ 环形队列写满之后溢出, 同一个生产者的事件保持顺序 """
+        queue = RingQueue(capacity=8)
+        for i in range(20):
+            queue.put(i)
+        self.assertEqual(queue.qsize(), 20)
+        result = []
+        for i in range(20, 40):
+            result.extend(queue.get_many(3, 0))
+            queue.put(i)
+        while not queue.empty():
+            result.extend(queue.get_many(3, 0))
+        self.assertEqual(result, list(range(40)))
+        self.assertEqual(queue.get_many(3, 0.01), [])
+
+    def test_ring_reclaim(self):
+        """ 生产者线程结束并且缓冲区读空之后回收缓冲区 """
+        queue = RingQueue(capacity=8)
+        for index in range(5):
+            thread = Thread(target=lambda index=index: [queue.put((index, i)) for i in range(10)])
+            thread.start()
+            thread.join()
+        self.assertEqual(len(queue.depth()), 5)
+        result = queue.get_many(25, 0)
+        # 没有读空的缓冲区不会被回收
+        self.assertEqual(queue.get_many(0, 0), [])
+        self.assertEqual(sum(ring["depth"] + ring["overflow"] for ring in queue.depth().values()), 25)
+        result += queue.get_many(100, 0)
+        self.assertEqual(sorted(result), [(index, i) for index in range(5) for i in range(10)])
+        queue.get_many(1, 0)
+        self.assertEqual(queue.depth(), {})
+        queue.put(0)
+        self.assertEqual(queue.get_many(1, 0), [0])
+        self.assertEqual(len(queue.depth()), 1)
+
+    def test_ring_engine(self):
+        engine = EventEngine(queue="ring")
+        result = []
+        engine.register(EVENT_TICK, lambda event: result.append(event.data.index))
+        self.run_engine(engine, [Event(EVENT_TICK, Data("a", i)) for i in range(2000)], lambda: len(result) == 2000)
+        self.assertEqual(result, list(range(2000)))
+
+    def test_batch_handler(self):
+        """ 批处理函数收到一次读取到的同类型全部事件 """
+        for queue in (None, "ring"):
+            engine = EventEngine(queue=queue)
+            single, batches = [], []
+            engine.register(EVENT_TICK, lambda event: single.append(event.data.index))
+            engine.register_batch(EVENT_TICK, lambda events: batches.append([e.data.index for e in events]))
+            engine.put_many([Event(EVENT_TICK, Data("a", i)) for i in range(100)])
+            engine.put(Event(EVENT_TRADE, Data("a", 0)))
+            engine.start()
+            try:
+                # 事件在启动前全部入队, 一次读取就能读空队列
+                wait_for(lambda: len(single) == 100 and batches)
+            finally:
+                engine.stop()
+            self.assertEqual(single, list(range(100)))
+            self.assertEqual(sum(batches, []), list(range(100)))
+            self.assertEqual(len(batches), 1)
+
+    def test_timer_channel(self):
+        """ 多个定时器通道按照各自的间隔触发, 错过的触发不补发 """
+        clock = [0.0]
+        engine = Engine()
+        scheduler = Scheduler(engine, 0.125, clock=lambda: clock[0])
+        scheduler.add_channel("fast", 0.03125)
+        # 时钟每次前进1/64秒, 共1秒
+        for step in range(1, 65):
+            clock[0] = step / 64
+            scheduler.poll(clock[0])
+        self.assertEqual(len(engine.data(EVENT_TIMER_CHANNEL)), 32)
+        self.assertEqual(len([event for event in engine.events if event.type == EVENT_TIMER]), 8)
+        self.assertEqual(scheduler.poll(1.0), 1.03125)
+        # 时钟跳过0.5秒, 每个通道只触发一次
+        clock[0] = 1.5
+        scheduler.poll(clock[0])
+        channels = scheduler.channels()
+        self.assertEqual((channels[EVENT_TIMER]["fired"], channels[EVENT_TIMER]["missed"]), (9, 3))
+        self.assertEqual((channels["fast"]["fired"], channels["fast"]["missed"]), (33, 15))
+        self.assertEqual(scheduler.poll(1.5), 1.53125)
+
+    def test_timer_dispatch(self):
+        """ 通道事件在事件引擎中调用订阅的回调函数 """
+        engine = EventEngine()
+        fast = []
+        engine.scheduler.add_channel("fast", 0.02)
+        engine.scheduler.subscribe("fast", lambda: fast.append(1))
+        engine._dispatch([Event(EVENT_TIMER_CHANNEL, "fast"), Event(EVENT_TIMER_CHANNEL, "slow")])
+        self.assertEqual(fast, [1])
+        engine.start()
+        try:
+            wait_for(lambda: len(fast) >= 4)
+        finally:
+            engine.stop()
+        self.assertGreaterEqual(engine.scheduler.channels()["fast"]["fired"], 3)
+
+    def test_timer_errors(self):
+        """ 定时器回调的异常交给on_error, 不影响同一通道的其他回调, 订阅不存在的通道直接报错 """
+        engine = EventEngine()
+        result, errors = [], []
+
+        def broken():
+            raise RuntimeError("broken")
+
+        engine.on_error = lambda event, handler, e: errors.append((event.data, handler, e))
+        engine.scheduler.add_channel("fast", 0.02)
+        engine.scheduler.subscribe("fast", broken)
+        engine.scheduler.subscribe("fast", lambda: result.append(1))
+        engine._dispatch([Event(EVENT_TIMER_CHANNEL, "fast")])
+        self.assertEqual(result, [1])
+        self.assertEqual([(name, handler) for name, handler, _ in errors], [("fast", broken)])
+        with self.assertRaises(ValueError):
+            engine.scheduler.subscribe("slow", broken)
+
+    def test_instrument(self):
+        """ 处理函数的异常被隔离并且记录在统计中 """
+        engine = EventEngine(instrument=True)
+        result, errors = [], []
+
+        def broken(event):
+            raise RuntimeError(event.data.index)
+
+        engine.register(EVENT_TICK, broken)
+        engine.register(EVENT_TICK, lambda event: result.append(event.data.index))
+        engine.on_error = lambda event, handler, e: errors.append(e)
+        engine.put_many([Event(EVENT_TICK, Data("a", i)) for i in range(10)])
+        # 直接在测试线程中分发, 不依赖处理线程的时序
+        engine._dispatch([engine._queue.get_nowait() for _ in range(10)])
+        self.assertEqual(result, list(range(10)))
+        self.assertEqual(len(errors), 10)
+        stats = engine.stats()
+        self.assertEqual(stats["wait"][EVENT_TICK]["count"], 10)
+        handler = stats["handlers"][EVENT_TICK]["TestEngine.test_instrument.<locals>.broken"]
+        self.assertEqual(handler["count"], 10)
+        self.assertEqual(handler["errors"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import pickle
+import unittest
+from copy import deepcopy
+from datetime import datetime
+
+from ctpbee.constant import TickData, FastOrderData, Exchange, Status, FrozenData, EVENT_TICK
+from ctpbee.event_engine import Event
+from ctpbee.helpers import freeze_event, event_for
+
+
+class Ext:
+    def __init__(self, copy_event=False):
+        self.copy_event = copy_event
+
+
+class TestFrozen(unittest.TestCase):
+    def setUp(self):
+        self.tick = TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime.now(),
+                             last_price=3500, gateway_name="ctp")
+
+    def test_read_only(self):
+        """ 只读视图拒绝修改, 读取与isinstance保持不变 """
+        view = FrozenData(self.tick)
+        self.assertIsInstance(view, TickData)
+        self.assertEqual(view.local_symbol, "rb2010.SHFE")
+        self.assertEqual(view.exchange, Exchange.SHFE)
+        with self.assertRaises(AttributeError):
+            view.last_price = 1
+        self.assertEqual(self.tick.last_price, 3500)
+
+    def test_pickle(self):
+        """ 只读视图序列化为原始数据, 可以传给多进程或者基于pickle的缓存 """
+        order = FastOrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id="1", status=Status.NOTTRADED,
+                              gateway_name="ctp")
+        for data in (self.tick, order):
+            for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+                result = pickle.loads(pickle.dumps(FrozenData(data), protocol))
+                self.assertIs(type(result), type(data))
+                self.assertEqual(result._to_dict(), data._to_dict())
+        event = pickle.loads(pickle.dumps(freeze_event(Event(EVENT_TICK, self.tick))))
+        self.assertIs(type(event.data), TickData)
+        self.assertEqual(event.data._to_dict(), self.tick._to_dict())
+        event.data.last_price = 1
+
+    def test_copy(self):
+        """ 副本可写且不影响原数据 """
+        view = FrozenData(self.tick)
+        for mutable in (view._copy(), deepcopy(view)):
+            mutable.last_price = 1
+            self.assertEqual(self.tick.last_price, 3500)
+
+    def test_shared_event(self):
+        """ 默认共享同一个事件, copy_event的插件拿到独立副本 """
+        event = Event(type=EVENT_TICK, data=self.tick)
+        frozen = freeze_event(event)
+        self.assertIs(event_for(Ext(), event, frozen), frozen)
+        copied = event_for(Ext(copy_event=True), event, frozen)
+        self.assertIsNot(copied.data, self.tick)
+        self.assertNotIsInstance(copied.data, FrozenData)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import gc
+import unittest
+from datetime import datetime, timedelta
+from threading import Thread
+
+from ctpbee.constant import ContractData, Exchange, Product, EVENT_TICK, EVENT_CONTRACT, EVENT_BAR, \
+    EVENT_SESSION_CLOSE
+from ctpbee.event_engine import Event, ShardedEngine
+from ctpbee.record import Recorder
+from helpers import tick_at, Engine, App, wait_for
+
+
+def contract(symbol):
+    return ContractData(symbol=symbol, exchange=Exchange.SHFE, name=symbol, product=Product.FUTURES, size=10,
+                        pricetick=1, gateway_name="ctp")
+
+
+class TestGeneratorManager(unittest.TestCase):
+    def setUp(self):
+        self.engine = Engine()
+        self.app = App(XMIN=[5])
+        self.recorder = Recorder(self.app, self.engine)
+        self.start = datetime(2020, 7, 20, 9, 0, 10)
+
+    def bars(self):
+        return self.engine.data(EVENT_BAR)
+
+    def close_sessions(self):
+        """ 处理投递的EVENT_SESSION_CLOSE, 相当于合约所在的处理线程 """
+        events = [event for event in self.engine.events if event.type == EVENT_SESSION_CLOSE]
+        self.engine.events = [event for event in self.engine.events if event.type != EVENT_SESSION_CLOSE]
+        for event in events:
+            self.recorder.process_session_close_event(event)
+
+    def test_first_tick(self):
+        """ 订阅时创建合成器, 第一个tick参与k线合成 """
+        generator = self.recorder.create_generator("rb2010.SHFE")
+        self.assertIs(self.recorder.generators.get("rb2010.SHFE"), generator)
+        self.recorder.process_tick_event(Event(EVENT_TICK, tick_at(self.start, 3500, 10)))
+        self.recorder.process_tick_event(Event(EVENT_TICK, tick_at(self.start + timedelta(minutes=1), 3510, 20)))
+        self.assertEqual(self.bars()[0].open_price, 3500)
+
+    def test_symbol_subscribe(self):
+        """ 只有合约代码时, 根据合约推送找到交易所 """
+        self.assertIsNone(self.recorder.create_generator("rb2010"))
+        self.app.market.subscribed.add("rb2010")
+        self.recorder.process_contract_event(Event(EVENT_CONTRACT, contract("rb2010")))
+        self.recorder.process_contract_event(Event(EVENT_CONTRACT, contract("hc2010")))
+        self.assertIn("rb2010.SHFE", self.recorder.generators)
+        self.assertNotIn("hc2010.SHFE", self.recorder.generators)
+        self.assertIsNotNone(self.recorder.create_generator("hc2010"))
+
+    def test_clear_all(self):
+        """ clear_all之后正在合成的k线保持不变, 不会推送未完成的k线 """
+        for i in range(3):
+            self.recorder.process_tick_event(Event(EVENT_TICK, tick_at(self.start + timedelta(seconds=i), 3500 + i, i)))
+        self.recorder.clear_all()
+        gc.collect()
+        self.assertEqual(self.bars(), [])
+        self.recorder.process_tick_event(Event(EVENT_TICK, tick_at(self.start + timedelta(seconds=5), 3490, 5)))
+        self.assertFalse(self.recorder.flush_bars())
+        # 调用线程只投递事件, 不修改合成器
+        self.assertEqual(self.bars(), [])
+        self.assertEqual([event.data.local_symbol for event in self.engine.events], ["rb2010.SHFE"])
+        self.close_sessions()
+        one, five = self.bars()
+        self.assertEqual((one.interval, one.open_price, one.low_price, one.close_price, one.volume),
+                         (1, 3500, 3490, 3490, 5))
+        self.assertEqual((five.interval, five.datetime), (5, datetime(2020, 7, 20, 9, 0)))
+        self.recorder.flush_bars()
+        self.close_sessions()
+        self.assertEqual(len(self.bars()), 2)
+
+    def test_flush_on_lane(self):
+        """ 分片引擎下收盘推送由合约所在的处理线程完成, flush_bars可以等待推送完成 """
+        engine = ShardedEngine(work_core=3)
+        recorder = Recorder(App(), engine)
+        symbols = ("rb2010", "ag2012", "cu2010", "au2012")
+        engine.start()
+        try:
+            for i in range(50):
+                for symbol in symbols:
+                    engine.put(Event(EVENT_TICK, tick_at(self.start + timedelta(seconds=i), 3500 + i, i,
+                                                         symbol=symbol)))
+            # 合成器在处理第一个tick时创建, 之后的tick与收盘事件在同一个处理线程中按顺序处理
+            wait_for(lambda: len(recorder.generators) == 4)
+            self.assertTrue(recorder.flush_bars(timeout=10))
+            wait_for(lambda: len(recorder.get_all_bar()) == 4)
+        finally:
+            engine.stop()
+        for symbol in symbols:
+            bar, = recorder.get_bar(f"{symbol}.SHFE")[1]
+            self.assertEqual((bar.open_price, bar.close_price, bar.volume), (3500, 3549, 49))
+
+    def test_concurrent_create(self):
+        """ 其他线程创建合成器的同时定时器遍历全部合成器 """
+        manager = self.recorder.generators
+        symbols = [f"rb{i}.SHFE" for i in range(3000)]
+        thread = Thread(target=lambda: [manager.create(symbol) for symbol in symbols])
+        thread.start()
+        while thread.is_alive():
+            manager.check(self.start)
+            manager.flush()
+        thread.join()
+        self.assertEqual(len(manager), 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime, timedelta
+
+from ctpbee.constant import EVENT_TICK, EVENT_SHARED, EVENT_INTRADAY, EVENT_BAR
+from ctpbee.data_handle.intraday import IntradayAnalytics
+from ctpbee.event_engine import Event
+from ctpbee.record import Recorder
+from helpers import Engine, App, Api, tick_at
+
+
+def cu(dt, price, volume, open_interest=1000, symbol="cu2010"):
+    """ 夜盘到凌晨1点的铜合约, 默认持仓量1000 """
+    return tick_at(dt, price, volume, open_interest, symbol)
+
+
+class TestIntraday(unittest.TestCase):
+    def test_stats(self):
+        analytics = IntradayAnalytics()
+        night = datetime(2020, 7, 17, 21, 0, 1)
+        analytics.update(cu(night, 100, 50))
+        analytics.update(cu(night + timedelta(seconds=1), 110, 60, 1010))
+        stats = analytics.update(cu(night + timedelta(hours=3), 120, 90, 1004))
+        data = analytics.get("cu2010.SHFE")
+        # 第一个tick没有增量, 均价只统计观察到的成交
+        self.assertEqual((data.delta_volume, data.turnover), (30, 110 * 10 + 120 * 30))
+        self.assertAlmostEqual(data.vwap, (110 * 10 + 120 * 30) / 40)
+        self.assertEqual((data.oi_change, data.oi_delta), (4, -6))
+        # 周五夜盘属于下周一
+        self.assertEqual(data.trading_day, datetime(2020, 7, 20))
+        self.assertEqual(stats.volume, 90)
+        # 周一夜盘进入新的交易日, 累计值重新开始
+        analytics.update(cu(datetime(2020, 7, 20, 20, 59), 130, 5, 1100))
+        data = analytics.get("cu2010.SHFE")
+        self.assertEqual(data.trading_day, datetime(2020, 7, 21))
+        self.assertEqual((data.delta_volume, data.turnover, data.vwap, data.oi_change), (5, 650, 130, 0))
+        self.assertIsNone(analytics.get("rb2010.SHFE"))
+
+    def test_volume_reset(self):
+        """ 没有交易时段模板的合约依靠累计成交量变小判断新的交易日 """
+        analytics = IntradayAnalytics()
+        analytics.update(cu(datetime(2020, 7, 17, 14, 0), 10, 100, symbol="xx2010"))
+        analytics.update(cu(datetime(2020, 7, 17, 14, 1), 10, 120, symbol="xx2010"))
+        analytics.update(cu(datetime(2020, 7, 20, 9, 0), 12, 3, symbol="xx2010"))
+        data = analytics.get("xx2010.SHFE")
+        self.assertEqual((data.trading_day, data.turnover, data.volume), (datetime(2020, 7, 20), 36, 3))
+
+    def test_recorder(self):
+        engine = Engine()
+        app = App()
+        recorder = Recorder(app, engine)
+        api = Api("vwap")
+        recorder.intraday.subscribe("cu2010.SHFE", api)
+        start = datetime(2020, 7, 20, 9, 0, 30)
+        for i in range(3):
+            recorder.process_tick_event(Event(EVENT_TICK, cu(start + timedelta(minutes=i), 100 + i, 10 * i)))
+        recorder.process_tick_event(Event(EVENT_TICK, cu(start, 100, 0, symbol="rb2010")))
+        invoked = [item for item in engine.invoked if item[0] == EVENT_INTRADAY]
+        self.assertEqual(len(invoked), 3)
+        self.assertEqual(invoked[-1][2].data.volume, 20)
+        self.assertEqual(recorder.get_intraday("cu2010.SHFE").turnover, 101 * 10 + 102 * 10)
+        # 没有开启SHARED_FUNC时不生成分时图数据
+        self.assertEqual({event.type for event in engine.events}, {EVENT_BAR})
+
+        app.config["SHARED_FUNC"] = True
+        recorder.process_tick_event(Event(EVENT_TICK, cu(start + timedelta(minutes=3), 103, 35)))
+        shared = [event.data for event in engine.events if event.type == EVENT_SHARED]
+        self.assertEqual(len(shared), 1)
+        self.assertEqual((shared[0].volume, shared[0].average_price), (10, round((1010 + 1020 + 103 * 15) / 35, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from ctpbee.constant import LastData, Exchange
+from ctpbee.data_handle.main_contract import MainContractIndex
+
+
+def last(symbol, open_interest, pre_open_interest=0):
+    return LastData(symbol=symbol, exchange=Exchange.SHFE, open_interest=open_interest,
+                    pre_open_interest=pre_open_interest, volume=0, last_price=0, gateway_name="ctp")
+
+
+class TestMainContract(unittest.TestCase):
+    def test_main_contract(self):
+        index = MainContractIndex()
+        index.update(last("rb2010", 100, 300))
+        index.update(last("rb2101", 200, 100))
+        index.update(last("ag2012", 50))
+        self.assertEqual(index.main("rb").local_symbol, "rb2101.SHFE")
+        self.assertEqual(index.pre_main("RB").local_symbol, "rb2010.SHFE")
+        # 只保留每个合约最新的快照
+        for x in range(200):
+            index.update(last("rb2010", 100 + x, 300))
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.main("rb").open_interest, 299)
+        # 主力的持仓下降之后重新比较
+        index.update(last("rb2010", 150, 300))
+        self.assertEqual(index.main("rb").local_symbol, "rb2101.SHFE")
+        self.assertEqual(sorted(index.main_list()), ["ag2012.SHFE", "rb2101.SHFE"])
+        self.assertIsNone(index.main("cu"))
+
+
+if __name__ == '__main__':
+    unittest.main()
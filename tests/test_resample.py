@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ctpbee.constant import TickData, Exchange
+from ctpbee.data_handle.bar_engine import BarAggregator
+from ctpbee.data_handle.resample import resample, resample_batch, to_rows
+from ctpbee.data_handle.session import session_for
+from ctpbee.data_handle.tick_batch import TickBatch
+from ctpbee.looper.data import VessData
+
+INTERVALS = [1, "30s", 5, 30, "1h", "1d"]
+
+
+def make_ticks(symbol="cu2010"):
+    """ 周五夜盘跨越0点一直到下周一日盘收盘之后, 包括休息时间以及非交易时段的tick, 每个交易日成交量从0开始累计 """
+    random = np.random.RandomState(7)
+    ticks = []
+    for start, end in [(datetime(2020, 7, 17, 20, 58), datetime(2020, 7, 18, 1, 2)),
+                       (datetime(2020, 7, 20, 8, 58), datetime(2020, 7, 20, 15, 2)),
+                       (datetime(2020, 7, 20, 20, 59), datetime(2020, 7, 20, 21, 40))]:
+        now, volume = start, 0
+        while now < end:
+            volume += int(random.randint(0, 5))
+            ticks.append(TickData(symbol=symbol, exchange=Exchange.SHFE, datetime=now, gateway_name="ctp",
+                                  last_price=float(3500 + random.randint(-20, 20)), volume=volume))
+            now += timedelta(milliseconds=int(random.randint(200, 9000)))
+    return ticks
+
+
+def live_bars(ticks, clock):
+    aggregator = BarAggregator(INTERVALS, clock)
+    bars = []
+    for tick in ticks:
+        bars.extend(aggregator.update_tick(tick))
+    bars.extend(aggregator.flush())
+    result = {}
+    for bar in bars:
+        result.setdefault(bar.interval, []).append(
+            (bar.datetime, bar.open_price, bar.high_price, bar.low_price, bar.close_price, bar.volume))
+    return result
+
+
+class TestResample(unittest.TestCase):
+    def check(self, ticks, clock):
+        batch = TickBatch.from_ticks(ticks)
+        result = resample(batch["datetime"], batch["last_price"], batch["volume"], INTERVALS, clock)
+        expected = live_bars(ticks, clock)
+        self.assertEqual(sorted(result, key=str), sorted(expected, key=str))
+        for interval, bars in result.items():
+            self.assertEqual(bars.tolist(), expected[interval], interval)
+        return result
+
+    def test_session_parity(self):
+        """ 批量合成与实盘逐个tick合成得到相同的k线 """
+        result = self.check(make_ticks(), session_for("cu2010.SHFE"))
+        # 夜盘与周一日盘属于同一根日k线
+        self.assertEqual(len(result["1d"]), 2)
+        self.assertEqual(result[60]["datetime"][0], np.datetime64("2020-07-17T21:00"))
+
+    def test_wall_clock_parity(self):
+        self.check(make_ticks(), None)
+
+    def test_batch(self):
+        ticks = make_ticks() + make_ticks("rb2010")
+        result = resample_batch(TickBatch.from_ticks(ticks), [1, 5])
+        self.assertEqual(sorted(result), ["cu2010.SHFE", "rb2010.SHFE"])
+        rows = to_rows(result["rb2010.SHFE"][5], "rb2010.SHFE", 5)
+        # rb夜盘23:00收盘, 之后的tick被忽略
+        self.assertLess(max(row["datetime"] for row in rows if row["datetime"].day == 17).hour, 23)
+        data = VessData(rows)
+        self.assertEqual(data.type, "bar")
+        self.assertEqual(next(data)["local_symbol"], "rb2010.SHFE")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import unittest
+import warnings
+from threading import Thread
+
+from ctpbee import CtpBee, CtpbeeApi
+from ctpbee.constant import TradeData, PositionData, ContractData, Exchange, Direction, Offset, Product, \
+    EVENT_TRADE, EVENT_POSITION
+from ctpbee.event_engine import Event
+
+
+class Strategy(CtpbeeApi):
+    def __init__(self, name, app=None):
+        super().__init__(name, app)
+        self.trades = []
+        self.positions = []
+
+    def on_trade(self, trade):
+        self.trades.append(trade)
+
+    def on_position(self, position):
+        self.positions.append(position)
+
+
+class TestRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = CtpBee("route", __name__, instance_path=os.path.dirname(os.path.abspath(__file__)))
+        self.app.config["INSTRUMENT_INDEPEND"] = True
+        self.ma = Strategy("ma", self.app)
+        self.ma.instrument_set = {"rb2010.SHFE"}
+        self.kdj = Strategy("kdj", self.app)
+        self.kdj.instrument_set = {"rb2010.SHFE", "ag2012.SHFE"}
+
+    def test_route(self):
+        self.assertEqual(self.app.extensions_for("rb2010.SHFE"), [self.ma, self.kdj])
+        self.assertEqual(self.app.extensions_for("ag2012.SHFE"), [self.kdj])
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), ())
+        self.app.config["INSTRUMENT_INDEPEND"] = False
+        self.app.update_route()
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), [self.ma, self.kdj])
+
+    def test_invalidation(self):
+        """ 订阅合约以及插件发生变化之后路由表重建 """
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), ())
+        self.ma.instrument_set.add("cu2010.SHFE")
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), [self.ma])
+        self.ma.instrument_set = ["ag2012.SHFE"]
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), ())
+        self.assertEqual(self.app.extensions_for("ag2012.SHFE"), [self.ma, self.kdj])
+        self.app.del_extension("kdj")
+        self.assertEqual(self.app.extensions_for("ag2012.SHFE"), [self.ma])
+
+    def test_change_during_build(self):
+        """ 重建路由表期间订阅合约发生变化, 重建的结果不会覆盖失效标记 """
+        instrument_set = self.kdj.instrument_set
+        snapshot = instrument_set.snapshot
+
+        def changed():
+            result = snapshot()
+            del instrument_set.snapshot
+            instrument_set.add("cu2010.SHFE")
+            return result
+
+        instrument_set.snapshot = changed
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), ())
+        self.assertIsNone(self.app._route)
+        self.assertEqual(self.app.extensions_for("cu2010.SHFE"), [self.kdj])
+
+    def test_concurrent_subscribe(self):
+        """ 策略线程订阅合约的同时事件线程不断查询路由, 最后所有合约都能路由到策略 """
+        symbols = [f"rb{i}.SHFE" for i in range(2000)]
+
+        def subscribe():
+            for symbol in symbols:
+                self.ma.instrument_set.add(symbol)
+
+        thread = Thread(target=subscribe)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            thread.start()
+            while thread.is_alive():
+                self.app.extensions_for("rb0.SHFE")
+            thread.join()
+        for symbol in symbols:
+            self.assertIn(self.ma, self.app.extensions_for(symbol))
+
+    def test_single_delivery(self):
+        """ 成交以及持仓事件只推送给策略一次 """
+        recorder = self.app.recorder
+        for symbol in ("rb2010", "ag2012"):
+            contract = ContractData(symbol=symbol, exchange=Exchange.SHFE, name=symbol, product=Product.FUTURES,
+                                    size=10, pricetick=1, gateway_name="ctp")
+            recorder.contracts[contract.local_symbol] = contract
+        trade = TradeData(symbol="rb2010", exchange=Exchange.SHFE, order_id="1", tradeid="1", direction=Direction.LONG,
+                          offset=Offset.OPEN, price=3500, volume=1, gateway_name="ctp")
+        recorder.process_trade_event(Event(EVENT_TRADE, trade))
+        position = PositionData(symbol="rb2010", exchange=Exchange.SHFE, direction=Direction.LONG, volume=1,
+                                gateway_name="ctp")
+        recorder.process_position_event(Event(EVENT_POSITION, position))
+        for strategy in (self.ma, self.kdj):
+            self.assertEqual(len(strategy.trades), 1)
+            self.assertEqual(len(strategy.positions), 1)
+        recorder.process_trade_event(Event(EVENT_TRADE, TradeData(
+            symbol="ag2012", exchange=Exchange.SHFE, order_id="2", tradeid="2", direction=Direction.LONG,
+            offset=Offset.OPEN, price=5000, volume=1, gateway_name="ctp")))
+        self.assertEqual((len(self.ma.trades), len(self.kdj.trades)), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
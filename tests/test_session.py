@@ -0,0 +1,138 @@
+import unittest
+from datetime import datetime, timedelta
+from threading import Thread
+
+from ctpbee.constant import EVENT_TICK, EVENT_BAR, EVENT_SESSION_CLOSE
+from ctpbee.data_handle.bar_engine import BarAggregator
+from ctpbee.data_handle.session import session_for
+from ctpbee.event_engine import ShardedEngine, Event
+from ctpbee.record import Recorder
+from helpers import tick_at, App, Engine, wait_for
+
+
+def run(aggregator, times):
+    bars = []
+    for i, dt in enumerate(times):
+        bars.extend(aggregator.update_tick(tick_at(dt, 3500 + i, i)))
+    return bars
+
+
+def minutes(begin, end, step=30):
+    times = []
+    while begin < end:
+        times.append(begin)
+        begin += timedelta(seconds=step)
+    return times
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.session = session_for("rb2010.SHFE")
+
+    def test_lookup(self):
+        self.assertIsNone(session_for("600000.SSE"))
+        self.assertIsNone(session_for("xx2010.SHFE"))
+        self.assertIs(session_for("hc2010.SHFE"), self.session)
+        self.assertEqual(session_for("IF2009.CFFEX").segments[0], ("09:30", "11:30"))
+        # 周五夜盘属于下一个周一的交易日, 收盘时刻的tick计入最后一分钟
+        day, offset = self.session.locate(datetime(2020, 7, 17, 21, 30))
+        self.assertEqual(datetime.fromordinal(day), datetime(2020, 7, 20))
+        self.assertEqual(self.session.locate(datetime(2020, 7, 20, 15, 0, 0, 500000))[1],
+                         self.session.locate(datetime(2020, 7, 20, 14, 59, 59))[1])
+        self.assertIsNone(self.session.locate(datetime(2020, 7, 20, 12, 0)))
+
+    def test_break(self):
+        """ 30分钟k线跨越10:15-10:30的休息, 休息期间不会产生额外的1分钟k线 """
+        aggregator = BarAggregator([1, 30], self.session)
+        times = minutes(datetime(2020, 7, 20, 9, 50), datetime(2020, 7, 20, 10, 15)) + \
+            [datetime(2020, 7, 20, 10, 15, 0, 500000)] + \
+            minutes(datetime(2020, 7, 20, 10, 30), datetime(2020, 7, 20, 10, 50))
+        bars = run(aggregator, times)
+        thirty = [bar.datetime for bar in bars if bar.interval == 30]
+        self.assertEqual(thirty, [datetime(2020, 7, 20, 9, 30), datetime(2020, 7, 20, 10, 0)])
+        one = [bar.datetime for bar in bars if bar.interval == 1]
+        self.assertEqual(len(one), 25 + 19)
+        self.assertNotIn(datetime(2020, 7, 20, 10, 15), one)
+        self.assertEqual(aggregator.current(30).datetime, datetime(2020, 7, 20, 10, 45))
+
+    def test_timer_close(self):
+        aggregator = BarAggregator([1, 30, "1h", "1d"], self.session)
+        run(aggregator, minutes(datetime(2020, 7, 17, 22, 50), datetime(2020, 7, 17, 23, 0)))
+        self.assertEqual(aggregator.close_session(datetime(2020, 7, 17, 23, 0, 1)), [])
+        bars = aggregator.close_session(datetime(2020, 7, 17, 23, 0, 5))
+        self.assertEqual([(bar.interval, bar.datetime) for bar in bars],
+                         [(1, datetime(2020, 7, 17, 22, 59)), (30, datetime(2020, 7, 17, 22, 30)),
+                          (60, datetime(2020, 7, 17, 22, 0))])
+        # 定时器收盘之后迟到的tick被丢弃
+        self.assertEqual(aggregator.update_tick(tick_at(datetime(2020, 7, 17, 23, 0, 0, 500000))), [])
+        self.assertEqual(aggregator.close_session(datetime(2020, 7, 17, 23, 0, 10)), [])
+        # 日盘收盘之后结束全部k线, 夜盘属于同一根日k线
+        run(aggregator, minutes(datetime(2020, 7, 20, 14, 58), datetime(2020, 7, 20, 15, 0)))
+        bars = aggregator.close_session(datetime(2020, 7, 20, 15, 0, 5))
+        self.assertEqual([bar.interval for bar in bars], [1, 30, 60, "1d"])
+        self.assertEqual(bars[-1].datetime, datetime(2020, 7, 20))
+        self.assertEqual(bars[-1].open_price, 3500)
+
+    def test_late_tick_volume(self):
+        """ 定时器收盘之后迟到的tick被丢弃, 它的成交量计入下一根k线 """
+        aggregator = BarAggregator([1], self.session)
+        for i, dt in enumerate(minutes(datetime(2020, 7, 17, 22, 58), datetime(2020, 7, 17, 23, 0))):
+            aggregator.update_tick(tick_at(dt, 3500, 100 + i))
+        self.assertEqual(len(aggregator.close_session(datetime(2020, 7, 17, 23, 0, 5))), 1)
+        self.assertEqual(aggregator.update_tick(tick_at(datetime(2020, 7, 17, 23, 0, 0, 500000), 3500, 150)), [])
+        aggregator.update_tick(tick_at(datetime(2020, 7, 20, 9, 0, 10), 3510, 160))
+        aggregator.update_tick(tick_at(datetime(2020, 7, 20, 9, 0, 40), 3510, 170))
+        bar, = aggregator.update_tick(tick_at(datetime(2020, 7, 20, 9, 1, 10), 3510, 170))
+        self.assertEqual((bar.datetime, bar.volume), (datetime(2020, 7, 20, 9, 0), 170 - 103))
+
+    def test_timer_event(self):
+        """ 定时器只投递收盘事件, 同一个时段只投递一次, k线在处理收盘事件时结束 """
+        engine = Engine()
+        recorder = Recorder(App(XMIN=[30]), engine)
+        generator = recorder.create_generator("rb2010.SHFE")
+        for dt in minutes(datetime(2020, 7, 17, 22, 58), datetime(2020, 7, 17, 23, 0)):
+            generator.update_tick(tick_at(dt))
+        recorder.generators.check(datetime(2020, 7, 17, 23, 0, 1))
+        self.assertEqual(engine.data(EVENT_SESSION_CLOSE), [])
+        for _ in range(2):
+            recorder.generators.check(datetime(2020, 7, 17, 23, 0, 5))
+        close, = engine.data(EVENT_SESSION_CLOSE)
+        self.assertEqual(engine.data(EVENT_BAR)[-1].datetime, datetime(2020, 7, 17, 22, 58))
+        recorder.process_session_close_event(Event(EVENT_SESSION_CLOSE, close))
+        self.assertEqual([(bar.interval, bar.datetime) for bar in engine.data(EVENT_BAR)[-2:]],
+                         [(1, datetime(2020, 7, 17, 22, 59)), (30, datetime(2020, 7, 17, 22, 30))])
+
+    def test_timer_thread(self):
+        """ 定时器线程与处理tick的分片线程同时运行, 每根k线只推送一次并且包含全部tick """
+        engine = ShardedEngine(work_core=2)
+        recorder = Recorder(App(XMIN=[30, "1h"]), engine)
+        bars, processed = [], []
+        engine.register(EVENT_BAR, lambda event: bars.append(event.data))
+        engine.register(EVENT_TICK, lambda event: processed.append(1))
+        times = minutes(datetime(2020, 7, 17, 22, 0), datetime(2020, 7, 17, 23, 0), step=0.5)
+        close = datetime(2020, 7, 17, 23, 0, 5)
+
+        def timer():
+            while len(processed) < len(times):
+                recorder.generators.check(close)
+            recorder.generators.check(close)
+
+        engine.start()
+        try:
+            engine.put_many([Event(EVENT_TICK, tick_at(dt, 3500 + i % 11, i)) for i, dt in enumerate(times)])
+            thread = Thread(target=timer)
+            thread.start()
+            thread.join()
+            wait_for(lambda: len(bars) == 63)
+        finally:
+            engine.stop()
+        one = [bar for bar in bars if bar.interval == 1]
+        self.assertEqual([bar.datetime for bar in one], minutes(datetime(2020, 7, 17, 22, 0), datetime(2020, 7, 17, 23, 0), step=60))
+        self.assertEqual(sum(bar.volume for bar in one), len(times) - 1)
+        self.assertEqual([(bar.interval, bar.datetime) for bar in bars if bar.interval != 1],
+                         [(30, datetime(2020, 7, 17, 22, 0)), (30, datetime(2020, 7, 17, 22, 30)),
+                          (60, datetime(2020, 7, 17, 22, 0))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import unittest
+from collections import defaultdict
+from datetime import datetime, timedelta
+from threading import Lock
+from time import sleep
+
+from ctpbee import CtpBee, CtpbeeApi
+from ctpbee.constant import TickData, TradeData, OrderData, ContractData, Exchange, Direction, Offset, Product, \
+    Status, EVENT_TICK, EVENT_TRADE, EVENT_ORDER
+from ctpbee.event_engine import ShardedEngine, Event
+from helpers import wait_for
+
+SYMBOLS = ("rb2010", "ag2012", "cu2010", "au2012")
+
+
+class Data:
+    def __init__(self, local_symbol, index):
+        self.local_symbol = local_symbol
+        self.index = index
+
+
+class Exclusive:
+    """ 记录被包装的函数是否在多个线程中同时执行 """
+
+    def __init__(self):
+        self.inside = 0
+        self.overlapped = False
+        self.lock = Lock()
+
+    def wrap(self, func):
+        def wrapper(*args):
+            with self.lock:
+                self.inside += 1
+                self.overlapped = self.overlapped or self.inside > 1
+            try:
+                # 放大同时执行的窗口
+                sleep(0.0002)
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.inside -= 1
+
+        return wrapper
+
+
+class Strategy(CtpbeeApi):
+    def __init__(self, name, app):
+        super().__init__(name, app)
+        self.exclusive = Exclusive()
+        self.ticks = defaultdict(list)
+        self.trades = []
+        self.on_tick = self.exclusive.wrap(self.on_tick)
+        self.on_trade = self.exclusive.wrap(self.on_trade)
+
+    def on_tick(self, tick):
+        self.ticks[tick.local_symbol].append(tick.volume)
+
+    def on_trade(self, trade):
+        self.trades.append(trade)
+
+    def on_bar(self, bar):
+        pass
+
+
+class TestSharded(unittest.TestCase):
+    def test_order(self):
+        """ 分片之后同一个合约的事件依旧有序 """
+        engine = ShardedEngine(work_core=3)
+        result = defaultdict(list)
+        engine.register(EVENT_TICK, lambda event: result[event.data.local_symbol].append(event.data.index))
+        for i in range(500):
+            for symbol in ("a", "b", "c", "d"):
+                engine.put(Event(EVENT_TICK, Data(symbol, i)))
+        engine.start()
+        try:
+            wait_for(lambda: sum(len(x) for x in result.values()) == 2000)
+        finally:
+            engine.stop()
+        for symbol in ("a", "b", "c", "d"):
+            self.assertEqual(result[symbol], list(range(500)))
+
+    def test_recorder(self):
+        """ 成交通道与行情分片同时更新持仓以及活跃报单, 共享数据被加锁, 同一个策略的回调不会同时执行 """
+        app = CtpBee("sharded", __name__, engine_method="sharded", engine_params={"work_core": 3},
+                     instance_path=os.path.dirname(os.path.abspath(__file__)))
+        recorder = app.recorder
+        for symbol in SYMBOLS:
+            contract = ContractData(symbol=symbol, exchange=Exchange.SHFE, name=symbol, product=Product.FUTURES,
+                                    size=10, pricetick=1, gateway_name="ctp")
+            recorder.contracts[contract.local_symbol] = contract
+        exclusive = Exclusive()
+        manager = recorder.position_manager
+        for name in ("update_tick", "update_trade", "update_order", "update_position"):
+            setattr(manager, name, exclusive.wrap(getattr(manager, name)))
+        strategy = Strategy("ma", app)
+
+        start = datetime(2020, 7, 20, 9, 0, 1)
+        events = []
+        for i in range(100):
+            for symbol in SYMBOLS:
+                events.append(Event(EVENT_TICK, TickData(symbol=symbol, exchange=Exchange.SHFE, gateway_name="ctp",
+                                                         datetime=start + timedelta(seconds=i), last_price=100,
+                                                         volume=i)))
+            if i % 2 == 0:
+                symbol = SYMBOLS[i // 2 % 4]
+                events.append(Event(EVENT_ORDER, OrderData(symbol=symbol, exchange=Exchange.SHFE, order_id=str(i),
+                                                           direction=Direction.LONG, offset=Offset.OPEN, volume=1,
+                                                           status=Status.NOTTRADED, gateway_name="ctp")))
+                events.append(Event(EVENT_TRADE, TradeData(symbol=symbol, exchange=Exchange.SHFE, order_id=str(i),
+                                                           tradeid=str(i), direction=Direction.LONG,
+                                                           offset=Offset.OPEN, price=100, volume=1,
+                                                           gateway_name="ctp")))
+        app.event_engine.start()
+        try:
+            app.event_engine.put_many(events)
+            wait_for(lambda: len(strategy.trades) == 50 and sum(len(x) for x in strategy.ticks.values()) == 400)
+        finally:
+            app.event_engine.stop()
+        self.assertFalse(exclusive.overlapped)
+        self.assertFalse(strategy.exclusive.overlapped)
+        for symbol in SYMBOLS:
+            self.assertEqual(strategy.ticks[f"{symbol}.SHFE"], list(range(100)))
+        self.assertEqual(len(recorder.get_all_active_orders()), 50)
+        self.assertEqual(sum(manager.get_position(f"{symbol}.SHFE").long_pos for symbol in SYMBOLS), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
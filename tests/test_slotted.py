@@ -0,0 +1,48 @@
+import pickle
+import unittest
+from copy import deepcopy
+from datetime import datetime
+
+from ctpbee import trace
+from ctpbee.constant import TickData, OrderData, FastTickData, FastOrderData, Exchange, Status
+
+KWARGS = dict(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime(2020, 7, 15, 21), last_price=3700.0,
+              bid_price_1=3699.0, gateway_name="ctp")
+
+
+class TestSlotted(unittest.TestCase):
+    def test_compatible(self):
+        tick, fast = TickData(**KWARGS), FastTickData(**KWARGS)
+        self.assertIsInstance(fast, TickData)
+        self.assertEqual(repr(tick), repr(fast))
+        self.assertEqual(tick._to_dict(), fast._to_dict())
+        self.assertEqual(tick._asdict(), fast._asdict())
+        self.assertEqual(FastTickData._create_class(dict(KWARGS))._to_dict(), fast._to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(fast))._to_dict(), fast._to_dict())
+        self.assertEqual(deepcopy(fast)._to_dict(), fast._to_dict())
+        # 字段以外的属性仍然可以设置
+        trace.stamp(fast, "receive")
+        self.assertIn("receive", trace.stages_of(fast))
+        order = FastOrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id="1", status=Status.NOTTRADED,
+                              gateway_name="ctp")
+        self.assertIsInstance(order, OrderData)
+        self.assertEqual(order.local_order_id, "ctp.1")
+        self.assertEqual(order.volume, 0)
+        self.assertTrue(order._is_active())
+
+    def test_missing_field(self):
+        """ 没有默认值且没有传入的字段与原类一样抛出AttributeError """
+        kwargs = dict(KWARGS)
+        del kwargs["gateway_name"]
+        tick, fast = TickData(**kwargs), FastTickData(**kwargs)
+        for data in (tick, fast):
+            with self.assertRaises(AttributeError):
+                data.gateway_name
+        self.assertEqual(tick._to_dict(), fast._to_dict())
+        self.assertNotIn("gateway_name", fast._to_dict())
+        self.assertEqual(fast.local_symbol, "rb2010.SHFE")
+        self.assertEqual(fast.volume, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
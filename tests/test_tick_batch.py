@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ctpbee.constant import TickData, Exchange
+from ctpbee.data_handle.tick_batch import TickBatch
+from ctpbee.jsond import dumps, loads
+from ctpbee.looper.data import VessData
+from ctpbee.record import Recorder
+from helpers import App, Engine
+
+
+def make_ticks():
+    start = datetime(2020, 7, 15, 21, 0, 0, 500000)
+    ticks = []
+    for i in range(6):
+        symbol, exchange = ("rb2010", Exchange.SHFE) if i % 2 else ("ag2012", Exchange.SHFE)
+        ticks.append(TickData(symbol=symbol, exchange=exchange, datetime=start + timedelta(seconds=i),
+                              name="螺纹", gateway_name="ctp", last_price=3500 + i, volume=10 * i))
+    return ticks
+
+
+class TestTickBatch(unittest.TestCase):
+    def test_round_trip(self):
+        ticks = make_ticks()
+        batch = TickBatch.from_ticks(ticks)
+        self.assertEqual(len(batch), 6)
+        self.assertEqual(list(batch["last_price"]), [3500 + i for i in range(6)])
+        for tick, result in zip(ticks, batch.to_ticks()):
+            self.assertIsInstance(result, TickData)
+            self.assertEqual(result._to_dict(), tick._to_dict())
+        self.assertEqual(batch[1].local_symbol, "rb2010.SHFE")
+        self.assertEqual(len(batch[2:4]), 2)
+
+    def test_split(self):
+        batch = TickBatch.from_ticks(make_ticks())
+        self.assertIsNone(batch.local_symbol)
+        groups = batch.split()
+        self.assertEqual(sorted(groups), ["ag2012.SHFE", "rb2010.SHFE"])
+        rb = groups["rb2010.SHFE"]
+        self.assertEqual(rb.local_symbol, "rb2010.SHFE")
+        self.assertEqual(list(rb["volume"]), [10, 30, 50])
+
+    def test_split_single(self):
+        """ 只有一个合约时拆分结果是视图, Recorder冻结拆分结果不会冻结推送方的batch """
+        batch = TickBatch.from_ticks([tick for tick in make_ticks() if tick.symbol == "rb2010"])
+        groups = Recorder(App(), Engine())._split_tick_batch(batch)
+        rb = groups["rb2010.SHFE"]
+        self.assertIsNot(rb, batch)
+        self.assertTrue(np.shares_memory(rb.array, batch.array))
+        self.assertFalse(rb.array.flags.writeable)
+        self.assertTrue(batch.array.flags.writeable)
+        batch.array["volume"] += 1
+        self.assertEqual(list(rb["volume"]), [11, 31, 51])
+
+    def test_from_columns(self):
+        batch = TickBatch.from_columns(symbol="rb2010", exchange=Exchange.SHFE, last_price=[1.0, 2.0])
+        self.assertEqual(batch.local_symbol, "rb2010.SHFE")
+        self.assertEqual(batch.tick(1).exchange, Exchange.SHFE)
+        # 缺少datetime时为NaT而不是1970-01-01
+        self.assertTrue(np.isnat(batch["datetime"]).all())
+        self.assertIsNone(batch.tick(0).datetime)
+        with self.assertRaises(ValueError):
+            TickBatch.from_columns(price=[1.0])
+
+    def test_string_width(self):
+        """ 超过定长的字符串不会被静默截断 """
+        ticks = make_ticks()
+        ticks[3].gateway_name = "ctp_simnow_7x24"
+        with self.assertRaises(ValueError):
+            TickBatch.from_ticks(ticks)
+        with self.assertRaises(ValueError):
+            TickBatch.from_columns(symbol=["rb2010", "SPD rb2010&rb2101"], last_price=[1.0, 2.0])
+        batch = TickBatch.from_columns(symbol=["x" * 16], exchange="SHFE", gateway_name="ctp_mini", name="螺" * 16)
+        self.assertEqual((batch.tick(0).symbol, batch.tick(0).gateway_name), ("x" * 16, "ctp_mini"))
+
+    def test_jsond(self):
+        batch = TickBatch.from_ticks(make_ticks())
+        result = loads(dumps(batch))
+        self.assertIsInstance(result, TickBatch)
+        self.assertEqual(result.to_columns(), batch.to_columns())
+
+    def test_looper_data(self):
+        batch = TickBatch.from_ticks(make_ticks())
+        rows = list(VessData(batch))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["local_symbol"], "ag2012.SHFE")
+        self.assertEqual(rows[1]["last_price"], 3501)
+
+
+if __name__ == '__main__':
+    unittest.main()
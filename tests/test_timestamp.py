@@ -0,0 +1,25 @@
+import unittest
+from datetime import datetime, date
+
+from ctpbee.data_handle.timestamp import TimestampDecoder
+
+
+class TestTimestamp(unittest.TestCase):
+    def test_decode(self):
+        decoder = TimestampDecoder()
+        for day, clock in [("20200715", "21:00:01"), ("20200715", "21:00:01.5"), ("20200229", "23:59:59.123456")]:
+            fmt = "%Y%m%d %H:%M:%S.%f" if "." in clock else "%Y%m%d %H:%M:%S"
+            self.assertEqual(decoder.decode(day, clock), datetime.strptime(f"{day} {clock}", fmt))
+        # 与原先行情接口中的strptime结果一致
+        for millisec in (0, 99, 500, 999):
+            expected = datetime.strptime(f"20200715 09:30:00.{int(millisec / 100)}", "%Y%m%d %H:%M:%S.%f")
+            self.assertEqual(decoder.decode_md("20200715", "09:30:00", millisec), expected)
+        self.assertEqual(decoder.decode_md("", "09:30:00", 0).date(), date.today())
+        for day, clock in [("2020071", "09:00:00"), ("20200230", "09:00:00"), ("20200715", "9:00:00"),
+                           ("20200715", "25:00:00"), ("20200715", "09:00:00.1234567")]:
+            with self.assertRaises(ValueError):
+                decoder.decode(day, clock)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime
+from enum import Enum
+
+from ctpbee.constant import TickData, OrderData, FastOrderData, ContractData, OrderRequest, Exchange, Direction, \
+    OrderType, Offset, to_records
+
+
+def dir_to_dict(data):
+    """ 原先基于dir的实现 """
+    temp = {}
+    for x in dir(data):
+        if x.startswith("_") or x.startswith("create"):
+            continue
+        value = getattr(data, x)
+        temp[x] = value.value if isinstance(value, Enum) else value
+    return temp
+
+
+class TestToRecords(unittest.TestCase):
+    def setUp(self):
+        self.tick = TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime(2020, 7, 15, 21),
+                             last_price=3700.0, gateway_name="ctp")
+        self.orders = [FastOrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id=str(x), price=3700.0 + x,
+                                     direction=Direction.LONG, offset=Offset.OPEN, gateway_name="ctp")
+                       for x in range(3)]
+
+    def test_to_dict(self):
+        missing = TickData(symbol="rb2010", exchange=Exchange.SHFE, gateway_name="ctp")
+        extra = OrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id="1", gateway_name="ctp")
+        extra.note = "额外的属性"
+        contract = ContractData(symbol="rb2010", exchange=Exchange.SHFE, create_date=1, gateway_name="ctp")
+        request = OrderRequest(symbol="rb2010", exchange=Exchange.SHFE, direction=Direction.LONG,
+                               type=OrderType.LIMIT, volume=1)
+        for data in [self.tick, missing, extra, contract, request] + self.orders:
+            self.assertEqual(list(data._to_dict().items()), list(dir_to_dict(data).items()))
+        self.assertIn("note=额外的属性", repr(extra))
+        self.assertNotIn("datetime", missing._to_dict())
+
+    def test_to_records(self):
+        records = to_records(self.orders)
+        self.assertEqual(records["price"], [3700.0, 3701.0, 3702.0])
+        self.assertEqual(records["direction"], ["多"] * 3)
+        self.assertEqual(records["local_order_id"], ["ctp.0", "ctp.1", "ctp.2"])
+        df = to_records([self.tick, self.tick], frame=True)
+        self.assertEqual(df.index.name, "datetime")
+        self.assertEqual(list(df["exchange"]), ["SHFE", "SHFE"])
+        # 不同类的数据逐个转换, 缺失的值为None
+        mixed = to_records([self.tick, self.orders[0]])
+        self.assertEqual(mixed["order_id"], [None, "0"])
+        self.assertEqual(to_records([]), {})
+
+    def test_mixed_classes(self):
+        """ 子类的字段不会因为第一行属于父类而丢失 """
+
+        class LevelTick(TickData):
+            level: int = 0
+
+        level = LevelTick(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime(2020, 7, 15, 21, 0, 1),
+                          last_price=3701.0, level=5, gateway_name="ctp")
+        records = to_records([self.tick, level])
+        self.assertEqual(records["level"], [None, 5])
+        self.assertEqual(records["last_price"], [3700.0, 3701.0])
+        order = OrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id="3", gateway_name="ctp")
+        order.note = "额外的属性"
+        self.assertEqual(to_records(self.orders + [order])["note"], [None] * 3 + ["额外的属性"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import unittest
+from datetime import datetime
+from threading import Thread
+
+from ctpbee import trace, CtpBee, CtpbeeApi, LatencyTracker
+from ctpbee.constant import TickData, OrderData, ContractData, Exchange, OrderRequest, Direction, Offset, \
+    OrderType, Product, Status, EVENT_TICK, EVENT_ORDER
+from ctpbee.event_engine import Event
+from ctpbee.helpers import freeze_event
+
+
+class Sink:
+    def __init__(self):
+        self.callbacks = []
+        self.orders = []
+
+    def trace_callback(self, strategy, local_symbol, stages):
+        self.callbacks.append((strategy, local_symbol, stages))
+
+    def trace_order(self, strategy, local_symbol, stages):
+        self.orders.append((strategy, local_symbol, stages))
+
+
+class Strategy(CtpbeeApi):
+    def __init__(self, name, app=None):
+        super().__init__(name, app)
+        self.requests = []
+        self.orders = []
+
+    def on_tick(self, tick):
+        req = OrderRequest(symbol=tick.symbol, exchange=tick.exchange, direction=Direction.LONG,
+                           offset=Offset.OPEN, type=OrderType.LIMIT, volume=1, price=tick.last_price)
+        trace.order(req)
+        self.requests.append(req)
+
+    def on_bar(self, bar):
+        pass
+
+    def on_order(self, order):
+        self.orders.append(order)
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.sink = Sink()
+        trace.enable(self.sink)
+
+    def tearDown(self):
+        trace.disable(self.sink)
+
+    def test_tick_to_order(self):
+        """ tick上的时间戳经过策略回调传递到下单请求 """
+        tick = TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime.now(), gateway_name="ctp")
+        trace.stamp(tick, "receive")
+        trace.stamp(tick, "dispatch")
+        self.assertNotIn("_trace", tick._to_dict())
+        frozen = freeze_event(Event(EVENT_TICK, tick)).data
+        trace.enter("ma", frozen)
+        req = OrderRequest(symbol="rb2010", exchange=Exchange.SHFE, direction=Direction.LONG, offset=Offset.OPEN,
+                           type=OrderType.LIMIT, volume=1, price=3500)
+        trace.order(req)
+        trace.leave()
+        trace.sent(req)
+        strategy, local_symbol, stages = self.sink.orders[0]
+        self.assertEqual((strategy, local_symbol), ("ma", "rb2010.SHFE"))
+        self.assertEqual(list(stages), ["receive", "dispatch", "callback", "action", "send"])
+        self.assertEqual(sorted(stages.values()), list(stages.values()))
+        self.assertEqual(self.sink.callbacks[0][0], "ma")
+
+    def test_order_outside_callback(self):
+        req = OrderRequest(symbol="rb2010", exchange=Exchange.SHFE, direction=Direction.LONG, offset=Offset.OPEN,
+                           type=OrderType.LIMIT, volume=1, price=3500)
+        trace.order(req)
+        trace.sent(req)
+        self.assertEqual(self.sink.orders[0][0], None)
+        self.assertEqual(list(self.sink.orders[0][2]), ["action", "send"])
+
+    def test_latency_tracker(self):
+        """ 作为插件载入的LatencyTracker同样会收到tick以及报单事件, 回调不会出错 """
+        # 插件字典是CtpBee的类属性, 清除其他测试载入的插件
+        CtpBee.extensions.clear()
+        self.addCleanup(CtpBee.extensions.clear)
+        app = CtpBee("trace", __name__, instance_path=os.path.dirname(os.path.abspath(__file__)))
+        errors = []
+        app.event_engine.on_error = lambda event, handler, e: errors.append((event.type, handler, e))
+        tracker = LatencyTracker("latency")
+        app.add_extension(tracker)
+        self.addCleanup(tracker.close)
+        strategy = Strategy("ma", app)
+        contract = ContractData(symbol="rb2010", exchange=Exchange.SHFE, name="rb2010", product=Product.FUTURES,
+                                size=10, pricetick=1, gateway_name="ctp")
+        app.recorder.contracts[contract.local_symbol] = contract
+
+        tick = TickData(symbol="rb2010", exchange=Exchange.SHFE, datetime=datetime.now(), last_price=3500,
+                        gateway_name="ctp")
+        trace.stamp(tick, "receive")
+        trace.stamp(tick, "dispatch")
+        app.recorder.process_tick_event(Event(EVENT_TICK, tick))
+        trace.sent(strategy.requests[0])
+        order = OrderData(symbol="rb2010", exchange=Exchange.SHFE, order_id="1", direction=Direction.LONG,
+                          offset=Offset.OPEN, volume=1, status=Status.NOTTRADED, gateway_name="ctp")
+        app.recorder.process_order_event(Event(EVENT_ORDER, order))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(strategy.orders), 1)
+        report = tracker.report()
+        self.assertEqual(set(report["strategy"]), {"ma"})
+        self.assertEqual(set(report["strategy"]["ma"]),
+                         {"queue", "dispatch", "tick_to_callback", "strategy", "send", "tick_to_order"})
+        self.assertEqual(report["symbol"]["rb2010.SHFE"]["tick_to_order"]["count"], 1)
+
+
+    def test_latency_tracker_threads(self):
+        """ 多个处理线程同时写入统计时不会丢失采样, 同时可以读取报告 """
+        tracker = LatencyTracker("latency")
+        stages = {"receive": 0.0, "dispatch": 0.001, "callback": 0.002}
+        symbols = [f"rb20{10 + i}.SHFE" for i in range(4)]
+
+        def record():
+            for i in range(2000):
+                tracker.trace_callback("ma", symbols[i % 4], stages)
+                if i % 100 == 0:
+                    tracker.report()
+
+        threads = [Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report = tracker.report()
+        self.assertEqual(report["strategy"]["ma"]["queue"]["count"], 8000)
+        self.assertEqual([report["symbol"][symbol]["tick_to_callback"]["count"] for symbol in symbols], [2000] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()